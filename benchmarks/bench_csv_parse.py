@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from nse_report.integration.schemas import read_bhavdata_csv
+from nse_report.integration.ma_report_parser import ma_report_cache, parse_ma_report, read_ma_report_csv
+from synthetic_data import generate
+
+
+# Readers as they were before the schema registry, kept as the baseline
+def read_bhavdata_untyped(file_path):
+    df = pd.read_csv(file_path)
+    df = df.rename(columns=lambda x: x.strip())
+    df = df.rename(columns={'DATE1': 'DATE'})
+    df['SERIES'] = df['SERIES'].str.strip()
+    df['DATE'] = df['DATE'].str.strip()
+    df = df[df['SERIES'] == 'EQ']
+    df = df.drop(columns=['SERIES', 'PREV_CLOSE', 'AVG_PRICE', 'TURNOVER_LACS', 'DELIV_PER'])
+    df['LAST_PRICE'] = df['LAST_PRICE'].astype(float)
+    df['DELIV_QTY'] = df['DELIV_QTY'].astype(int)
+    df['DATE'] = pd.to_datetime(df['DATE'])
+    return df
+
+
+def read_ma_report_fixed_rows(file_path):
+    return pd.read_csv(file_path, skiprows=8, usecols=range(1, 8), nrows=71)
+
+
+# Section parser without the cache of parsed reports
+def read_ma_report_sections(file_path):
+    with open(file_path, 'rb') as file:
+        return parse_ma_report(file.read(), file_path)['index']
+
+
+def measure(reader, files):
+    """
+    This function reads every file with `reader` and returns the elapsed time,
+    the number of rows read, the peak traced memory of reading a file and
+    the in-memory size of the resulting frame.
+    """
+
+    start = time.perf_counter()
+    rows = sum(len(reader(file)) for file in files)
+    elapsed = time.perf_counter() - start
+
+    # Memory is traced in a second pass, tracing slows the parsing down
+    tracemalloc.start()
+    for file in files[:10]:
+        reader(file)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    frame_size = reader(files[0]).memory_usage(deep=True).sum()
+    return elapsed, rows, peak, frame_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the bhavcopy and MA report parsers on a synthetic year.')
+    parser.add_argument('--days', type=int, default=250)
+    parser.add_argument('--symbols', type=int, default=2500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root_path:
+        generate(root_path, args.days, args.symbols)
+
+        for name, folder, readers in [
+            ('bhavcopy', 'data/raw/sec_bhavdata_full', [('untyped', read_bhavdata_untyped), ('schema', read_bhavdata_csv)]),
+            ('MA report', 'data/raw/ma_report', [('fixed rows', read_ma_report_fixed_rows), ('sections', read_ma_report_sections),
+                                                 ('cached', read_ma_report_csv)]),
+        ]:
+            folder_path = os.path.join(root_path, folder)
+            files = sorted(os.path.join(folder_path, file) for file in os.listdir(folder_path))
+            for reader_name, reader in readers:
+                if reader_name == 'cached':
+                    # Parse every report once, the timed pass only hashes the files
+                    ma_report_cache.reports.clear()
+                    for file in files:
+                        reader(file)
+                elapsed, rows, peak, frame_size = measure(reader, files)
+                print(f'{name:10} {reader_name:10} {len(files)} files, {rows} rows: '
+                      f'{elapsed:.2f} s ({rows / elapsed:,.0f} rows/s), '
+                      f'peak {peak / 1024 ** 2:.1f} MB, frame {frame_size / 1024:.0f} KB per file')
+
+
+if __name__ == '__main__':
+    main()
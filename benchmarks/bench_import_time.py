@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+# Constants
+SRC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+DEFAULT_BUDGET_MS = 100
+
+# Modules the CLI must not import before a command runs
+HEAVY_MODULES = ['pandas', 'numpy', 'requests', 'pyarrow']
+
+# Modules imported by the commands, timed for information
+COMMAND_MODULES = ['nse_report.extraction.nse_data_fetcher', 'nse_report.extraction.nse_stock_hist_fetcher',
+                   'nse_report.extraction.nse_holiday_fetcher', 'nse_report.integration.data_preprocessing',
+                   'nse_report.integration.query_service']
+
+
+def run_python(args, cwd):
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join([SRC_PATH, os.environ.get('PYTHONPATH', '')])}
+    return subprocess.run([sys.executable] + args, cwd=cwd, env=env, capture_output=True, text=True, check=True)
+
+
+def startup_ms(args, cwd, repeat):
+    """
+    This function runs a Python command `repeat` times and returns its best wall time, in milliseconds.
+    """
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_python(args, cwd)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def import_ms(module_name, cwd):
+    """
+    This function returns the cumulative import time of a module, in
+    milliseconds, from the `-X importtime` report of a fresh interpreter.
+    """
+
+    stderr = run_python(['-X', 'importtime', '-c', f'import {module_name}'], cwd).stderr
+    for line in stderr.splitlines():
+        fields = [field.strip() for field in line.split('|')]
+        if len(fields) == 3 and fields[2] == module_name:
+            return int(fields[1]) / 1000
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that the nse-report CLI starts without its heavy imports.')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help='Maximum startup time of `nse-report --help`, in milliseconds')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cwd:
+        # The command modules configure their logs in logs/ when imported
+        os.makedirs(os.path.join(cwd, 'logs'))
+
+        imported = run_python(['-c', 'import sys, nse_report.cli; '
+                                     f'print(" ".join(module for module in {HEAVY_MODULES!r} if module in sys.modules))'],
+                              cwd).stdout.split()
+        interpreter_ms = startup_ms(['-c', 'pass'], cwd, args.repeat)
+        help_ms = startup_ms(['-m', 'nse_report', '--help'], cwd, args.repeat)
+
+        print(f'{"python -c pass":<40}{interpreter_ms:>8.1f} ms')
+        print(f'{"nse-report --help":<40}{help_ms:>8.1f} ms (budget {args.budget_ms:.0f} ms)')
+        for module_name in COMMAND_MODULES:
+            print(f'{"import " + module_name:<40}{import_ms(module_name, cwd):>8.1f} ms')
+
+    failures = []
+    if imported:
+        failures.append(f'the CLI imports {", ".join(imported)} before running a command')
+    if help_ms > args.budget_ms:
+        failures.append(f'nse-report --help took {help_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget')
+    for failure in failures:
+        print(f'FAILED: {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
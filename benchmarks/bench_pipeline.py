@@ -0,0 +1,359 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import multiprocessing
+from urllib.parse import quote
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from synthetic_data import generate
+
+# Constants
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+SRC_PATH = os.path.join(BENCHMARKS_PATH, '..', 'src')
+DEFAULT_BASELINE_PATH = os.path.join(BENCHMARKS_PATH, 'baseline.json')
+DEFAULT_THRESHOLD = 0.10
+DOWNLOAD_FOLDER_PATH = 'data/benchmark_downloads/'
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def list_files(folder_path):
+    return sorted(os.listdir(folder_path))
+
+
+# Benchmarks: every function takes the options, does its untimed setup and
+# returns the timed function, which returns the counts of what it handled (rows, files, bytes)
+def bench_clean_bhavdata(options):
+    from nse_report.integration import data_preprocessing
+
+    def run():
+        bhavdata_df = data_preprocessing.clean_bhavdata_files(full_rebuild=True)
+        return {'rows': len(bhavdata_df), 'files': len(list_files(data_preprocessing.BHAVDATA_FOLDER_PATH))}
+    return run
+
+
+def bench_clean_bhavdata_incremental(options):
+    from nse_report.integration import data_preprocessing
+    from nse_report.integration.file_manifest import FileManifest
+
+    # Start from a complete manifest, so only the newest file is read again
+    data_preprocessing.clean_bhavdata_files(full_rebuild=True)
+    newest_file = list_files(data_preprocessing.BHAVDATA_FOLDER_PATH)[-1]
+
+    def run():
+        manifest = FileManifest(data_preprocessing.BHAVDATA_MANIFEST_PATH)
+        manifest.remove([newest_file])
+        manifest.save()
+        bhavdata_df = data_preprocessing.clean_bhavdata_files()
+        return {'rows': int((bhavdata_df['DATE'] == bhavdata_df['DATE'].max()).sum()), 'files': 1}
+    return run
+
+
+def bench_clean_ma_report(options):
+    from nse_report.integration import data_preprocessing
+
+    def run():
+        ma_report_df = data_preprocessing.clean_ma_report_files(full_rebuild=True)
+        return {'rows': len(ma_report_df), 'files': len(list_files(data_preprocessing.MA_REPORT_FOLDER_PATH))}
+    return run
+
+
+def bench_create_dimensions(options):
+    from nse_report.integration import data_preprocessing
+    import pandas as pd
+
+    dates = pd.to_datetime([data_preprocessing.bhavdata_file_date(file)
+                            for file in list_files(data_preprocessing.BHAVDATA_FOLDER_PATH)])
+    bhavdata_df = pd.DataFrame({'DATE': dates})
+
+    def run():
+        # A full build of the calendar, an unchanged range adds no rows
+        datetime_df = data_preprocessing.create_dimensions(bhavdata_df, full_rebuild=True)
+        return {'rows': len(datetime_df)}
+    return run
+
+
+def bench_is_holiday(options):
+    import pandas as pd
+    from nse_report.extraction.nse_data_fetcher import HOLIDAY_DATA_PATH, is_holiday
+
+    holidays_df = pd.read_csv(HOLIDAY_DATA_PATH)
+    dates = pd.date_range(pd.to_datetime(holidays_df['HolidayDate'], format='%d-%b-%Y').min(), periods=options['calls'])
+    date_strings = list(dates.strftime('%d-%b-%Y'))
+
+    def run():
+        # One scalar call per date, as in the extraction scripts
+        for date in date_strings:
+            is_holiday(date)
+        return {'rows': len(date_strings)}
+    return run
+
+
+def bench_fetch_sector_data(options):
+    from nse_report.extraction.nse_session import create_session
+    from nse_report.extraction.nse_data_fetcher import COMBINED_DATA_PATH, COMBINED_DATA_FILE, fetch_all_sector_data
+    from stub_server import start_stub_server
+
+    server, base_url = start_stub_server(os.path.join(COMBINED_DATA_PATH, COMBINED_DATA_FILE), latency=options['latency'])
+    sector_index = {sector: quote(sector) for sector in server.constituents}
+    session = create_session(pool_size=options['concurrency'], base_url=base_url)
+
+    def run():
+        sector_data = fetch_all_sector_data(session, 'benchmark', sector_index, options['concurrency'],
+                                            options['rate_limit'], base_url)
+        return {'rows': sum(len(df) for df in sector_data), 'files': len(sector_data)}
+    return run
+
+
+def bench_download_files(options):
+    from nse_report.extraction.nse_session import RateLimiter, create_session
+    from nse_report.extraction.nse_data_fetcher import (COMBINED_DATA_PATH, COMBINED_DATA_FILE, FULL_BHAVDATA_PATH,
+                                                        download_csv_file)
+    from stub_server import start_stub_server
+
+    server, base_url = start_stub_server(os.path.join(COMBINED_DATA_PATH, COMBINED_DATA_FILE), FULL_BHAVDATA_PATH,
+                                         latency=options['latency'])
+    files = list_files(FULL_BHAVDATA_PATH)[:options['download_files']]
+    session = create_session(pool_size=1, base_url=base_url)
+    rate_limiter = RateLimiter(options['rate_limit'])
+
+    def run():
+        for file in files:
+            status_code = download_csv_file(session, f'{base_url}/archives/{file}', DOWNLOAD_FOLDER_PATH, rate_limiter)
+            if status_code != 200:
+                raise RuntimeError(f'Download of {file} failed with status {status_code}')
+        return {'files': len(files), 'bytes': sum(os.path.getsize(os.path.join(DOWNLOAD_FOLDER_PATH, file)) for file in files)}
+    return run
+
+
+def bench_download_reports(options):
+    import datetime
+    from nse_report.extraction.nse_session import RateLimiter, create_session
+    from nse_report.extraction.nse_data_fetcher import COMBINED_DATA_PATH, COMBINED_DATA_FILE, FULL_BHAVDATA_PATH, MA_REPORT_PATH
+    from nse_report.extraction.report_downloader import REPORT_TYPES, download_jobs, report_jobs
+    from stub_server import start_stub_server
+
+    # Serve both report folders, the file names do not overlap
+    served_path = 'data/benchmark_served/'
+    os.makedirs(served_path, exist_ok=True)
+    for folder_path in [FULL_BHAVDATA_PATH, MA_REPORT_PATH]:
+        for file in list_files(folder_path):
+            if not os.path.exists(os.path.join(served_path, file)):
+                os.link(os.path.join(folder_path, file), os.path.join(served_path, file))
+
+    server, base_url = start_stub_server(os.path.join(COMBINED_DATA_PATH, COMBINED_DATA_FILE), served_path,
+                                         latency=options['latency'])
+    report_types = {report_type: {**report, 'url': report['url'].replace('https://archives.nseindia.com', base_url),
+                                  'folder': DOWNLOAD_FOLDER_PATH}
+                    for report_type, report in REPORT_TYPES.items()}
+
+    # The same number of files as download_files, a day's reports at a time
+    dates = [datetime.datetime.strptime(file[-12:-4], '%d%m%Y') for file in list_files(FULL_BHAVDATA_PATH)]
+    jobs = [job for date in dates for job in report_jobs(date, report_types)][:options['download_files']]
+    session = create_session(pool_size=options['concurrency'], base_url=base_url)
+    rate_limiter = RateLimiter(options['rate_limit'])
+
+    def run():
+        status_codes = download_jobs(session, jobs, options['concurrency'], rate_limiter)
+        failed = [url for url, status_code in status_codes.items() if status_code != 200]
+        if failed:
+            raise RuntimeError(f'Downloads failed: {failed}')
+        return {'files': len(jobs), 'bytes': sum(os.path.getsize(job['file_path']) for job in jobs)}
+    return run
+
+
+def bench_price_matrix_queries(options):
+    from nse_report.integration import data_preprocessing
+    from nse_report.integration.matrix_store import PriceMatrixStore
+
+    # The matrices are built by the Bhavdata cleaning
+    if not PriceMatrixStore(data_preprocessing.PRICE_MATRIX_FOLDER_PATH).exists():
+        data_preprocessing.clean_bhavdata_files(full_rebuild=True)
+
+    def run():
+        # Every date's cross section, 100 symbol histories and the 1W change of every symbol
+        matrix_store = PriceMatrixStore(data_preprocessing.PRICE_MATRIX_FOLDER_PATH)
+        rows = 0
+        for date in matrix_store.dates:
+            rows += int(matrix_store.cross_section(date).count())
+        for symbol in matrix_store.symbols[:100]:
+            rows += int(matrix_store.history(symbol, 'DELIV_QTY').count())
+        rows += int(matrix_store.percent_change(5).count().sum())
+        return {'rows': rows}
+    return run
+
+
+def bench_sector_aggregates(options):
+    from nse_report.integration import data_preprocessing
+    from nse_report.integration.storage import CsvStore
+
+    # The aggregates are computed from the staged Bhavdata and MA report
+    staging_store = CsvStore(data_preprocessing.STAGING_FOLDER_PATH)
+    if not staging_store.exists('sec_bhavdata_full_combined'):
+        data_preprocessing.clean_bhavdata_files(full_rebuild=True)
+    if not staging_store.exists('ma_report_combined'):
+        data_preprocessing.clean_ma_report_files(full_rebuild=True)
+
+    def run():
+        sector_returns_df = data_preprocessing.create_sector_aggregates()
+        return {'rows': int(sector_returns_df['CONSTITUENTS'].sum())}
+    return run
+
+
+# The order matters: the incremental run and the dimensions use the staged data of the full runs
+BENCHMARKS = {
+    'clean_bhavdata': bench_clean_bhavdata,
+    'clean_bhavdata_incremental': bench_clean_bhavdata_incremental,
+    'clean_ma_report': bench_clean_ma_report,
+    'create_dimensions': bench_create_dimensions,
+    'is_holiday': bench_is_holiday,
+    'fetch_sector_data': bench_fetch_sector_data,
+    'download_files': bench_download_files,
+    'download_reports': bench_download_reports,
+    'price_matrix_queries': bench_price_matrix_queries,
+    'sector_aggregates': bench_sector_aggregates,
+}
+
+
+def run_benchmark(name, data_path, options):
+    """
+    This function runs a benchmark in the data folder, `repeat` times after
+    its setup, and returns its result: the best time, the throughput of the
+    best run and the peak RSS of the process. It is run in a fresh process
+    per benchmark, so the peak RSS is the benchmark's own.
+    """
+
+    # The scripts use paths relative to the repository root
+    os.chdir(data_path)
+    sys.path.extend([SRC_PATH, BENCHMARKS_PATH])
+
+    run = BENCHMARKS[name](options)
+
+    best_seconds, counts = None, {}
+    for _ in range(options['repeat']):
+        start = time.perf_counter()
+        counts = run()
+        seconds = time.perf_counter() - start
+        best_seconds = seconds if best_seconds is None else min(best_seconds, seconds)
+
+    result = {'seconds': round(best_seconds, 4)}
+    for unit in ['rows', 'files', 'bytes']:
+        result[unit] = counts.get(unit, 0)
+        result[f'{unit}_per_s'] = round(counts.get(unit, 0) / best_seconds, 2)
+    result['peak_rss_mb'] = round(peak_rss_mb() or 0, 1)
+    return result
+
+
+def compare(results, baseline, threshold):
+    """
+    This function compares the times with a baseline and returns the names of
+    the benchmarks slower than the baseline by more than `threshold` (a ratio).
+    """
+
+    regressions = []
+    for name, result in results.items():
+        baseline_result = baseline['results'].get(name)
+        if baseline_result is None:
+            continue
+        change = result['seconds'] / baseline_result['seconds'] - 1
+        result['baseline_seconds'] = baseline_result['seconds']
+        result['change'] = round(change, 3)
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def print_results(results, regressions):
+    print(f"{'benchmark':<28}{'seconds':>10}{'rows/s':>14}{'files/s':>10}{'MB/s':>9}{'peak RSS':>12}{'vs baseline':>13}")
+    for name, result in results.items():
+        change = f"{result['change']:+.1%}" if 'change' in result else ''
+        flag = '  REGRESSION' if name in regressions else ''
+        print(f"{name:<28}{result['seconds']:>10.3f}{result['rows_per_s']:>14,.0f}{result['files_per_s']:>10.1f}"
+              f"{result['bytes_per_s'] / 1024 ** 2:>9.1f}"
+              f"{result['peak_rss_mb']:>9.1f} MB{change:>13}{flag}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the extraction and preprocessing hot paths on synthetic NSE data.')
+    parser.add_argument('--days', type=int, default=60, help='Number of trading days generated')
+    parser.add_argument('--symbols', type=int, default=2500, help='Number of symbols per bhavcopy file')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs of every benchmark, the best is kept')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), metavar='BENCHMARK',
+                        help=f"Benchmarks to run, among: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--calls', type=int, default=100000, help='Number of is_holiday calls')
+    parser.add_argument('--latency', type=float, default=0.005, help='Latency of the stub server, in seconds')
+    parser.add_argument('--concurrency', type=int, default=8, help='Number of sectors fetched at once')
+    parser.add_argument('--rate-limit', type=float, default=1000.0, help='Maximum number of requests per second')
+    parser.add_argument('--download-files', type=int, default=20, help='Number of archive files downloaded')
+    parser.add_argument('--data-dir', help='Generate the data in this folder and keep it, instead of a temporary folder')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help='Baseline results to compare with')
+    parser.add_argument('--save-baseline', action='store_true', help='Save the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Slowdown ratio over the baseline reported as a regression')
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    This function generates the synthetic data, runs the benchmarks and
+    compares them with the baseline. It returns the exit code: 1 when a
+    benchmark regressed, 0 otherwise.
+    """
+
+    args = parse_args(argv)
+    options = {key: getattr(args, key) for key in ['repeat', 'calls', 'latency', 'concurrency', 'rate_limit', 'download_files']}
+    config = {'days': args.days, 'symbols': args.symbols, 'seed': args.seed, **options}
+    names = [name for name in BENCHMARKS if args.only is None or name in args.only]
+
+    with tempfile.TemporaryDirectory() as temp_path:
+        data_path = os.path.abspath(args.data_dir or temp_path)
+        generate(data_path, args.days, args.symbols, seed=args.seed)
+
+        results = {}
+        context = multiprocessing.get_context('spawn')
+        for name in names:
+            # A fresh process per benchmark, for its own peak RSS and cold caches
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                results[name] = executor.submit(run_benchmark, name, data_path, options).result()
+
+    regressions = []
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline['config'] != config:
+            print(f'Warning: the baseline was measured with {baseline["config"]}')
+        regressions = compare(results, baseline, args.threshold)
+
+    print_results(results, regressions)
+
+    report = {'config': config, 'machine': platform.platform(), 'python': platform.python_version(), 'results': results}
+    for path in [args.baseline if args.save_baseline else None, args.output]:
+        if path:
+            with open(path, 'w') as file:
+                json.dump(report, file, indent=2)
+
+    if regressions:
+        print(f"Regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import http.client
+from urllib.parse import urlencode
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from synthetic_data import generate
+
+# Constants
+DEFAULT_BUDGET_MS = 1.0
+
+
+def latency_percentiles(latencies_ns):
+    """
+    This function returns the p50, p99 and maximum of latencies, in microseconds.
+    """
+
+    latencies_us = np.asarray(latencies_ns) / 1000
+    return {'queries': len(latencies_us), 'p50_us': round(float(np.percentile(latencies_us, 50)), 1),
+            'p99_us': round(float(np.percentile(latencies_us, 99)), 1), 'max_us': round(float(latencies_us.max()), 1)}
+
+
+def measure(run_query, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter_ns()
+        run_query(*query)
+        latencies.append(time.perf_counter_ns() - start)
+    return latency_percentiles(latencies)
+
+
+def build_workload(index, count, distinct, seed):
+    """
+    This function draws `count` queries (sector, horizon, side, date, n)
+    among `distinct` different ones, the most recent dates being the most
+    queried, as for a dashboard.
+    """
+
+    from nse_report.integration.top_movers import HORIZON_NAMES, SIDES
+
+    rng = np.random.default_rng(seed)
+    dates = np.unique(np.concatenate([days for days, _, _ in index.rankings.values()]))
+    recent = np.minimum(rng.geometric(0.2, distinct) - 1, len(dates) - 1)
+    pool = [(str(rng.choice(index.sectors)), str(rng.choice(HORIZON_NAMES)), str(rng.choice(SIDES)),
+             str(dates[len(dates) - 1 - offset]), int(rng.choice([5, 10, 20])))
+            for offset in recent]
+    return [pool[position] for position in rng.integers(0, len(pool), count)]
+
+
+def http_query(port):
+    def run_query(sector, horizon, side, date, n):
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        connection.request('GET', '/top-movers?' + urlencode({'sector': sector, 'horizon': horizon, 'side': side,
+                                                             'date': date, 'n': n}))
+        response = connection.getresponse()
+        response.read()
+        connection.close()
+        if response.status not in (200, 404):
+            raise RuntimeError(f'HTTP {response.status}')
+    return run_query
+
+
+def ignore_missing(run_query):
+    # Dates before the first ranking of a sector and horizon are answered with KeyError
+    def run(*query):
+        try:
+            run_query(*query)
+        except KeyError:
+            pass
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the latency of the top gainers/losers queries on synthetic data.')
+    parser.add_argument('--days', type=int, default=250, help='Number of trading days generated')
+    parser.add_argument('--symbols', type=int, default=2500, help='Number of symbols per bhavcopy file')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--queries', type=int, default=20000, help='Number of library queries per mode')
+    parser.add_argument('--distinct', type=int, default=2000, help='Number of different queries in the workload')
+    parser.add_argument('--http-queries', type=int, default=1000, help='Number of HTTP queries')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help='Maximum p99 latency of an uncached library query, in milliseconds')
+    parser.add_argument('--data-dir', help='Generate the data in this folder and keep it, instead of a temporary folder')
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+    output_path = args.output and os.path.abspath(args.output)
+    previous_path = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as temp_path:
+        data_path = os.path.abspath(args.data_dir or temp_path)
+        generate(data_path, args.days, args.symbols, seed=args.seed)
+
+        # The modules use paths relative to the data folder
+        os.chdir(data_path)
+        from nse_report.integration import data_preprocessing
+        from nse_report.integration.query_service import TopMoversService, create_server
+
+        start = time.perf_counter()
+        if data_preprocessing.main([]) != 0:
+            print('FAILED: the preprocessing failed, see logs/data_processing.log')
+            return 1
+        preprocess_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        uncached_service = TopMoversService(cache_size=0)
+        load_seconds = time.perf_counter() - start
+        service = TopMoversService()
+
+        queries = build_workload(service.index, args.queries, args.distinct, args.seed)
+        results = {'uncached': measure(ignore_missing(uncached_service.query), queries)}
+
+        # The cache is warmed by a first pass over the workload
+        measure(ignore_missing(service.query), queries)
+        results['cached'] = measure(ignore_missing(service.query), queries)
+
+        server = create_server(TopMoversService(), port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            results['http'] = measure(http_query(server.server_address[1]), queries[:args.http_queries])
+        finally:
+            server.shutdown()
+            server.server_close()
+            os.chdir(previous_path)
+
+    print(f'{"preprocessing":<12}{preprocess_seconds:>10.2f} s')
+    print(f'{"index load":<12}{load_seconds:>10.3f} s ({len(service.index.symbols)} ranked rows)')
+    print(f'{"mode":<12}{"queries":>10}{"p50":>12}{"p99":>12}{"max":>12}')
+    for mode, result in results.items():
+        print(f'{mode:<12}{result["queries"]:>10}{result["p50_us"]:>10.1f}us{result["p99_us"]:>10.1f}us{result["max_us"]:>10.1f}us')
+
+    if output_path:
+        with open(output_path, 'w') as file:
+            json.dump({'config': vars(args), 'preprocess_seconds': round(preprocess_seconds, 3),
+                       'load_seconds': round(load_seconds, 3), 'results': results}, file, indent=2)
+
+    if results['uncached']['p99_us'] > args.budget_ms * 1000:
+        print(f'FAILED: the p99 latency of an uncached query is {results["uncached"]["p99_us"] / 1000:.3f} ms, '
+              f'over the {args.budget_ms} ms budget')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from urllib.parse import parse_qs, unquote, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+
+# Recorded responses of the sector constituents API, in <fixtures>/equity-stockIndices/<INDEX_NAME>.json
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+API_FIXTURE_FOLDER = 'equity-stockIndices'
+
+# Scripted failure sending half of the body before dropping the connection
+TRUNCATED = 'truncated'
+
+
+def fixture_file_name(index_name):
+    return index_name.replace(' ', '_') + '.json'
+
+
+class NseStubHandler(BaseHTTPRequestHandler):
+    """
+    This class answers the requests of the extraction scripts like NSE does:
+    the home page, the sector constituents API (from a sector list file, or
+    the recorded JSON responses of a fixtures folder) and the archive files
+    (any other path, served by file name from a folder).
+    Every response is delayed by the server `latency`, in seconds. The
+    scripted failures of an index or file name are answered first, in order,
+    as NSE does when the session has no cookies (401), when throttling (429)
+    or on server errors (5xx); a TRUNCATED failure drops the connection in
+    the middle of the body.
+    Connections are kept alive between requests, as with HTTP/1.1 servers.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are sent separately, which Nagle's algorithm delays on a kept-alive connection
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        index_name = unquote(parse_qs(url.query).get('index', [''])[0])
+        name = index_name if url.path == '/api/equity-stockIndices' else os.path.basename(url.path) or '/'
+
+        request = self.server.begin(name)
+        try:
+            time.sleep(self.server.latency)
+            request['status'] = self.respond(url, name, index_name)
+        finally:
+            self.server.end(request)
+
+    def respond(self, url, name, index_name):
+        """
+        This function answers a request. It returns the HTTP status code
+        sent, or TRUNCATED.
+        """
+
+        failure = self.server.next_failure(name)
+        if failure is not None and failure != TRUNCATED:
+            self.send_error(failure)
+            return failure
+        truncated = failure == TRUNCATED
+
+        if url.path == '/':
+            self.send_body(b'', 'text/html', truncated)
+        elif url.path == '/api/equity-stockIndices':
+            if self.server.fixtures_path is not None:
+                fixture_path = os.path.join(self.server.fixtures_path, API_FIXTURE_FOLDER, fixture_file_name(index_name))
+                if not os.path.isfile(fixture_path):
+                    self.send_error(404)
+                    return 404
+                with open(fixture_path, 'rb') as file:
+                    self.send_body(file.read(), 'application/json', truncated)
+                return failure or 200
+
+            symbols = self.server.constituents.get(index_name)
+            if symbols is None:
+                self.send_error(404)
+                return 404
+            # The first row is the index itself, with priority 1
+            data = [{'priority': 1, 'symbol': index_name}] + [{'priority': 0, 'symbol': symbol} for symbol in symbols]
+            self.send_body(json.dumps({'data': data}).encode(), 'application/json', truncated)
+        else:
+            file_path = os.path.join(self.server.files_path or '', name)
+            if self.server.files_path is None or not os.path.isfile(file_path):
+                self.send_error(404)
+                return 404
+            with open(file_path, 'rb') as file:
+                self.send_body(file.read(), 'text/csv', truncated)
+        return failure or 200
+
+    def send_body(self, body, content_type, truncated=False):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if truncated:
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+        else:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class NseStubServer(ThreadingHTTPServer):
+    """
+    This class is the stub server, one thread per connection. It logs every
+    request (name, status, start and end times) in `requests` and keeps the
+    largest number of requests answered at once in `max_in_flight`.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, constituents, files_path=None, latency=0.0, fixtures_path=None, failures=None):
+        super().__init__(('127.0.0.1', 0), NseStubHandler)
+        self.constituents = constituents
+        self.files_path = files_path
+        self.latency = latency
+        self.fixtures_path = fixtures_path
+        self.failures = {name: deque(status_codes) for name, status_codes in (failures or {}).items()}
+        self.requests = []
+        self.in_flight = self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def begin(self, name):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            request = {'name': name, 'status': None, 'start': time.monotonic(), 'end': None}
+            self.requests.append(request)
+        return request
+
+    def end(self, request):
+        with self.lock:
+            self.in_flight -= 1
+            request['end'] = time.monotonic()
+
+    def next_failure(self, name):
+        with self.lock:
+            status_codes = self.failures.get(name)
+            return status_codes.popleft() if status_codes else None
+
+    def requests_of(self, name):
+        with self.lock:
+            return [request for request in self.requests if request['name'] == name]
+
+
+def start_stub_server(sector_list_path=None, files_path=None, latency=0.0, fixtures_path=None, failures=None):
+    """
+    This function starts the stub server on a free local port, in a daemon thread.
+    The sector names of the API are the index names of the sector list
+    (e.g. 'NIFTY 50'), so it must be queried with a sector index whose values
+    are the URL-encoded sector names. With `fixtures_path` (e.g. FIXTURES_PATH),
+    the API answers the recorded responses instead, by NSE index name
+    (e.g. 'NIFTY%20BANK'). `failures` maps an index or file name to the
+    status codes (or TRUNCATED) answered to its first requests.
+    It returns the server and its base URL; call `server.shutdown()` to stop it.
+    """
+
+    constituents = {}
+    if sector_list_path is not None:
+        sector_list_df = pd.read_csv(sector_list_path)
+        constituents = sector_list_df.groupby('SECTOR', sort=False)['SYMBOL'].apply(list).to_dict()
+
+    server = NseStubServer(constituents, files_path, latency, fixtures_path, failures)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
@@ -0,0 +1,203 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+# Series of the securities that are not kept by the cleaning (no delivery data)
+OTHER_SERIES = ['BE', 'BZ', 'SM']
+
+# Sectors of the sector list, as in nse_data_fetcher.SECTOR_INDEX
+SECTOR_NAMES = ['NIFTY 50', 'NIFTY NEXT 50', 'NIFTY MIDCAP 50', 'NIFTY AUTO', 'NIFTY BANK', 'NIFTY ENERGY',
+                'NIFTY FIN SERVICE', 'NIFTY FMCG', 'NIFTY IT', 'NIFTY MEDIA', 'NIFTY METAL', 'NIFTY PHARMA',
+                'NIFTY PSU BANK', 'NIFTY REALTY', 'NIFTY PVT BANK', 'NIFTY HEALTHCARE', 'NIFTY CONSR DURBL',
+                'NIFTY OIL AND GAS', 'NIFTY COMMODITIES', 'NIFTY CONSUMPTION', 'NIFTY CPSE', 'NIFTY INFRA',
+                'NIFTY MNC', 'NIFTY PSE', 'NIFTY SERV SECTOR']
+
+# Weekday exchange holidays of every year (month, day)
+EXCHANGE_HOLIDAYS = [(1, 26), (3, 8), (4, 14), (5, 1), (8, 15), (10, 2), (11, 12), (12, 25)]
+
+# Indices of the market activity report index table
+INDEX_NAMES = ['Nifty 50', 'Nifty Next 50', 'Nifty Midcap 50', 'Nifty Auto', 'Nifty Bank', 'Nifty Energy',
+               'Nifty Fin Service', 'Nifty FMCG', 'Nifty IT', 'Nifty Media', 'Nifty Metal', 'Nifty Pharma',
+               'Nifty PSU Bank', 'Nifty Realty', 'Nifty Pvt Bank'] + [f'Nifty Index {i}' for i in range(56)]
+
+
+def exchange_holidays(first_year, last_year):
+    """
+    This function returns the weekday exchange holidays of the years.
+    """
+
+    holidays = pd.to_datetime([f'{year}-{month:02d}-{day:02d}' for year in range(first_year, last_year + 1)
+                               for month, day in EXCHANGE_HOLIDAYS])
+    return holidays[holidays.weekday < 5]
+
+
+def trading_days(first_day, days):
+    """
+    This function returns the first `days` trading days from `first_day`:
+    weekdays that are not exchange holidays.
+    """
+
+    first_year = pd.Timestamp(first_day).year
+    # Generous upper bound of the years spanned
+    holidays = exchange_holidays(first_year, first_year + days // 200 + 1)
+    return pd.bdate_range(first_day, periods=days, freq='C', holidays=holidays)
+
+
+def symbols(count):
+    return [f'SYM{i:05d}' for i in range(count)]
+
+
+def write_bhavdata_files(folder_path, dates, symbol_list, seed=0, other_series_ratio=0.05):
+    """
+    This function writes one sec_bhavdata_full_DDMMYYYY.csv file per date, in the
+    NSE layout (space padded header and values, '-' for missing delivery data).
+    Prices follow a random walk per symbol, so the files are deterministic for a seed.
+    """
+
+    os.makedirs(folder_path, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    symbol_array = np.array(symbol_list)
+    prices = rng.uniform(20, 5000, len(symbol_list)).round(2)
+    header = ('SYMBOL, SERIES, DATE1, PREV_CLOSE, OPEN_PRICE, HIGH_PRICE, LOW_PRICE, LAST_PRICE, CLOSE_PRICE, '
+              'AVG_PRICE, TTL_TRD_QNTY, TURNOVER_LACS, NO_OF_TRADES, DELIV_QTY, DELIV_PER')
+
+    for date in dates:
+        previous_prices = prices
+        prices = (prices * (1 + rng.normal(0, 0.02, len(prices)))).round(2).clip(1)
+        quantities = rng.integers(1000, 5_000_000, len(prices))
+        delivery = (quantities * rng.uniform(0.1, 0.9, len(prices))).astype(np.int64)
+        date_str = date.strftime('%d-%b-%Y')
+
+        df = pd.DataFrame({
+            'SYMBOL': symbol_array,
+            'SERIES': 'EQ',
+            'DATE1': date_str,
+            'PREV_CLOSE': previous_prices,
+            'OPEN_PRICE': previous_prices,
+            'HIGH_PRICE': np.maximum(previous_prices, prices),
+            'LOW_PRICE': np.minimum(previous_prices, prices),
+            'LAST_PRICE': prices,
+            'CLOSE_PRICE': prices,
+            'AVG_PRICE': ((previous_prices + prices) / 2).round(2),
+            'TTL_TRD_QNTY': quantities,
+            'TURNOVER_LACS': (quantities * prices / 1e5).round(2),
+            'NO_OF_TRADES': quantities // 50,
+            'DELIV_QTY': delivery.astype(str),
+            'DELIV_PER': (delivery / quantities * 100).round(2).astype(str),
+        })
+
+        # A few securities in other series, without delivery data
+        other = df.sample(frac=other_series_ratio, random_state=int(rng.integers(1 << 31))).copy()
+        other['SERIES'] = rng.choice(OTHER_SERIES, len(other))
+        other['DELIV_QTY'] = '-'
+        other['DELIV_PER'] = '-'
+        df = pd.concat([df, other]).sort_values(['SYMBOL', 'SERIES'], kind='mergesort')
+
+        file_path = os.path.join(folder_path, f"sec_bhavdata_full_{date.strftime('%d%m%Y')}.csv")
+        lines = [header] + [', '.join(row) for row in df.astype(str).itertuples(index=False, name=None)]
+        with open(file_path, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+
+
+def write_ma_report_files(folder_path, dates, index_names=INDEX_NAMES, seed=0):
+    """
+    This function writes one MADDMMYY.csv market activity report per date: a title,
+    a summary section, the index table and the advances/declines and top gainers sections.
+    """
+
+    os.makedirs(folder_path, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    closes = rng.uniform(2000, 50000, len(index_names)).round(2)
+
+    for date in dates:
+        previous_closes = closes
+        closes = (closes * (1 + rng.normal(0, 0.01, len(closes)))).round(2)
+        advances = int(rng.integers(0, 50))
+
+        lines = ['NATIONAL STOCK EXCHANGE OF INDIA LIMITED',
+                 f'"MARKET ACTIVITY REPORT FOR {date.strftime("%d-%b-%Y").upper()}"',
+                 '',
+                 'Summary',
+                 'Category,Value',
+                 f'Turnover,{rng.uniform(1e4, 1e5):.2f}',
+                 f'Trades,{int(rng.integers(1e6, 1e7))}',
+                 '',
+                 ',INDEX,PREVIOUS CLOSE,OPEN,HIGH,LOW,CLOSE,GAIN/LOSS']
+        for name, previous_close, close in zip(index_names, previous_closes, closes):
+            lines.append(f',{name},{previous_close:.2f},{previous_close:.2f},{max(previous_close, close):.2f},'
+                         f'{min(previous_close, close):.2f},{close:.2f},{(close / previous_close - 1) * 100:.2f}')
+        lines += ['',
+                  'Advances/Declines',
+                  'INDEX,ADVANCES,DECLINES,UNCHANGED',
+                  f'NIFTY 50,{advances},{50 - advances},0',
+                  '',
+                  'Top Gainers',
+                  'SYMBOL,SERIES,CLOSE,GAIN(%)',
+                  f'SYM00001,EQ,{rng.uniform(10, 1000):.2f},{rng.uniform(5, 20):.2f}']
+
+        file_path = os.path.join(folder_path, f"MA{date.strftime('%d%m%y')}.csv")
+        with open(file_path, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+
+
+def write_sector_list(file_path, symbol_list, sector_names=SECTOR_NAMES, seed=0):
+    """
+    This function writes the sector constituents list (combined_data.csv).
+    The NIFTY 50, NEXT 50 and MIDCAP 50 take consecutive blocks of 50 symbols,
+    the other sectors draw 10 to 50 of the first 500 symbols, so a symbol
+    can belong to several sectors.
+    """
+
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    rng = np.random.default_rng(seed)
+    symbol_array = np.array(symbol_list)
+
+    frames = []
+    for position, sector in enumerate(sector_names):
+        if position < 3:
+            members = symbol_array[position * 50:(position + 1) * 50]
+        else:
+            pool = symbol_array[:500]
+            members = np.sort(rng.choice(pool, min(len(pool), int(rng.integers(10, 51))), replace=False))
+        frames.append(pd.DataFrame({'SYMBOL': members, 'SECTOR': sector}))
+
+    pd.concat(frames, ignore_index=True).to_csv(file_path, index=False)
+
+
+def write_holiday_file(file_path, first_year, last_year):
+    """
+    This function writes the trading holiday file (weekends and exchange
+    holidays) in the layout of nse_holiday_fetcher.
+    """
+
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    all_days = pd.date_range(f'{first_year}-01-01', f'{last_year}-12-31')
+    holidays = all_days[all_days.weekday >= 5].union(exchange_holidays(first_year, last_year))
+    pd.DataFrame({'HolidayDate': holidays.strftime('%d-%b-%Y')}).to_csv(file_path, index=False)
+
+
+def generate(root_path, days=250, symbol_count=2500, first_day='2023-01-02', seed=0):
+    """
+    This function writes a synthetic data folder with the layout of `data/` under `root_path`:
+    the daily bhavcopy and MA report files, the sector list and the holiday calendar.
+    """
+
+    dates = trading_days(first_day, days)
+    symbol_list = symbols(symbol_count)
+    write_bhavdata_files(os.path.join(root_path, 'data/raw/sec_bhavdata_full'), dates, symbol_list, seed)
+    write_ma_report_files(os.path.join(root_path, 'data/raw/ma_report'), dates, seed=seed)
+    write_sector_list(os.path.join(root_path, 'data/raw/sector_list/combined_data.csv'), symbol_list, seed=seed)
+    write_holiday_file(os.path.join(root_path, 'data/raw/holiday_data/trading_holiday.csv'), dates[0].year, dates[-1].year)
+    os.makedirs(os.path.join(root_path, 'logs'), exist_ok=True)
+    return dates
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic NSE files.')
+    parser.add_argument('root_path', help='Folder in which data/raw/... is created')
+    parser.add_argument('--days', type=int, default=250)
+    parser.add_argument('--symbols', type=int, default=2500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate(args.root_path, args.days, args.symbols, seed=args.seed)
@@ -1,52 +1,301 @@
-import subprocess
 import os
+import sys
+import json
+import time
 import logging
+import argparse
+import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 # Set up logging
+# The stages run in this process, so their logs are written to this file too
 log_file = 'logs/script_execution.log'
 logging.basicConfig(filename=log_file, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Define the paths to the scripts
-NSE_DATA_FETCHER = "src/extraction/nse_data_fetcher.py"
-DATA_PREPROCESSING = "src/integration/data_preprocessing.py"
+from nse_report.extraction.nse_session import create_session
+from nse_report.extraction.http_cache import DownloadCache
+from nse_report.extraction.nse_holiday_fetcher import fetch_trading_holiday_data
+from nse_report.extraction.nse_data_fetcher import (DEFAULT_CONCURRENCY, DEFAULT_RATE_LIMIT, download_daily_reports,
+                                                    fetch_sector_list, get_cookie_value)
+from nse_report.integration.storage import STORAGE_BACKENDS, CsvStore, get_store
+from nse_report.integration import data_preprocessing
+from nse_report.integration.data_preprocessing import FACT_UNIVERSES, get_peak_memory_mb
+from nse_report.integration.sector_membership import SectorMembership
+from nse_report.extraction.metrics import PROFILE_MODES, metrics, timer
 
-def run_script(script_path):
-    try:
-        # Log a message to indicate the start of the script execution
-        logging.info(f'Running script: {script_path}')
+# Constants
+PIPELINE_REPORT_PATH = 'logs/pipeline_report.json'
+DEFAULT_STAGE_WORKERS = 2
+
+
+class Stage:
+    """
+    A step of the pipeline: `func` is called with the pipeline context and the
+    results of the stages it depends on, by stage name.
+    """
+
+    def __init__(self, name, func, dependencies=()):
+        self.name = name
+        self.func = func
+        self.dependencies = list(dependencies)
+
+
+def run_stage(stage, context, results):
+    """
+    This function runs a single stage and measures its wall time and the
+    peak memory of the process. Stages running at the same time share the
+    process, so the peak memory is the peak reached by the run so far.
+    It returns the stage result and its report entry.
+    """
+
+    logging.info(f'Running stage: {stage.name}')
+    start_time = time.perf_counter()
+    peak_memory_before = get_peak_memory_mb()
+
+    with timer('stage', stage=stage.name), metrics.profiled():
+        result = stage.func(context, {name: results[name] for name in stage.dependencies})
+
+    report = {
+        'stage': stage.name,
+        'status': 'succeeded',
+        'seconds': round(time.perf_counter() - start_time, 3),
+        'peak_memory_mb': round(get_peak_memory_mb() or 0, 1),
+    }
+    if peak_memory_before is not None:
+        report['peak_memory_growth_mb'] = round(report['peak_memory_mb'] - peak_memory_before, 1)
+    logging.info(f"Stage completed: {stage.name} in {report['seconds']}s")
+    return result, report
+
+
+def run_pipeline(stages, context, workers=DEFAULT_STAGE_WORKERS):
+    """
+    This function runs the stages in dependency order, in this process.
+    A stage starts as soon as all of its dependencies succeeded, so independent
+    stages run at the same time on up to `workers` threads.
+    When a stage fails no new stage is started: the running ones complete and
+    the remaining ones are reported as skipped.
+    It returns the results and the report of every stage, in the order of `stages`.
+    """
+
+    stage_names = {stage.name for stage in stages}
+    for stage in stages:
+        unknown_dependencies = [name for name in stage.dependencies if name not in stage_names]
+        if unknown_dependencies:
+            raise ValueError(f'Stage {stage.name} depends on unknown stages {unknown_dependencies}')
+
+    results = {}
+    reports = {}
+    pending_stages = list(stages)
+    running = {}
+    failed = False
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while pending_stages or running:
+            # Start every stage whose dependencies all succeeded
+            if not failed:
+                for stage in list(pending_stages):
+                    if all(name in results for name in stage.dependencies):
+                        pending_stages.remove(stage)
+                        running[executor.submit(run_stage, stage, context, results)] = stage
+
+            if not running:
+                if pending_stages and not failed:
+                    raise ValueError(f'Dependency cycle between stages {[stage.name for stage in pending_stages]}')
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    results[stage.name], reports[stage.name] = future.result()
+                except Exception as e:
+                    logging.error(f'Stage failed: {stage.name} - {str(e)}')
+                    reports[stage.name] = {'stage': stage.name, 'status': 'failed', 'error': str(e)}
+                    failed = True
+
+    for stage in pending_stages:
+        logging.warning(f'Stage skipped: {stage.name}')
+        reports[stage.name] = {'stage': stage.name, 'status': 'skipped'}
+
+    return results, [reports[stage.name] for stage in stages]
+
+
+# Stages of the daily pipeline
+def holiday_calendar_stage(context, inputs):
+    return fetch_trading_holiday_data(offline=context['args'].offline)
+
+def session_stage(context, inputs):
+    session = create_session(pool_size=max(1, context['args'].concurrency))
+    get_cookie_value(session)
+    return session
 
-        # Run the script using subprocess
-        subprocess.run(["python", script_path], check=True)
+def sector_list_stage(context, inputs):
+    if inputs['holiday_calendar'].is_holiday(datetime.datetime.now()):
+        logging.info('Today is a trading holiday. The sector list will not be fetched.')
+        return None
+    today = datetime.datetime.now().strftime('%d-%b-%Y')
+    return fetch_sector_list(inputs['session'], today, context['args'].concurrency, context['args'].rate_limit)
 
-        # Log a message to indicate successful execution
-        logging.info(f'Script execution completed: {script_path}')
-    
-    except subprocess.CalledProcessError as e:
-        # Log the error message if the script execution fails
-        logging.error(f'Script execution failed: {script_path} - {str(e)}')
-    
-    except Exception as e:
-        # Log any other exceptions that occurred during execution
-        logging.error(f'Error occurred during script execution: {script_path} - {str(e)}')
+def download_stage(context, inputs):
+    calendar = inputs['holiday_calendar']
+    if calendar.is_holiday(datetime.datetime.now()):
+        logging.info('Today is a trading holiday. No data will be fetched.')
+        return {}
+    return download_daily_reports(inputs['session'], DownloadCache())
 
-def main():
+def sector_membership_stage(context, inputs):
+    # Without a freshly fetched list (no extraction, or a holiday), read it from disk
+    if inputs.get('sector_list') is not None:
+        return SectorMembership(inputs['sector_list'])
+    return data_preprocessing.load_sector_membership()
 
+def clean_bhavdata_stage(context, inputs):
+    args = context['args']
+    membership = inputs['sector_membership']
+    if args.streaming:
+        return data_preprocessing.stream_bhavdata_files(context['staging_store'], context['processed_store'],
+                                                        membership, args.universes)
+    return data_preprocessing.clean_bhavdata_files(args.full_rebuild, context['staging_store'],
+                                                   context['processed_store'], membership, context['executor'],
+                                                   args.universes)
+
+def clean_ma_report_stage(context, inputs):
+    args = context['args']
+    return data_preprocessing.clean_ma_report_files(args.full_rebuild, context['staging_store'],
+                                                    context['processed_store'], inputs['sector_membership'],
+                                                    context['executor'])
+
+def dimensions_stage(context, inputs):
+    args = context['args']
+    data_preprocessing.create_dimensions(inputs['clean_bhavdata'], context['processed_store'], args.full_rebuild,
+                                         args.calendar_start, args.calendar_end)
+
+def percent_change_stage(context, inputs):
+    data_preprocessing.create_percent_change_facts(context['args'].full_rebuild, context['processed_store'])
+
+def top_movers_stage(context, inputs):
+    data_preprocessing.create_top_movers(context['staging_store'], context['processed_store'], inputs['sector_membership'],
+                                         full_rebuild=context['args'].full_rebuild)
+
+def sector_aggregates_stage(context, inputs):
+    data_preprocessing.create_sector_aggregates(context['staging_store'], context['processed_store'],
+                                                inputs['sector_membership'])
+
+def export_csv_stage(context, inputs):
+    data_preprocessing.export_csv(context['processed_store'])
+
+
+def build_stages(args):
+    """
+    This function builds the stages of the daily pipeline:
+    holiday calendar, then sector lists and downloads (both skipped on a
+    trading holiday), then the Bhavdata and MA report cleaning (in parallel),
+    then the dimensions, facts and sector aggregates.
+    """
+
+    extraction_stages = [] if args.skip_extraction else [
+        Stage('holiday_calendar', holiday_calendar_stage),
+        Stage('session', session_stage),
+        Stage('sector_list', sector_list_stage, ['holiday_calendar', 'session']),
+        Stage('download', download_stage, ['holiday_calendar', 'session', 'sector_list']),
+    ]
+
+    # The cleaners use the freshly fetched sector list, or read it from disk
+    membership_dependencies = [] if args.skip_extraction else ['sector_list']
+    cleaning_dependencies = ['sector_membership'] + ([] if args.skip_extraction else ['download'])
+
+    stages = extraction_stages + [
+        Stage('sector_membership', sector_membership_stage, membership_dependencies),
+        Stage('clean_bhavdata', clean_bhavdata_stage, cleaning_dependencies),
+        Stage('clean_ma_report', clean_ma_report_stage, cleaning_dependencies),
+        Stage('dimensions', dimensions_stage, ['clean_bhavdata']),
+        Stage('percent_change', percent_change_stage, ['clean_bhavdata', 'clean_ma_report']),
+        Stage('top_movers', top_movers_stage, ['sector_membership', 'clean_bhavdata']),
+        Stage('sector_aggregates', sector_aggregates_stage, ['sector_membership', 'clean_bhavdata', 'clean_ma_report']),
+    ]
+    if args.export_csv and args.storage != CsvStore.name:
+        stages.append(Stage('export_csv', export_csv_stage, ['dimensions', 'percent_change', 'sector_aggregates']))
+    return stages
+
+
+def save_report(reports, report_path=PIPELINE_REPORT_PATH):
+    os.makedirs(os.path.dirname(report_path) or '.', exist_ok=True)
+    with open(report_path, 'w') as file:
+        json.dump(reports, file, indent=2)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run the daily extraction and preprocessing pipeline in one process.')
+    parser.add_argument('--skip-extraction', action='store_true',
+                        help='Only run the preprocessing stages, from the raw files already on disk')
+    parser.add_argument('--offline', action='store_true',
+                        help='Rebuild the holiday calendar from the cached responses only')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='Number of sectors fetched at once')
+    parser.add_argument('--rate-limit', type=float, default=DEFAULT_RATE_LIMIT,
+                        help='Maximum number of requests per second sent to NSE')
+    parser.add_argument('--workers', type=int, default=DEFAULT_STAGE_WORKERS,
+                        help='Number of independent stages run at once')
+    parser.add_argument('--parse-workers', type=int, default=1,
+                        help='Number of processes parsing the raw files during cleaning')
+    parser.add_argument('--full-rebuild', action='store_true',
+                        help='Re-read every raw file instead of only the new or changed ones')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Rebuild the Bhavdata outputs one file at a time, with bounded memory')
+    parser.add_argument('--universes', nargs='+', default=FACT_UNIVERSES, metavar='SECTOR',
+                        help='Index universes whose stocks are kept in the Bhavdata fact, in tagging priority order')
+    parser.add_argument('--storage', choices=sorted(STORAGE_BACKENDS), default='csv',
+                        help='Storage backend for the staged and processed tables')
+    parser.add_argument('--export-csv', action='store_true',
+                        help='Also export the processed tables as CSV (for a non-CSV storage backend)')
+    parser.add_argument('--calendar-start', help='First date of the date dimension (YYYY-MM-DD), when earlier than the data')
+    parser.add_argument('--calendar-end', help='Last date of the date dimension (YYYY-MM-DD), when later than the data')
+    parser.add_argument('--profile', choices=PROFILE_MODES,
+                        help='Also capture a cProfile (per stage, merged) or tracemalloc profile in the metrics file')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """
+    This function runs the pipeline and prints the report of every stage.
+    The timings, counters and optional profile of the run are recorded in
+    its metrics file (logs/metrics/), the stage reports in logs/pipeline_report.json.
+    It returns the exit code: 0 when every stage succeeded, 1 otherwise.
+    """
+
+    args = parse_args(argv)
+
+    context = {
+        'args': args,
+        'staging_store': get_store(args.storage, data_preprocessing.STAGING_FOLDER_PATH),
+        'processed_store': get_store(args.storage, data_preprocessing.PROCESSED_FOLDER_PATH),
+    }
+
+    # Worker processes shared by the two cleaning stages
+    executor = ProcessPoolExecutor(max_workers=args.parse_workers) if args.parse_workers > 1 else None
+    context['executor'] = executor
+
+    metrics.start_run('run_script', args.profile)
+    reports = []
     try:
-        # Define the paths to the scripts
-        nse_data_fetcher_script = NSE_DATA_FETCHER
-        data_preprocessing_script = DATA_PREPROCESSING
+        results, reports = run_pipeline(build_stages(args), context, args.workers)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        succeeded = bool(reports) and all(report['status'] == 'succeeded' for report in reports)
+        metrics.finish_run('succeeded' if succeeded else 'failed')
+    save_report(reports)
+
+    for report in reports:
+        details = f"{report['seconds']:8.2f}s  peak {report['peak_memory_mb']:8.1f} MB" if 'seconds' in report else ''
+        print(f"{report['stage']:<18}{report['status']:<11}{details}")
 
-        # Run nse_data_fetcher.py
-        run_script(nse_data_fetcher_script)
+    if any(report['status'] != 'succeeded' for report in reports):
+        logging.error('Pipeline failed')
+        return 1
 
-        # Run data-preprocessing.py
-        run_script(data_preprocessing_script)
+    logging.info('Pipeline completed')
+    return 0
 
-    except Exception as e:
-        # Log any exceptions or errors that occurred during execution
-        logging.error(f'Error occurred during script execution: {str(e)}')
-    
 if __name__ == '__main__':
 
-    main()
-    
+    sys.exit(main())
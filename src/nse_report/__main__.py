@@ -0,0 +1,4 @@
+import sys
+from nse_report.cli import main
+
+sys.exit(main())
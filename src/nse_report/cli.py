@@ -0,0 +1,57 @@
+import os
+import sys
+import argparse
+import importlib
+from nse_report import __version__
+
+# Subcommands: module whose main() runs the command, arguments passed before the
+# command line ones and help. The modules (and pandas, numpy, requests) are only
+# imported when their command runs, so the help starts without them
+COMMANDS = {
+    'fetch-sectors': ('nse_report.extraction.nse_data_fetcher', ['--steps', 'sectors'],
+                      'Fetch the constituents of the sector indices into the sector list'),
+    'fetch-day': ('nse_report.extraction.nse_data_fetcher', ['--steps', 'reports'],
+                  "Download today's and the previous trading day's reports"),
+    'backfill': ('nse_report.extraction.nse_stock_hist_fetcher', [],
+                 'Download every missing report of a date range'),
+    'holidays': ('nse_report.extraction.nse_holiday_fetcher', [],
+                 'Build the trading holiday calendar'),
+    'preprocess': ('nse_report.integration.data_preprocessing', [],
+                   'Clean the raw files and build the fact and dimension tables'),
+    'serve': ('nse_report.integration.query_service', [],
+              'Serve the top gainers and losers of the sectors over HTTP'),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='nse-report', description='Fetch the NSE reports and build the percent change report tables.',
+                                     epilog="Run 'nse-report COMMAND --help' for the options of a command.")
+    parser.add_argument('--version', action='version', version=f'%(prog)s {__version__}')
+    parser.add_argument('--data-dir', default='.',
+                        help='Folder holding the data/ and logs/ folders (default: the current folder)')
+    subparsers = parser.add_subparsers(dest='command', metavar='COMMAND', required=True)
+    for command, (_, _, help_text) in COMMANDS.items():
+        # The options of a command are parsed by its module
+        subparsers.add_parser(command, help=help_text, add_help=False)
+    return parser
+
+
+def main(argv=None):
+    """
+    This function runs a subcommand: it moves to the data folder, imports
+    the module of the command and runs its main() with the remaining
+    arguments.
+    It returns the exit code of the command.
+    """
+
+    args, command_args = build_parser().parse_known_args(argv)
+    module_name, default_args, _ = COMMANDS[args.command]
+
+    # The modules use paths relative to the data folder and log to logs/ when imported
+    os.chdir(args.data_dir)
+    os.makedirs('logs', exist_ok=True)
+
+    # The command's own parser names it in its usage and help
+    sys.argv[0] = f'nse-report {args.command}'
+    module = importlib.import_module(module_name)
+    return module.main(default_args + command_args) or 0
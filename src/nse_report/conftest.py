@@ -0,0 +1,41 @@
+import os
+import sys
+import pytest
+
+# The NSE stub server lives with the benchmarks
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'benchmarks'))
+
+
+@pytest.fixture
+def data_root(tmp_path, monkeypatch):
+    """
+    This fixture runs a test from an empty data folder, as the scripts
+    expect to be run from the data root (logs/ and data/ paths).
+    """
+
+    for folder_path in ['logs', 'data/raw/sector_list']:
+        os.makedirs(tmp_path / folder_path)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def stub_server():
+    """
+    This fixture starts NSE stub servers (see `start_stub_server`) and stops
+    them after the test.
+    """
+
+    from stub_server import start_stub_server
+
+    servers = []
+
+    def start(*args, **kwargs):
+        server, base_url = start_stub_server(*args, **kwargs)
+        servers.append(server)
+        return server, base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,243 @@
+import os
+import logging
+import hashlib
+import numpy as np
+import pandas as pd
+
+# Constants
+CONSTITUENT_HISTORY_PATH = 'data/raw/sector_list/constituent_history.csv'
+HISTORY_COLUMNS = ['SECTOR', 'SYMBOL', 'VALID_FROM', 'VALID_TO']
+
+# Day number standing for an interval that is still open
+OPEN_END_DAY = np.iinfo(np.int64).max
+
+
+def to_day_numbers(dates):
+    return pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+class ConstituentHistory:
+    """
+    This class is the point-in-time history of the sector constituents.
+    Every (SECTOR, SYMBOL) membership is stored as a validity interval
+    [VALID_FROM, VALID_TO), with an empty VALID_TO while the stock is still
+    a constituent. Recording a snapshot only opens the intervals of the
+    stocks that joined a sector and closes those of the stocks that left,
+    so an unchanged snapshot adds nothing.
+    Dates before the first snapshot use the earliest known membership.
+    """
+
+    def __init__(self, intervals_df=None):
+        if intervals_df is None:
+            intervals_df = pd.DataFrame(columns=HISTORY_COLUMNS)
+        self.intervals = intervals_df[HISTORY_COLUMNS].reset_index(drop=True)
+        self.intervals['SECTOR'] = self.intervals['SECTOR'].astype('str')
+        self.intervals['SYMBOL'] = self.intervals['SYMBOL'].astype('str')
+        self.intervals['VALID_FROM'] = pd.to_datetime(self.intervals['VALID_FROM'])
+        self.intervals['VALID_TO'] = pd.to_datetime(self.intervals['VALID_TO'])
+
+    @classmethod
+    def load(cls, file_path=CONSTITUENT_HISTORY_PATH):
+        """
+        This function loads the history, empty if it was never recorded.
+        """
+
+        if not os.path.exists(file_path):
+            return cls()
+        return cls(pd.read_csv(file_path, dtype={'SECTOR': 'str', 'SYMBOL': 'str'}))
+
+    @classmethod
+    def from_snapshot(cls, snapshot_df, date):
+        history = cls()
+        history.record_snapshot(snapshot_df, date)
+        return history
+
+    def save(self, file_path=CONSTITUENT_HISTORY_PATH):
+        """
+        This function writes the history to disk atomically.
+        """
+
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        temp_path = file_path + '.tmp'
+        intervals_df = self.intervals.sort_values(['SECTOR', 'SYMBOL', 'VALID_FROM'], kind='mergesort')
+        intervals_df.to_csv(temp_path, index=False, date_format='%Y-%m-%d')
+        os.replace(temp_path, file_path)
+        logging.info(f'Constituent history saved to {file_path}')
+
+    @property
+    def empty(self):
+        return self.intervals.empty
+
+    def start_date(self):
+        return None if self.empty else self.intervals['VALID_FROM'].min()
+
+    def last_change_date(self):
+        """
+        This function returns the date of the latest membership change.
+        """
+
+        if self.empty:
+            return None
+        return pd.concat([self.intervals['VALID_FROM'], self.intervals['VALID_TO'].dropna()]).max()
+
+    def changed_since(self, previous_last_change_date):
+        """
+        This function returns the earliest date whose constituents may differ
+        from those of the history as it was when its last change was
+        `previous_last_change_date`: snapshots are only recorded from the last
+        change on. It returns None when every date may differ.
+        """
+
+        if previous_last_change_date is None or self.empty:
+            return None
+        previous_last_change_date = pd.Timestamp(previous_last_change_date)
+        # Dates before the start use the first snapshot, which may have changed
+        if previous_last_change_date <= self.start_date():
+            return None
+        return previous_last_change_date
+
+    def current(self):
+        """
+        This function returns the current constituents (SYMBOL, SECTOR).
+        """
+
+        return self.intervals.loc[self.intervals['VALID_TO'].isna(), ['SYMBOL', 'SECTOR']].reset_index(drop=True)
+
+    def record_snapshot(self, snapshot_df, date):
+        """
+        This function records the constituents observed on `date`. Only the
+        sectors present in the snapshot are updated, so a sector that could
+        not be fetched keeps its constituents.
+        It returns True when the membership changed.
+        """
+
+        date = pd.Timestamp(date).normalize()
+        last_change_date = self.last_change_date()
+        if last_change_date is not None and date < last_change_date:
+            raise ValueError(f'Snapshot of {date:%Y-%m-%d} is older than the last change ({last_change_date:%Y-%m-%d})')
+
+        snapshot_df = snapshot_df[['SECTOR', 'SYMBOL']].dropna()
+        open_mask = self.intervals['VALID_TO'].isna() & self.intervals['SECTOR'].isin(snapshot_df['SECTOR'].unique())
+        open_pairs = set(zip(self.intervals.loc[open_mask, 'SECTOR'], self.intervals.loc[open_mask, 'SYMBOL']))
+        snapshot_pairs = set(zip(snapshot_df['SECTOR'], snapshot_df['SYMBOL']))
+
+        left_pairs = open_pairs - snapshot_pairs
+        joined_pairs = snapshot_pairs - open_pairs
+        if not left_pairs and not joined_pairs:
+            return False
+
+        pairs = list(zip(self.intervals['SECTOR'], self.intervals['SYMBOL']))
+
+        # Close the intervals of the stocks that left
+        close_mask = open_mask & np.array([pair in left_pairs for pair in pairs], dtype=bool)
+        self.intervals.loc[close_mask, 'VALID_TO'] = date
+
+        # A stock that left earlier on the same date is reopened instead of starting a new interval
+        reopen_mask = (self.intervals['VALID_TO'] == date) & np.array([pair in joined_pairs for pair in pairs], dtype=bool)
+        self.intervals.loc[reopen_mask, 'VALID_TO'] = pd.NaT
+        reopened_pairs = {pair for pair, reopened in zip(pairs, reopen_mask) if reopened}
+
+        new_pairs = sorted(joined_pairs - reopened_pairs)
+        new_df = pd.DataFrame(new_pairs, columns=['SECTOR', 'SYMBOL'])
+        new_df['VALID_FROM'] = date
+        new_df['VALID_TO'] = pd.NaT
+
+        # Drop the intervals opened and closed on the same date
+        intervals_df = self.intervals[~(self.intervals['VALID_FROM'] == self.intervals['VALID_TO'])]
+        self.intervals = pd.concat([intervals_df, new_df], ignore_index=True) if new_pairs else intervals_df.reset_index(drop=True)
+
+        logging.info(f'Constituents on {date:%Y-%m-%d}: {len(joined_pairs)} joined, {len(left_pairs)} left')
+        return True
+
+    def _interval_days(self):
+        valid_from = to_day_numbers(self.intervals['VALID_FROM'])
+        valid_to = self.intervals['VALID_TO'].to_numpy().astype('datetime64[D]')
+        valid_to = np.where(np.isnat(valid_to), OPEN_END_DAY, valid_to.astype(np.int64))
+        return valid_from, valid_to
+
+    def tag(self, df, universes):
+        """
+        This function keeps the rows of `df` whose SYMBOL belonged on their DATE
+        to one of `universes` and adds that SECTOR, the first of them for a stock
+        in several. All rows are matched at once: for every universe, the
+        (symbol code, day) keys of the rows are binary searched in the sorted
+        interval start keys.
+        """
+
+        universes = [sector for sector in universes if sector in set(self.intervals['SECTOR'])]
+        symbol_codes, symbols = pd.factorize(df['SYMBOL'])
+        row_days = to_day_numbers(df['DATE'])
+        if not self.empty:
+            row_days = np.maximum(row_days, to_day_numbers([self.start_date()])[0])
+        row_keys = (symbol_codes.astype(np.int64) << 32) | row_days
+
+        valid_from, valid_to = self._interval_days()
+        interval_codes = pd.Index(symbols).get_indexer(self.intervals['SYMBOL'])
+
+        sector_codes = np.full(len(df), -1, dtype=np.int32)
+        # Assign the universes in reverse order, so the first one wins
+        for sector_code in reversed(range(len(universes))):
+            mask = (self.intervals['SECTOR'] == universes[sector_code]).to_numpy() & (interval_codes >= 0)
+            start_keys = (interval_codes[mask].astype(np.int64) << 32) | valid_from[mask]
+            order = np.argsort(start_keys, kind='stable')
+            start_keys, end_days, codes = start_keys[order], valid_to[mask][order], interval_codes[mask][order]
+            if len(start_keys) == 0:
+                continue
+
+            positions = np.searchsorted(start_keys, row_keys, side='right') - 1
+            candidates = np.maximum(positions, 0)
+            matched = (positions >= 0) & (codes[candidates] == symbol_codes) & (row_days < end_days[candidates])
+            sector_codes[matched] = sector_code
+
+        keep = sector_codes >= 0
+        tagged_df = df[keep].copy()
+        tagged_df['SECTOR'] = pd.Categorical.from_codes(sector_codes[keep], categories=universes)
+        return tagged_df
+
+    def memberships(self, df, sectors=None):
+        """
+        This function matches every row of `df` (SYMBOL, DATE) with all the
+        sectors its SYMBOL belonged to on its DATE, among `sectors` (all
+        sectors by default). The rows are sorted once by (symbol code, day)
+        key and every interval selects the contiguous run of keys it covers
+        with two binary searches, so no row is compared with every interval.
+        It returns the row positions, the sector codes of the matched pairs
+        and the sectors the codes refer to.
+        """
+
+        sectors = pd.Index(self.intervals['SECTOR'].unique() if sectors is None else
+                           [sector for sector in sectors if sector in set(self.intervals['SECTOR'])])
+        symbol_codes, symbols = pd.factorize(df['SYMBOL'])
+        row_days = to_day_numbers(df['DATE'])
+        if not self.empty:
+            row_days = np.maximum(row_days, to_day_numbers([self.start_date()])[0])
+        row_keys = (symbol_codes.astype(np.int64) << 32) | row_days
+        order = np.argsort(row_keys, kind='stable')
+        sorted_keys = row_keys[order]
+
+        valid_from, valid_to = self._interval_days()
+        interval_codes = pd.Index(symbols).get_indexer(self.intervals['SYMBOL'])
+        interval_sector_codes = sectors.get_indexer(self.intervals['SECTOR'])
+        mask = (interval_codes >= 0) & (interval_sector_codes >= 0)
+
+        # Open ends are clamped to the largest day of the key, so the key does not overflow
+        start_keys = (interval_codes[mask].astype(np.int64) << 32) | valid_from[mask]
+        end_keys = (interval_codes[mask].astype(np.int64) << 32) | np.minimum(valid_to[mask], 2**32 - 1)
+        starts = np.searchsorted(sorted_keys, start_keys, side='left')
+        counts = np.searchsorted(sorted_keys, end_keys, side='left') - starts
+
+        # Expand every interval into the positions of its run of rows
+        run_offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        row_positions = order[np.arange(counts.sum()) + run_offsets]
+        sector_codes = np.repeat(interval_sector_codes[mask], counts).astype(np.int32)
+        return row_positions, sector_codes, sectors
+
+    def fingerprint(self, universes=None):
+        """
+        This function returns a fingerprint of the intervals of `universes`
+        (all sectors by default), to detect membership changes.
+        """
+
+        intervals_df = self.intervals if universes is None else self.intervals[self.intervals['SECTOR'].isin(universes)]
+        intervals_df = intervals_df.sort_values(['SECTOR', 'SYMBOL', 'VALID_FROM'], kind='mergesort')
+        return hashlib.sha256(intervals_df.to_csv(index=False).encode()).hexdigest()
@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from nse_report.extraction.nse_session import get_with_retry
+from nse_report.extraction.metrics import count
+
+# Constants
+HTTP_CACHE_PATH = 'data/cache/http/'
+DEFAULT_MAX_CACHE_BYTES = 2 * 1024 ** 3
+CHUNK_SIZE = 1024 * 1024
+CHECKPOINT_EVERY = 20
+
+
+def stream_to_file(response, file_path):
+    """
+    This function streams a response body to `file_path` in chunks, through a
+    temporary file renamed in place once complete, so a failed download never
+    leaves a truncated file behind.
+    It returns the SHA-256 hex digest and the size of the body.
+    """
+
+    folder_path = os.path.dirname(file_path) or '.'
+    os.makedirs(folder_path, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+
+    file_descriptor, temp_path = tempfile.mkstemp(dir=folder_path, suffix='.part')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as file:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                file.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    count('bytes_downloaded', size)
+    return digest.hexdigest(), size
+
+
+def copy_into_place(source_file, destination_path):
+    """
+    This function copies an open file to `destination_path` through a
+    temporary file renamed in place, so the destination is never partial.
+    """
+
+    folder_path = os.path.dirname(destination_path) or '.'
+    os.makedirs(folder_path, exist_ok=True)
+
+    file_descriptor, temp_path = tempfile.mkstemp(dir=folder_path, suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as file:
+            shutil.copyfileobj(source_file, file, CHUNK_SIZE)
+        os.replace(temp_path, destination_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+class DownloadCache:
+    """
+    This class is a content-addressed cache of downloaded files, keyed by URL.
+    Bodies are stored once under objects/ by SHA-256 and the index keeps, per URL,
+    the body hash, its validators (ETag, Last-Modified) and whether it is immutable.
+    Immutable entries (past-date archive files) are served without any request,
+    the others are revalidated with a conditional GET. The least recently used
+    entries are evicted when the cache grows over `max_bytes`; bodies are copied to
+    their destination rather than linked, so an eviction frees their space. It can
+    be shared by download threads: entries are looked up and updated under the lock,
+    the copies are made outside of it, and an entry evicted by another thread in the
+    meantime is downloaded again.
+    """
+
+    def __init__(self, cache_path=HTTP_CACHE_PATH, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+        self.cache_path = cache_path
+        self.index_path = os.path.join(cache_path, 'index.json')
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.pending_updates = 0
+        self.index = {}
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as file:
+                self.index = json.load(file)
+
+    def object_path(self, sha256):
+        return os.path.join(self.cache_path, 'objects', sha256[:2], sha256)
+
+    def lookup(self, url):
+        """
+        This function returns the index entry of a URL if its body is still in the cache.
+        """
+
+        with self.lock:
+            entry = self.index.get(url)
+        if entry is not None and os.path.exists(self.object_path(entry['sha256'])):
+            return entry
+        return None
+
+    def fetch(self, session, url, destination_path, immutable=False, rate_limiter=None):
+        """
+        This function places the body of `url` at `destination_path`, from the
+        cache when possible. It returns the HTTP status code (200 for a cache hit).
+        """
+
+        entry = self.lookup(url)
+
+        if entry is not None and (immutable or entry['immutable']):
+            if self._serve(url, entry, destination_path):
+                count('http_cache', result='hit')
+                logging.info(f"Served from cache: {url}")
+                return 200
+            # Evicted since the lookup: download it again
+            entry = None
+
+        status_code = self._download(session, url, destination_path, immutable, rate_limiter, entry)
+        if status_code is None:
+            # Evicted after the conditional request was answered 304: download it unconditionally
+            status_code = self._download(session, url, destination_path, immutable, rate_limiter)
+        return status_code
+
+    def _download(self, session, url, destination_path, immutable, rate_limiter, entry=None):
+        """
+        This function downloads `url` into the cache and places it at
+        `destination_path`, conditionally when the URL has a cached `entry`.
+        It returns the HTTP status code, or None when the body was not
+        modified but its entry was evicted in the meantime.
+        """
+
+        headers = {}
+        if entry is not None and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry is not None and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        with get_with_retry(session, url, rate_limiter, headers=headers, stream=True) as response:
+            if response.status_code == 304 and entry is not None:
+                if not self._serve(url, entry, destination_path):
+                    return None
+                count('http_cache', result='not_modified')
+                logging.info(f"Not modified, served from cache: {url}")
+                return 200
+
+            if response.status_code != 200:
+                return response.status_code
+
+            # Stream the body into the cache, then place it at the destination
+            count('http_cache', result='miss')
+            download_name = f'{hashlib.sha256(url.encode()).hexdigest()}.{threading.get_ident()}'
+            download_path = os.path.join(self.cache_path, 'downloads', download_name)
+            sha256, size = stream_to_file(response, download_path)
+            object_path = self.object_path(sha256)
+            with open(download_path, 'rb') as download_file:
+                copy_into_place(download_file, destination_path)
+
+            # The body is only visible to the eviction once placed and indexed
+            with self.lock:
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                os.replace(download_path, object_path)
+                self._update(url, {
+                    'sha256': sha256,
+                    'size': size,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'immutable': immutable,
+                    'last_access': time.time(),
+                })
+
+        self.evict()
+        return 200
+
+    def _serve(self, url, entry, destination_path):
+        """
+        This function places the cached body of a looked up entry at
+        `destination_path` and marks the entry as used. The body is opened
+        under the lock and copied outside of it: an eviction in the meantime
+        removes its name, but not the open file.
+        It returns False when the entry was evicted or replaced since the lookup.
+        """
+
+        with self.lock:
+            current_entry = self.index.get(url)
+            if current_entry is None or current_entry['sha256'] != entry['sha256']:
+                return False
+            try:
+                object_file = open(self.object_path(entry['sha256']), 'rb')
+            except FileNotFoundError:
+                return False
+            current_entry['last_access'] = time.time()
+            self._record_update()
+
+        with object_file:
+            copy_into_place(object_file, destination_path)
+        return True
+
+    def _update(self, url, entry):
+        # Called with the lock held
+        previous_entry = self.index.get(url)
+        self.index[url] = entry
+        if previous_entry is not None and previous_entry['sha256'] != entry['sha256']:
+            self._remove_unused_object(previous_entry['sha256'])
+        self._record_update()
+
+    def _remove_unused_object(self, sha256):
+        if any(entry['sha256'] == sha256 for entry in self.index.values()):
+            return False
+        try:
+            os.remove(self.object_path(sha256))
+        except FileNotFoundError:
+            pass
+        return True
+
+    def _record_update(self):
+        self.pending_updates += 1
+        if self.pending_updates >= CHECKPOINT_EVERY:
+            self._save()
+
+    def evict(self):
+        """
+        This function removes the least recently used entries until the bodies
+        in the cache fit in `max_bytes`. A body shared by several URLs is only
+        deleted with its last entry.
+        """
+
+        with self.lock:
+            object_sizes = {entry['sha256']: entry['size'] for entry in self.index.values()}
+            total_size = sum(object_sizes.values())
+            if total_size <= self.max_bytes:
+                return
+
+            for url, entry in sorted(self.index.items(), key=lambda item: item[1]['last_access']):
+                if total_size <= self.max_bytes:
+                    break
+                del self.index[url]
+                if self._remove_unused_object(entry['sha256']):
+                    total_size -= entry['size']
+                logging.info(f"Evicted from cache: {url}")
+
+            self._save()
+
+    def save(self):
+        with self.lock:
+            self._save()
+
+    def _save(self):
+        os.makedirs(self.cache_path, exist_ok=True)
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(self.index, file)
+        os.replace(temp_path, self.index_path)
+        self.pending_updates = 0
@@ -0,0 +1,214 @@
+import os
+import io
+import json
+import time
+import pstats
+import cProfile
+import datetime
+import functools
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+# Constants
+METRICS_FOLDER_PATH = 'logs/metrics/'
+PROFILE_MODES = ['cprofile', 'tracemalloc']
+
+# Number of functions or allocation sites kept in the profile records
+PROFILE_TOP = 25
+
+
+class Metrics:
+    """
+    This class records the metrics of a run in a JSON-lines file
+    (logs/metrics/<run_id>.jsonl): one `timer` record per timed block, as
+    soon as it ends, and one `counter` record per counter and labels at the
+    end of the run. Until `start_run` is called nothing is written, so the
+    instrumented functions can be used without a run (e.g. in the worker
+    processes).
+    With `profile='cprofile'` the `profiled` blocks (the pipeline stages)
+    are profiled one at a time and the profiles are merged at the end of
+    the run; with `profile='tracemalloc'` the allocations of the whole run
+    are traced. The top functions or allocation sites are written as
+    `profile` records.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.file = None
+        self.run_id = None
+        self.counters = {}
+        self.profile = None
+        self.profiles = []
+        self.profiled_threads = threading.local()
+        # Held by the block being profiled: since Python 3.12 only one profiler can be active at a time
+        self.profiler_lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self.file is not None
+
+    def start_run(self, name, profile=None, folder_path=METRICS_FOLDER_PATH):
+        """
+        This function starts recording the metrics of a run of `name` (e.g. the script name).
+        It returns the path of the metrics file.
+        """
+
+        if profile is not None and profile not in PROFILE_MODES:
+            raise ValueError(f'Unknown profile mode {profile}, expected one of {PROFILE_MODES}')
+
+        self.run_id = f"{datetime.datetime.now():%Y%m%dT%H%M%S}-{name}-{os.getpid()}"
+        os.makedirs(folder_path, exist_ok=True)
+        metrics_path = os.path.join(folder_path, f'{self.run_id}.jsonl')
+        self.file = open(metrics_path, 'a')
+        self.counters = {}
+        self.profile = profile
+        self.profiles = []
+        if profile == 'tracemalloc':
+            tracemalloc.start()
+
+        self.emit({'type': 'run', 'name': name, 'event': 'start', 'profile': profile})
+        return metrics_path
+
+    def finish_run(self, status='succeeded'):
+        """
+        This function writes the counters and the profile of the run and closes the metrics file.
+        """
+
+        if not self.active:
+            return
+
+        with self.lock:
+            counters = list(self.counters.items())
+        for (name, labels), value in sorted(counters, key=lambda item: (item[0][0], item[0][1])):
+            self.emit({'type': 'counter', 'name': name, **dict(labels), 'value': value})
+
+        if self.profile == 'cprofile' and self.profiles:
+            self._emit_cprofile()
+        elif self.profile == 'tracemalloc':
+            self._emit_tracemalloc()
+
+        self.emit({'type': 'run', 'event': 'finish', 'status': status})
+        with self.lock:
+            self.file.close()
+            self.file = None
+
+    def emit(self, record):
+        """
+        This function appends a record to the metrics file, with the run id and time.
+        """
+
+        if not self.active:
+            return
+        line = json.dumps({'run_id': self.run_id, 'time': datetime.datetime.now().isoformat(timespec='milliseconds'),
+                           **record}, default=str)
+        with self.lock:
+            if self.file is not None:
+                self.file.write(line + '\n')
+                self.file.flush()
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        This function times the enclosed block and records it as a `timer`
+        record with its labels and status ('failed' when it raised).
+        """
+
+        start = time.perf_counter()
+        status = 'succeeded'
+        try:
+            yield
+        except BaseException:
+            status = 'failed'
+            raise
+        finally:
+            if self.active:
+                self.emit({'type': 'timer', 'name': name, **labels,
+                           'seconds': round(time.perf_counter() - start, 6), 'status': status})
+
+    def timed(self, name=None):
+        """
+        This function is a decorator timing every call of the function.
+        """
+
+        def decorator(func):
+            timer_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(timer_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, value=1, **labels):
+        """
+        This function adds `value` to the counter of `name` and `labels`.
+        """
+
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @contextmanager
+    def profiled(self):
+        """
+        This function profiles the enclosed block with cProfile when the run
+        profiles with it. cProfile only profiles the thread that enabled it,
+        and only one profiler can be active in the process (an error since
+        Python 3.12), so a block starting while another thread is profiled
+        runs unprofiled and is counted as `profile_skipped`; a block nested
+        in a profiled block of the same thread is already profiled.
+        """
+
+        if self.profile != 'cprofile' or getattr(self.profiled_threads, 'active', False):
+            yield
+            return
+
+        if not self.profiler_lock.acquire(blocking=False):
+            self.count('profile_skipped')
+            yield
+            return
+
+        try:
+            profiler = cProfile.Profile()
+            self.profiled_threads.active = True
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                self.profiled_threads.active = False
+                with self.lock:
+                    self.profiles.append(profiler)
+        finally:
+            self.profiler_lock.release()
+
+    def _emit_cprofile(self):
+        stats = pstats.Stats(self.profiles[0], stream=io.StringIO())
+        for profiler in self.profiles[1:]:
+            stats.add(profiler)
+        stats.dump_stats(self.file.name.replace('.jsonl', '.prof'))
+
+        top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP]
+        for (file_name, line, function), (_, calls, total_seconds, cumulative_seconds, _) in top:
+            self.emit({'type': 'profile', 'mode': 'cprofile', 'function': f'{file_name}:{line}({function})',
+                       'calls': calls, 'seconds': round(total_seconds, 6), 'cumulative_seconds': round(cumulative_seconds, 6)})
+
+    def _emit_tracemalloc(self):
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        for statistic in snapshot.statistics('lineno')[:PROFILE_TOP]:
+            frame = statistic.traceback[0]
+            self.emit({'type': 'profile', 'mode': 'tracemalloc', 'location': f'{frame.filename}:{frame.lineno}',
+                       'size_mb': round(statistic.size / 1024 ** 2, 3), 'count': statistic.count})
+        self.emit({'type': 'profile', 'mode': 'tracemalloc', 'location': 'peak', 'size_mb': round(peak / 1024 ** 2, 3)})
+
+
+# Metrics of the current run, shared by the extraction and integration modules
+metrics = Metrics()
+timer = metrics.timer
+timed = metrics.timed
+count = metrics.count
@@ -0,0 +1,324 @@
+import os
+import datetime
+import logging
+import argparse
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from nse_report.extraction.nse_session import NSE_URL, RateLimiter, create_session, get_with_retry
+from nse_report.extraction.trading_calendar import get_trading_calendar
+from nse_report.extraction.http_cache import DEFAULT_MAX_CACHE_BYTES, HTTP_CACHE_PATH, DownloadCache
+from nse_report.extraction.report_downloader import (DEFAULT_DOWNLOAD_CONCURRENCY, REPORT_TYPES, download_file, download_jobs,
+                                                     report_jobs)
+from nse_report.extraction.constituent_history import ConstituentHistory
+from nse_report.extraction.metrics import PROFILE_MODES, count, metrics, timed, timer
+
+# Configure logging
+logging.basicConfig(filename='logs/app.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Constants
+COMBINED_DATA_PATH = 'data/raw/sector_list/'
+COMBINED_DATA_FILE = 'combined_data.csv'
+HOLIDAY_DATA_PATH = 'data/raw/holiday_data/trading_holiday.csv'
+FULL_BHAVDATA_PATH = 'data/raw/sec_bhavdata_full/'
+MA_REPORT_PATH = 'data/raw/ma_report/'
+
+# Concurrency settings for fetching the sector constituents
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE_LIMIT = 5.0
+
+# Steps of a run: fetch the sector constituents, download the daily reports
+FETCH_STEPS = ['sectors', 'reports']
+
+# # Variables
+# TODAY = datetime.datetime.now().strftime('%d-%b-%Y')
+
+SECTOR_INDEX = {
+    'NIFTY 50' : 'NIFTY%2050',
+    'NIFTY NEXT 50' : 'NIFTY%20NEXT%2050',
+    'NIFTY MIDCAP 50' : 'NIFTY%20MIDCAP%2050',
+    'NIFTY AUTO' : 'NIFTY%20AUTO',
+    'NIFTY BANK' : 'NIFTY%20BANK',
+    'NIFTY ENERGY' : 'NIFTY%20ENERGY',
+    'NIFTY FIN SERVICE' : 'NIFTY%20FINANCIAL%20SERVICES',
+    'NIFTY FMCG' : 'NIFTY%20FMCG',
+    'NIFTY IT' : 'NIFTY%20IT',
+    'NIFTY MEDIA' : 'NIFTY%20MEDIA',
+    'NIFTY METAL' : 'NIFTY%20METAL',
+    'NIFTY PHARMA': 'NIFTY%20PHARMA',
+    'NIFTY PSU BANK' : 'NIFTY%20PSU%20BANK',
+    'NIFTY REALTY' : 'NIFTY%20REALTY',
+    'NIFTY PVT BANK' : 'NIFTY%20PRIVATE%20BANK',
+    'NIFTY HEALTHCARE' : 'NIFTY%20HEALTHCARE%20INDEX',
+    'NIFTY CONSR DURBL' : 'NIFTY%20CONSUMER%20DURABLES',
+    'NIFTY OIL AND GAS' : 'NIFTY%20OIL%20%26%20GAS',
+    'NIFTY COMMODITIES' : 'NIFTY%20COMMODITIES',
+    'NIFTY CONSUMPTION' : 'NIFTY%20INDIA%20CONSUMPTION',
+    'NIFTY CPSE' : 'NIFTY%20CPSE',
+    'NIFTY INFRA' : 'NIFTY%20INFRASTRUCTURE',
+    'NIFTY MNC' : 'NIFTY%20MNC',
+    'NIFTY PSE' : 'NIFTY%20PSE',
+    'NIFTY SERV SECTOR' : 'NIFTY%20SERVICES%20SECTOR'
+}
+
+def get_cookie_value(session, base_url=NSE_URL):
+    """
+    This function takes a session object as input and sends a
+    GET request to 'https://www.nseindia.com'to retrieve a cookie value.
+    It returns the value of the cookie named 'cookie_name'.
+    """
+    session.get(base_url)
+    return session.cookies.get('cookie_name')
+
+def is_holiday(date):
+    """
+    This function checks if a given date is a holiday using the
+    trading calendar, which reads the trading holiday data only once.
+    It returns a boolean value indicating whether the date is a holiday.
+    """
+
+    return get_trading_calendar(HOLIDAY_DATA_PATH).is_holiday(date)
+
+def get_previous_trading_day():
+    """
+    This function calculates the previous trading day.
+    It returns the previous trading day as a string in the format '%d-%b-%Y'.
+    """
+
+    # current_date = datetime.datetime(2023, 7, 2, 6, 33, 27, 873002)
+    current_date = datetime.datetime.now()
+    previous_day = get_trading_calendar(HOLIDAY_DATA_PATH).previous_trading_day(current_date)
+
+    return previous_day.astype(datetime.date).strftime('%d-%b-%Y')
+
+def fetch_sector_data(session, sector_name, sector_index_value, date, base_url=NSE_URL, rate_limiter=None):
+    """
+    This function fetches sector data by sending a GET request to the NSE API.
+    It takes a session object, sector name, and sector index value as inputs.
+    Throttled or failed requests are retried with jittered backoff.
+    It returns a Pandas DataFrame containing the fetched data for the sector.
+    """
+
+    sector_live_data_url = f'{base_url}/api/equity-stockIndices?index={sector_index_value}'
+    with timer('fetch_sector_data', sector=sector_name):
+        response = get_with_retry(session, sector_live_data_url, rate_limiter)
+
+        if response.status_code == 200:
+            data = response.json().get('data', [])
+            df = pd.DataFrame(data, columns=['priority', 'symbol'])
+            df = df.rename(columns={'symbol': 'SYMBOL'})
+            df = df[df['priority'] != 1].drop('priority', axis=1)
+            df['SECTOR'] = sector_name
+            count('constituent_rows', len(df))
+            logging.info(f"Fetched data for {sector_name} for date {date}")
+            return df
+        else:
+            count('sector_fallbacks')
+            logging.warning(f"Failed to fetch data for {sector_name} for date {date}")
+            return get_last_known_constituents(sector_name)
+
+def get_last_known_constituents(sector_name):
+    """
+    This function returns the last known constituents of a sector, from the
+    constituent history, or from the last saved sector list when the history
+    does not have the sector yet.
+    It returns an empty DataFrame when the sector was never fetched.
+    """
+
+    current_df = ConstituentHistory.load().current()
+    df = current_df[current_df['SECTOR'] == sector_name]
+    if not df.empty:
+        logging.info(f"Using the constituent history for {sector_name}")
+        return df[['SYMBOL', 'SECTOR']].reset_index(drop=True)
+
+    csv_file = os.path.join(COMBINED_DATA_PATH, COMBINED_DATA_FILE)
+    try:
+        df = pd.read_csv(csv_file)
+        df = df[df['SECTOR'] == sector_name]
+        logging.info(f"Using data from {csv_file} for {sector_name}")
+        return df[['SYMBOL', 'SECTOR']].reset_index(drop=True)
+    except FileNotFoundError:
+        logging.warning(f"CSV file not found for {sector_name}")
+        return pd.DataFrame(columns=['SYMBOL', 'SECTOR'])
+        
+def fetch_all_sector_data(session, date, sector_index=SECTOR_INDEX, concurrency=DEFAULT_CONCURRENCY,
+                          rate_limit=DEFAULT_RATE_LIMIT, base_url=NSE_URL):
+    """
+    This function fetches the constituents of every sector in `sector_index`.
+    Up to `concurrency` requests run at once on the shared session, and no more
+    than `rate_limit` requests per second are sent to the host.
+    It returns the list of sector DataFrames, in the order of `sector_index`.
+    """
+
+    rate_limiter = RateLimiter(rate_limit)
+
+    def fetch(sector):
+        sector_name, sector_index_value = sector
+        logging.info(f"Fetching data for {sector_name}...")
+        return fetch_sector_data(session, sector_name, sector_index_value, date, base_url, rate_limiter)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        return list(executor.map(fetch, sector_index.items()))
+
+def combine_sector_data(sector_data):
+    """
+    This function combines a list of sector data DataFrames into a single DataFrame.
+    It takes a list of sector data DataFrames as input and returns the combined DataFrame.
+    """
+
+    return pd.concat(sector_data, ignore_index=True)
+
+def save_to_csv(df, filename, folder_path):
+    """
+    This function saves a DataFrame to a CSV file.
+    It takes a DataFrame, filename, and folder path as inputs
+    and writes the DataFrame to the specified CSV file.
+    """
+
+    file_path = folder_path + filename
+    df.to_csv(file_path, index=False)
+    logging.info(f"Saved data to {file_path}")
+
+def download_csv_file(session, file_url, folder_path, rate_limiter=None, cache=None, immutable=False):
+    """
+    This function downloads a CSV file from a given URL using a session object.
+    It takes the session object, file URL, and folder path as inputs 
+    and saves the downloaded file to the specified folder.
+    The body is streamed to disk and the file replaced atomically. With a
+    `DownloadCache`, immutable files (past-date archives) already cached are not
+    requested again and the others are revalidated with a conditional GET.
+    It returns the HTTP status code of the response.
+
+    """
+    file_name = file_url[file_url.rfind('/')+1:]
+    file_path = os.path.join(folder_path, file_name)
+
+    return download_file(session, file_url, file_path, rate_limiter, cache, immutable)
+    
+@timed()
+def fetch_sector_list(session, date, concurrency=DEFAULT_CONCURRENCY, rate_limit=DEFAULT_RATE_LIMIT):
+    """
+    This function fetches the constituents of every sector, combines them
+    and saves them to the sector list CSV file. The constituent history
+    records the snapshot when the membership changed.
+    It returns the combined data frame.
+    """
+
+    # Fetch sector data
+    sector_data = fetch_all_sector_data(session, date, concurrency=concurrency, rate_limit=rate_limit)
+
+    # Combine sector data
+    combined_df = combine_sector_data(sector_data)
+
+    # Save combined data to CSV
+    save_to_csv(combined_df, COMBINED_DATA_FILE, COMBINED_DATA_PATH)
+    print("Successfully saved the sector - stocks list")
+
+    # Record the constituents of the day, only kept when they changed
+    constituent_history = ConstituentHistory.load()
+    if constituent_history.record_snapshot(combined_df, datetime.datetime.strptime(date, '%d-%b-%Y')):
+        constituent_history.save()
+
+    return combined_df
+
+@timed()
+def download_daily_reports(session, cache=None, concurrency=DEFAULT_DOWNLOAD_CONCURRENCY, report_types=REPORT_TYPES):
+    """
+    This function downloads the daily reports (by default the security-wise
+    full bhavdata and the MA report) of today and of the previous trading day.
+    All the downloads run at once, with up to `concurrency` in flight on the
+    session's keep-alive connections. The previous trading day's files
+    are final, so they are served from the cache when already downloaded.
+    It returns the HTTP status code of each download, by file URL (None when
+    the request failed).
+    """
+
+    today = datetime.datetime.now()
+    previous_trading_day = datetime.datetime.strptime(get_previous_trading_day(), '%d-%b-%Y')
+    jobs = report_jobs(today, report_types) + report_jobs(previous_trading_day, report_types, immutable=True)
+
+    status_codes = download_jobs(session, jobs, concurrency, cache=cache)
+
+    for job in jobs:
+        status_code = status_codes[job['url']]
+        result = 'downloaded successfully' if status_code == 200 else f'failed ({status_code})'
+        print(f"{job['report_type']} of {job['date'].strftime('%d-%b-%Y')} {result}")
+
+    if cache is not None:
+        cache.save()
+
+    return status_codes
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Fetch the sector constituents and the daily NSE reports.')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='Number of sectors fetched at once (1 fetches them one at a time)')
+    parser.add_argument('--rate-limit', type=float, default=DEFAULT_RATE_LIMIT,
+                        help='Maximum number of requests per second sent to NSE')
+    parser.add_argument('--download-concurrency', type=int, default=DEFAULT_DOWNLOAD_CONCURRENCY,
+                        help='Number of daily reports downloaded at once')
+    parser.add_argument('--reports', nargs='+', choices=list(REPORT_TYPES), default=list(REPORT_TYPES),
+                        help='Daily reports to download')
+    parser.add_argument('--cache-dir', default=HTTP_CACHE_PATH, help='Folder of the download cache')
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_MAX_CACHE_BYTES // 1024 ** 2,
+                        help='Size above which the least recently used cached downloads are evicted')
+    parser.add_argument('--steps', nargs='+', choices=FETCH_STEPS, default=FETCH_STEPS,
+                        help='Steps to run: fetch the sector constituents and/or download the daily reports')
+    parser.add_argument('--profile', choices=PROFILE_MODES,
+                        help='Also capture a cProfile or tracemalloc profile of the run in its metrics file')
+    return parser.parse_args(argv)
+
+def fetch_reports(args):
+    """
+    This function initializes a pooled session, primes its cookies,
+    checks if it's a holiday, fetches sector data, combines the data,
+    saves it to a CSV file, and downloads two other CSV files.
+    """
+
+    # Initialize session, shared by all the fetching threads
+    session = create_session(pool_size=max(1, args.concurrency))
+    cache = DownloadCache(args.cache_dir, args.cache_max_mb * 1024 ** 2)
+
+    # Prime the session cookies, required by the NSE endpoints
+    get_cookie_value(session)
+
+    # Check if today is a holiday
+    # today = '03-Jul-2023'
+    today = datetime.datetime.now().strftime('%d-%b-%Y')
+
+    # Fetch, combine and save the sector data
+    if 'sectors' in args.steps:
+        fetch_sector_list(session, today, args.concurrency, args.rate_limit)
+
+    if 'reports' not in args.steps:
+        return
+
+    if is_holiday(today):
+        logging.info("Today is a trading holiday. No data will be fetched.")
+        print('Today is trading holiday, no data will be fetched')
+        return
+
+    # Download today's and the previous trading day's reports
+    report_types = {report_type: REPORT_TYPES[report_type] for report_type in args.reports}
+    download_daily_reports(session, cache, args.download_concurrency, report_types)
+
+def main(argv=None):
+    """
+    This is the main function that orchestrates the execution of the script.
+    The timings, counters and optional profile of the run are recorded in
+    its metrics file (logs/metrics/).
+    """
+
+    args = parse_args(argv)
+
+    metrics.start_run('nse_data_fetcher', args.profile)
+    status = 'failed'
+    try:
+        with metrics.profiled():
+            fetch_reports(args)
+        status = 'succeeded'
+    finally:
+        metrics.finish_run(status)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,159 @@
+import logging
+import argparse
+import pandas as pd
+import numpy as np
+import os
+import json
+import datetime
+from nse_report.extraction.nse_session import NSE_URL, create_session, get_with_retry
+from nse_report.extraction.nse_data_fetcher import get_cookie_value
+from nse_report.extraction.trading_calendar import HOLIDAY_DATE_FORMAT, TradingCalendar, get_trading_calendar, to_days
+
+# Configure logging
+logging.basicConfig(filename='logs/app.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Constants
+HOLIDAY_DATA_PATH = 'data/raw/holiday_data/trading_holiday.csv'
+HOLIDAY_BINARY_PATH = 'data/raw/holiday_data/trading_holiday.npy'
+HOLIDAY_CACHE_PATH = 'data/raw/holiday_data/cache/'
+TRADING_HOLIDAY_URL = f'{NSE_URL}/api/holiday-master?type=trading'
+
+# First year covered by the calendar, matching the start of the backfill
+FIRST_YEAR = 2023
+
+def cache_file_path(year):
+    return os.path.join(HOLIDAY_CACHE_PATH, f'holiday_master_{year}.json')
+
+def parse_holiday_master(entries):
+    """
+    This function extracts the exchange holidays from the 'CM' entries
+    of a holiday-master response, as datetime64[D] values.
+    """
+
+    df = pd.DataFrame(entries, columns=['tradingDate'])
+    return to_days(pd.to_datetime(df['tradingDate'].str.strip(), format=HOLIDAY_DATE_FORMAT))
+
+def fetch_holiday_master(session):
+    """
+    This function requests the holiday-master API and caches its response per year.
+    The API only publishes the current year, so every year seen is cached and
+    past years are afterwards read from the cache instead of being re-requested.
+    It returns the list of years that were cached.
+    """
+
+    response = get_with_retry(session, TRADING_HOLIDAY_URL)
+    if response.status_code != 200:
+        logging.warning(f"Failed to fetch trading holiday data.")
+        return []
+
+    entries = response.json().get('CM', [])
+    holidays = parse_holiday_master(entries)
+    years = holidays.astype('datetime64[Y]').astype(int) + 1970
+
+    os.makedirs(HOLIDAY_CACHE_PATH, exist_ok=True)
+    for year in np.unique(years).tolist():
+        year_entries = [entry for entry, entry_year in zip(entries, years) if entry_year == year]
+        with open(cache_file_path(year), 'w') as file:
+            json.dump({'CM': year_entries}, file, indent=2)
+        logging.info(f"Cached trading holidays of {year} to {cache_file_path(year)}")
+
+    return np.unique(years).tolist()
+
+def load_cached_holidays(year):
+    """
+    This function returns the cached exchange holidays of a year, or None if it was never cached.
+    """
+
+    if not os.path.exists(cache_file_path(year)):
+        return None
+    with open(cache_file_path(year)) as file:
+        return parse_holiday_master(json.load(file).get('CM', []))
+
+def load_stored_holidays(file_path=HOLIDAY_DATA_PATH):
+    """
+    This function returns the holidays currently in the store, as datetime64[D] values.
+    """
+
+    if not os.path.exists(file_path):
+        return np.array([], dtype='datetime64[D]')
+    return TradingCalendar.from_csv(file_path).holiday_array
+
+def build_holiday_calendar(first_year, last_year):
+    """
+    This function builds the holiday store covering `first_year` to `last_year`.
+    Weekends are generated for the whole range in one vectorized pass. Each
+    year's exchange holidays come from its cached holiday-master response, or
+    are kept from the existing store for years that were never cached.
+    It returns the deduplicated, sorted array of holidays (datetime64[D]).
+    """
+
+    # Generate the weekends of the whole range
+    all_days = np.arange(np.datetime64(f'{first_year}-01-01'), np.datetime64(f'{last_year + 1}-01-01'))
+    weekends = all_days[~np.is_busday(all_days, weekmask='1111100')]
+
+    stored_holidays = load_stored_holidays()
+    stored_years = stored_holidays.astype('datetime64[Y]').astype(int) + 1970
+
+    exchange_holidays = [weekends]
+    for year in range(first_year, last_year + 1):
+        cached_holidays = load_cached_holidays(year)
+        if cached_holidays is not None:
+            exchange_holidays.append(cached_holidays)
+        else:
+            logging.warning(f"No holiday-master response cached for {year}, keeping the stored holidays")
+            exchange_holidays.append(stored_holidays[stored_years == year])
+
+    # Keep the stored holidays outside of the range
+    exchange_holidays.append(stored_holidays[(stored_years < first_year) | (stored_years > last_year)])
+
+    return np.unique(np.concatenate(exchange_holidays))
+
+def save_holiday_calendar(holidays):
+    """
+    This function writes the holidays to the CSV store and to its compact binary form.
+    """
+
+    os.makedirs(os.path.dirname(HOLIDAY_DATA_PATH), exist_ok=True)
+    df = pd.DataFrame({'HolidayDate': pd.to_datetime(holidays).strftime(HOLIDAY_DATE_FORMAT)})
+    df.to_csv(HOLIDAY_DATA_PATH, index=False)
+
+    # numpy binary file, loaded by the trading calendar without any parsing
+    np.save(HOLIDAY_BINARY_PATH, holidays.astype('datetime64[D]'))
+
+    print(f"Trading holiday data saved to {HOLIDAY_DATA_PATH}")
+    logging.info(f"Trading holiday data saved to {HOLIDAY_DATA_PATH} and {HOLIDAY_BINARY_PATH}")
+
+def fetch_trading_holiday_data(first_year=FIRST_YEAR, last_year=None, offline=False):
+    """
+    This function refreshes the holiday-master cache for the current year
+    (unless `offline`), rebuilds the holiday store for the year range and
+    returns the resulting trading calendar.
+    """
+
+    last_year = last_year or datetime.datetime.now().year
+
+    if not offline:
+        session = create_session()
+        get_cookie_value(session)
+        fetch_holiday_master(session)
+
+    holidays = build_holiday_calendar(first_year, last_year)
+    save_holiday_calendar(holidays)
+
+    # The holiday file changed, make the shared calendar reload it
+    get_trading_calendar.cache_clear()
+    return TradingCalendar(holidays)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Build the trading holiday calendar.')
+    parser.add_argument('--first-year', type=int, default=FIRST_YEAR, help='First year of the calendar')
+    parser.add_argument('--last-year', type=int, default=None, help='Last year of the calendar (default: current year)')
+    parser.add_argument('--offline', action='store_true', help='Only rebuild the calendar from the cached responses')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    fetch_trading_holiday_data(args.first_year, args.last_year, args.offline)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import time
+import random
+import logging
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from nse_report.extraction.metrics import count
+
+# Constants
+NSE_URL = 'https://www.nseindia.com'
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36'
+
+# Responses worth retrying: throttling and transient server errors
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def create_session(pool_size=10, base_url=NSE_URL):
+    """
+    This function creates a `requests.Session` whose connection pool can be
+    shared by `pool_size` threads, with the headers NSE expects.
+    """
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({
+        'Referer': base_url,
+        'User-Agent': USER_AGENT,
+    })
+    return session
+
+
+class RateLimiter:
+    """
+    This class spaces out requests per host so that at most `rate` requests
+    per second are started against any single host, whatever the number of threads.
+    """
+
+    def __init__(self, rate=5.0):
+        self.interval = 1.0 / rate
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        """
+        This function blocks until a request to the host of `url` may be sent.
+        """
+
+        host = urlsplit(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def get_with_retry(session, url, rate_limiter=None, retries=3, backoff=0.5, max_backoff=8.0, **kwargs):
+    """
+    This function sends a GET request and retries throttled or failed attempts
+    with exponential backoff and full jitter.
+    It returns the last response, or re-raises the last connection error.
+    The status code of every response is counted in the run metrics.
+    """
+
+    for attempt in range(retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.wait(url)
+
+        try:
+            response = session.get(url, **kwargs)
+            count('http_responses', status=response.status_code)
+            if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                return response
+            logging.warning(f'Got status {response.status_code} for {url}, retrying')
+        except requests.exceptions.RequestException as e:
+            count('http_errors', error=type(e).__name__)
+            if attempt == retries:
+                raise
+            logging.warning(f'Request to {url} failed ({e}), retrying')
+
+        time.sleep(random.uniform(0, min(max_backoff, backoff * 2 ** attempt)))
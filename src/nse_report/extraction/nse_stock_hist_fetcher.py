@@ -0,0 +1,263 @@
+import os
+import json
+import datetime
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from nse_report.extraction.nse_session import RateLimiter, create_session
+from nse_report.extraction.trading_calendar import get_trading_calendar
+from nse_report.extraction.nse_data_fetcher import get_cookie_value
+from nse_report.extraction.nse_data_fetcher import download_csv_file
+from nse_report.extraction.http_cache import DEFAULT_MAX_CACHE_BYTES, HTTP_CACHE_PATH, DownloadCache
+from nse_report.extraction.report_downloader import REPORT_TYPES, report_jobs
+from nse_report.extraction.metrics import PROFILE_MODES, metrics
+
+# Configure logging
+logging.basicConfig(filename='logs/app.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Constants
+NSE_URL = 'https://www.nseindia.com'
+HOLIDAY_DATA_PATH = 'data/raw/holiday_data/trading_holiday.csv'
+BACKFILL_STATE_PATH = 'data/raw/backfill_state.json'
+BACKFILL_SUMMARY_PATH = 'logs/backfill_summary.json'
+
+# Specify the dates for download the file
+# Use %d-%b-%Y format will specifying the date
+START_DATE = '01-Apr-2023'
+END_DATE = datetime.datetime.now().strftime('%d-%b-%Y')
+
+# Backfill settings
+DEFAULT_WORKERS = 8
+DEFAULT_RATE_LIMIT = 5.0
+CHECKPOINT_EVERY = 20
+
+def plan_jobs(start_date, end_date, report_types=REPORT_TYPES):
+    """
+    This function plans the full set of (date, report type) download jobs
+    for the trading days between `start_date` and `end_date`.
+    It returns a list of job dictionaries in date order.
+    """
+
+    jobs = []
+
+    # Holidays and weekends are skipped by the trading calendar
+    trading_days = get_trading_calendar(HOLIDAY_DATA_PATH).trading_days_between(start_date, end_date)
+
+    for trading_day in trading_days:
+        download_date = datetime.datetime.combine(trading_day.astype(datetime.date), datetime.time())
+        jobs.extend(report_jobs(download_date, report_types))
+
+    return jobs
+
+def is_valid_file(file_path):
+    """
+    This function checks if a downloaded report is present and usable:
+    not empty and not an HTML error page saved in place of the CSV.
+    """
+
+    try:
+        if os.path.getsize(file_path) == 0:
+            return False
+        with open(file_path, 'rb') as file:
+            head = file.read(64).lstrip().lower()
+        return not head.startswith(b'<')
+    except OSError:
+        return False
+
+class BackfillState:
+    """
+    This class records the status of every backfill job in a JSON state file,
+    so an interrupted run can resume where it stopped.
+    """
+
+    def __init__(self, state_path):
+        self.state_path = state_path
+        self.statuses = {}
+        self.lock = threading.Lock()
+        self.pending_updates = 0
+
+        if os.path.exists(state_path):
+            with open(state_path) as file:
+                self.statuses = json.load(file)
+
+    def update(self, job, status):
+        """
+        This function records the status of a job and checkpoints the state
+        file every `CHECKPOINT_EVERY` updates.
+        """
+
+        with self.lock:
+            self.statuses[job['key']] = status
+            self.pending_updates += 1
+            if self.pending_updates >= CHECKPOINT_EVERY:
+                self._save()
+
+    def update_many(self, jobs, status):
+        """
+        This function records the same status for a batch of jobs and
+        checkpoints the state file once.
+        """
+
+        with self.lock:
+            for job in jobs:
+                self.statuses[job['key']] = status
+            if jobs:
+                self._save()
+
+    def save(self):
+        with self.lock:
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        temp_path = self.state_path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(self.statuses, file, indent=2, sort_keys=True)
+        os.replace(temp_path, self.state_path)
+        self.pending_updates = 0
+
+def run_job(session, job, rate_limiter, cache=None):
+    """
+    This function downloads the report of a single job. Past-date reports are
+    final, so a cached copy is reused without any request.
+    It returns 'downloaded', 'not_found' (the report does not exist, e.g. an
+    unplanned market closure) or 'failed'.
+    """
+
+    try:
+        immutable = job['date'].date() < datetime.datetime.now().date()
+        status_code = download_csv_file(session, job['url'], job['folder'], rate_limiter, cache, immutable)
+    except Exception as e:
+        logging.error(f"Error downloading {job['url']}: {str(e)}")
+        return 'failed'
+
+    if status_code == 200 and is_valid_file(job['file_path']):
+        return 'downloaded'
+    if status_code == 404:
+        return 'not_found'
+    return 'failed'
+
+def backfill(session, start_date, end_date, workers=DEFAULT_WORKERS, rate_limit=DEFAULT_RATE_LIMIT,
+             state_path=BACKFILL_STATE_PATH, cache=None):
+    """
+    This function downloads every missing report between `start_date` and `end_date`.
+    Files already present and valid on disk are skipped, the remaining jobs run
+    on a pool of `workers` threads, and progress is checkpointed to `state_path`.
+    With a `DownloadCache`, reports downloaded before are served from the cache.
+    It returns a summary of the run.
+    """
+
+    state = BackfillState(state_path)
+    jobs = plan_jobs(start_date, end_date)
+    today = datetime.datetime.now().date()
+
+    summary = {'planned': len(jobs), 'present': 0, 'downloaded': 0, 'not_found': 0, 'failed': 0,
+               'not_found_jobs': [], 'failed_jobs': []}
+
+    present_jobs = []
+    pending_jobs = []
+    for job in jobs:
+        if is_valid_file(job['file_path']):
+            present_jobs.append(job)
+        elif state.statuses.get(job['key']) == 'not_found':
+            summary['not_found'] += 1
+            summary['not_found_jobs'].append(job['key'])
+        else:
+            pending_jobs.append(job)
+
+    # The files already on disk are recorded at once, with a single checkpoint
+    summary['present'] = len(present_jobs)
+    state.update_many(present_jobs, 'present')
+
+    logging.info(f"Backfill planned {len(jobs)} jobs, {len(pending_jobs)} to download")
+
+    rate_limiter = RateLimiter(rate_limit)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(run_job, session, job, rate_limiter, cache): job for job in pending_jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            status = future.result()
+            summary[status] += 1
+            if status != 'downloaded':
+                summary[f'{status}_jobs'].append(job['key'])
+
+            # Today's reports may simply not be published yet, so retry them next run
+            if status == 'not_found' and job['date'].date() >= today:
+                continue
+            state.update(job, status)
+
+    state.save()
+    if cache is not None:
+        cache.save()
+
+    summary['not_found_jobs'].sort()
+    summary['failed_jobs'].sort()
+    return summary
+
+def save_summary(summary, summary_path=BACKFILL_SUMMARY_PATH):
+    """
+    This function writes the backfill summary to a JSON file.
+    """
+
+    os.makedirs(os.path.dirname(summary_path) or '.', exist_ok=True)
+    with open(summary_path, 'w') as file:
+        json.dump(summary, file, indent=2)
+    logging.info(f"Backfill summary saved to {summary_path}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Backfill the historical NSE daily reports.')
+    parser.add_argument('--start', default=START_DATE, help='First date to download, in %%d-%%b-%%Y format')
+    parser.add_argument('--end', default=END_DATE, help='Last date to download, in %%d-%%b-%%Y format')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Number of parallel downloads')
+    parser.add_argument('--rate-limit', type=float, default=DEFAULT_RATE_LIMIT,
+                        help='Maximum number of requests per second sent to NSE')
+    parser.add_argument('--state-file', default=BACKFILL_STATE_PATH, help='Checkpoint file used to resume a run')
+    parser.add_argument('--cache-dir', default=HTTP_CACHE_PATH, help='Folder of the download cache')
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_MAX_CACHE_BYTES // 1024 ** 2,
+                        help='Size above which the least recently used cached downloads are evicted')
+    parser.add_argument('--no-cache', action='store_true', help='Download without the cache')
+    parser.add_argument('--profile', choices=PROFILE_MODES,
+                        help='Also capture a cProfile or tracemalloc profile of the run in its metrics file')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """
+    This is the main function that orchestrates the execution of the script.
+    It initializes a pooled session, retrieves the cookie value,
+    plans the downloads of the security-wise full bhavdata and the MA report
+    for every trading day of the range, runs them in parallel and
+    writes a summary of the run. The timings and counters of the downloads
+    are recorded in the metrics file of the run (logs/metrics/).
+    """
+
+    args = parse_args(argv)
+
+    # Initialize session, shared by all the download threads
+    session = create_session(pool_size=max(1, args.workers))
+
+    # Prime the session cookies, required by the NSE endpoints
+    get_cookie_value(session)
+
+    # Convert start and end dates to datetime objects
+    start_date = datetime.datetime.strptime(args.start, "%d-%b-%Y")
+    end_date = datetime.datetime.strptime(args.end, "%d-%b-%Y")
+
+    cache = None if args.no_cache else DownloadCache(args.cache_dir, args.cache_max_mb * 1024 ** 2)
+
+    metrics.start_run('nse_stock_hist_fetcher', args.profile)
+    status = 'failed'
+    try:
+        with metrics.profiled():
+            summary = backfill(session, start_date, end_date, args.workers, args.rate_limit, args.state_file, cache)
+        status = 'succeeded'
+    finally:
+        metrics.finish_run(status)
+    save_summary(summary)
+
+    print(f"Backfill done: {summary['present']} already present, {summary['downloaded']} downloaded, "
+          f"{summary['not_found']} not found, {summary['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from nse_report.extraction.nse_session import get_with_retry
+from nse_report.extraction.http_cache import stream_to_file
+from nse_report.extraction.metrics import timer
+
+# Constants
+ARCHIVES_URL = 'https://archives.nseindia.com'
+FULL_BHAVDATA_PATH = 'data/raw/sec_bhavdata_full/'
+MA_REPORT_PATH = 'data/raw/ma_report/'
+
+# Number of downloads in flight at once, over all the reports and hosts
+DEFAULT_DOWNLOAD_CONCURRENCY = 4
+
+# Report types downloaded for every trading day: URL template, folder and file name format.
+# `{date}` is replaced by the trading day formatted with `date_format`; add an entry to
+# download another archive report on the same schedule
+REPORT_TYPES = {
+    'sec_bhavdata_full': {
+        'url': ARCHIVES_URL + '/products/content/sec_bhavdata_full_{date}.csv',
+        'folder': FULL_BHAVDATA_PATH,
+        'date_format': '%d%m%Y',
+        'file_name': 'sec_bhavdata_full_{date}.csv',
+    },
+    'ma_report': {
+        'url': ARCHIVES_URL + '/archives/equities/mkt/MA{date}.csv',
+        'folder': MA_REPORT_PATH,
+        'date_format': '%d%m%y',
+        'file_name': 'MA{date}.csv',
+    },
+}
+
+
+def report_jobs(date, report_types=REPORT_TYPES, immutable=False):
+    """
+    This function returns the download jobs of every report type for a
+    trading day (a datetime): its URL and the file it is saved to.
+    `immutable` marks the reports of a past day, which are final.
+    """
+
+    jobs = []
+    for report_type, report in report_types.items():
+        date_str = date.strftime(report['date_format'])
+        jobs.append({
+            'key': f"{date.strftime('%Y-%m-%d')}/{report_type}",
+            'date': date,
+            'report_type': report_type,
+            'url': report['url'].format(date=date_str),
+            'folder': report['folder'],
+            'file_path': os.path.join(report['folder'], report['file_name'].format(date=date_str)),
+            'immutable': immutable,
+        })
+    return jobs
+
+
+def download_file(session, file_url, file_path, rate_limiter=None, cache=None, immutable=False):
+    """
+    This function downloads a file to `file_path`. The body is streamed to
+    disk and the file replaced atomically. With a `DownloadCache`, immutable
+    files already cached are not requested again and the others are
+    revalidated with a conditional GET.
+    It returns the HTTP status code of the response.
+    """
+
+    with timer('download_csv_file', file=os.path.basename(file_path)):
+        if cache is not None:
+            status_code = cache.fetch(session, file_url, file_path, immutable, rate_limiter)
+        else:
+            with get_with_retry(session, file_url, rate_limiter, stream=True) as response:
+                status_code = response.status_code
+                if status_code == 200:
+                    # Save the file, creating the folder if it doesn't exist
+                    stream_to_file(response, file_path)
+
+    if status_code == 200:
+        logging.info(f"File downloaded successfully: {file_path}")
+    else:
+        logging.warning(f"Failed to download the file : {file_path}")
+
+    return status_code
+
+
+def download_jobs(session, jobs, concurrency=DEFAULT_DOWNLOAD_CONCURRENCY, rate_limiter=None, cache=None):
+    """
+    This function runs all the download jobs at once on a pool of
+    `concurrency` threads, which caps the downloads in flight. The requests
+    are blocking `requests` calls sharing the session's keep-alive connection
+    pool; the rate limiter spaces them out per host.
+    It returns the HTTP status code of each download, by file URL (None when
+    the request failed after its retries).
+    """
+
+    def download(job):
+        try:
+            return download_file(session, job['url'], job['file_path'], rate_limiter, cache, job['immutable'])
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Error downloading {job['url']}: {str(e)}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        status_codes = list(executor.map(download, jobs))
+    return {job['url']: status_code for job, status_code in zip(jobs, status_codes)}
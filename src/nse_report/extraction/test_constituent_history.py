@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+from nse_report.extraction.constituent_history import ConstituentHistory
+
+
+def snapshot(members):
+    return pd.DataFrame([(sector, symbol) for sector, symbols in members.items() for symbol in symbols],
+                        columns=['SECTOR', 'SYMBOL'])
+
+
+@pytest.fixture
+def history():
+    # SBIN leaves NIFTY BANK on 2023-07-05 and YESBANK joins, INFY joins NIFTY BANK on 2023-07-10
+    history = ConstituentHistory.from_snapshot(snapshot({'NIFTY BANK': ['SBIN', 'HDFCBANK'], 'NIFTY IT': ['INFY']}),
+                                               '2023-07-03')
+    history.record_snapshot(snapshot({'NIFTY BANK': ['HDFCBANK', 'YESBANK']}), '2023-07-05')
+    history.record_snapshot(snapshot({'NIFTY BANK': ['HDFCBANK', 'YESBANK', 'INFY']}), '2023-07-10')
+    return history
+
+
+def rows(*pairs):
+    return pd.DataFrame({'SYMBOL': [symbol for symbol, _ in pairs], 'DATE': pd.to_datetime([date for _, date in pairs])})
+
+
+def test_unchanged_snapshots_add_nothing(history):
+    intervals_df = history.intervals.copy()
+
+    assert not history.record_snapshot(snapshot({'NIFTY BANK': ['HDFCBANK', 'YESBANK', 'INFY']}), '2023-07-11')
+    pd.testing.assert_frame_equal(history.intervals, intervals_df)
+
+
+def test_missing_sectors_keep_their_constituents(history):
+    # NIFTY IT was not fetched on 2023-07-05 and 2023-07-10
+    assert set(history.current().itertuples(index=False)) == {
+        ('HDFCBANK', 'NIFTY BANK'), ('YESBANK', 'NIFTY BANK'), ('INFY', 'NIFTY BANK'), ('INFY', 'NIFTY IT')}
+
+
+def test_rows_are_tagged_with_their_constituents_on_their_date(history):
+    df = rows(('SBIN', '2023-07-04'), ('SBIN', '2023-07-05'), ('YESBANK', '2023-07-04'), ('YESBANK', '2023-07-05'),
+              ('HDFCBANK', '2023-07-06'), ('TCS', '2023-07-06'))
+
+    tagged_df = history.tag(df, ['NIFTY BANK'])
+
+    assert list(zip(tagged_df['SYMBOL'], tagged_df['DATE'].dt.strftime('%Y-%m-%d'))) == [
+        ('SBIN', '2023-07-04'), ('YESBANK', '2023-07-05'), ('HDFCBANK', '2023-07-06')]
+    assert list(tagged_df['SECTOR']) == ['NIFTY BANK'] * 3
+
+
+def test_dates_before_the_history_use_the_first_snapshot(history):
+    tagged_df = history.tag(rows(('SBIN', '2023-06-01'), ('YESBANK', '2023-06-01')), ['NIFTY BANK'])
+
+    assert list(tagged_df['SYMBOL']) == ['SBIN']
+
+
+def test_stocks_in_several_universes_are_tagged_with_the_first(history):
+    df = rows(('INFY', '2023-07-07'), ('INFY', '2023-07-10'))
+
+    assert list(history.tag(df, ['NIFTY BANK', 'NIFTY IT'])['SECTOR']) == ['NIFTY IT', 'NIFTY BANK']
+    assert list(history.tag(df, ['NIFTY IT', 'NIFTY BANK'])['SECTOR']) == ['NIFTY IT', 'NIFTY IT']
+
+
+def test_memberships_match_every_sector(history):
+    df = rows(('INFY', '2023-07-07'), ('INFY', '2023-07-10'), ('SBIN', '2023-07-05'))
+
+    row_positions, sector_codes, sectors = history.memberships(df)
+
+    assert sorted((int(position), sectors[code]) for position, code in zip(row_positions, sector_codes)) == [
+        (0, 'NIFTY IT'), (1, 'NIFTY BANK'), (1, 'NIFTY IT')]
+
+
+def test_snapshots_older_than_the_last_change_are_rejected(history):
+    with pytest.raises(ValueError):
+        history.record_snapshot(snapshot({'NIFTY BANK': ['SBIN']}), '2023-07-06')
+
+
+def test_changes_are_dated_from_the_previous_last_change(history):
+    assert history.last_change_date() == pd.Timestamp('2023-07-10')
+    assert history.changed_since('2023-07-05') == pd.Timestamp('2023-07-05')
+    assert history.changed_since('2023-07-03') is None
+    assert history.changed_since(None) is None
+
+
+def test_saved_history_is_loaded_back(history, tmp_path):
+    file_path = str(tmp_path / 'constituent_history.csv')
+    history.save(file_path)
+
+    loaded = ConstituentHistory.load(file_path)
+
+    assert loaded.fingerprint() == history.fingerprint()
+    assert loaded.fingerprint(['NIFTY IT']) != history.fingerprint(['NIFTY BANK'])
+    assert np.isnat(loaded.intervals['VALID_TO'].to_numpy()).sum() == 4
+    assert ConstituentHistory.load(str(tmp_path / 'missing.csv')).empty
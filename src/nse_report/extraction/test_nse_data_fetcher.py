@@ -0,0 +1,165 @@
+import json
+import time
+from urllib.parse import quote
+import pandas as pd
+import pytest
+from nse_report.extraction import nse_session
+from nse_report.extraction.constituent_history import ConstituentHistory
+
+SECTORS = ['NIFTY 50', 'NIFTY AUTO', 'NIFTY BANK', 'NIFTY IT', 'NIFTY MEDIA', 'NIFTY METAL']
+SECTOR_INDEX = {sector: quote(sector) for sector in SECTORS}
+
+# Large enough for the rate limiter not to space out the requests
+NO_RATE_LIMIT = 10000.0
+
+
+@pytest.fixture
+def fetcher(data_root):
+    # Imported from the data folder, as it logs to logs/app.log
+    from nse_report.extraction import nse_data_fetcher
+    return nse_data_fetcher
+
+
+@pytest.fixture
+def sector_list_path(data_root):
+    sector_list_df = pd.DataFrame([(f'{sector.split()[-1]}{number}', sector) for sector in SECTORS for number in range(3)],
+                                  columns=['SYMBOL', 'SECTOR'])
+    sector_list_df.to_csv(data_root / 'stub_sector_list.csv', index=False)
+    return str(data_root / 'stub_sector_list.csv')
+
+
+@pytest.fixture
+def backoffs(monkeypatch):
+    """
+    This fixture records the bounds of the jittered backoffs, which are not slept.
+    """
+
+    bounds = []
+
+    def uniform(low, high):
+        bounds.append((low, high))
+        return 0.0
+
+    monkeypatch.setattr(nse_session.random, 'uniform', uniform)
+    return bounds
+
+
+def symbols_by_sector(sector_data):
+    return {df['SECTOR'].iloc[0]: list(df['SYMBOL']) for df in sector_data if not df.empty}
+
+
+def test_fetches_every_sector_in_order(fetcher, sector_list_path, stub_server):
+    server, base_url = stub_server(sector_list_path)
+
+    sector_data = fetcher.fetch_all_sector_data(fetcher.create_session(), '03-Jul-2023', SECTOR_INDEX,
+                                                rate_limit=NO_RATE_LIMIT, base_url=base_url)
+
+    assert [df['SECTOR'].iloc[0] for df in sector_data] == SECTORS
+    assert symbols_by_sector(sector_data)['NIFTY BANK'] == ['BANK0', 'BANK1', 'BANK2']
+    assert all(list(df.columns) == ['SYMBOL', 'SECTOR'] for df in sector_data)
+
+
+def test_parses_recorded_responses(fetcher, stub_server):
+    from stub_server import API_FIXTURE_FOLDER, FIXTURES_PATH, fixture_file_name
+
+    server, base_url = stub_server(fixtures_path=FIXTURES_PATH)
+    sector_index = {sector: fetcher.SECTOR_INDEX[sector] for sector in ['NIFTY BANK', 'NIFTY IT']}
+
+    sector_data = fetcher.fetch_all_sector_data(fetcher.create_session(), '03-Jul-2023', sector_index,
+                                                rate_limit=NO_RATE_LIMIT, base_url=base_url)
+
+    for sector, df in zip(sector_index, sector_data):
+        with open(f'{FIXTURES_PATH}/{API_FIXTURE_FOLDER}/{fixture_file_name(sector)}') as file:
+            data = json.load(file)['data']
+        # The index itself (priority 1) is not a constituent
+        assert list(df['SYMBOL']) == [row['symbol'] for row in data if row['priority'] == 0]
+        assert sector not in set(df['SYMBOL'])
+        assert set(df['SECTOR']) == {sector}
+
+
+@pytest.mark.parametrize('concurrency', [1, 3])
+def test_concurrency_is_bounded(fetcher, sector_list_path, stub_server, concurrency):
+    server, base_url = stub_server(sector_list_path, latency=0.05)
+
+    fetcher.fetch_all_sector_data(fetcher.create_session(concurrency), '03-Jul-2023', SECTOR_INDEX,
+                                  concurrency=concurrency, rate_limit=NO_RATE_LIMIT, base_url=base_url)
+
+    assert len(server.requests) == len(SECTORS)
+    assert server.max_in_flight == concurrency
+
+
+def test_rate_limit_spaces_out_requests(fetcher, sector_list_path, stub_server):
+    server, base_url = stub_server(sector_list_path)
+    rate_limit = 20.0
+
+    fetcher.fetch_all_sector_data(fetcher.create_session(len(SECTORS)), '03-Jul-2023', SECTOR_INDEX,
+                                  concurrency=len(SECTORS), rate_limit=rate_limit, base_url=base_url)
+
+    starts = sorted(request['start'] for request in server.requests)
+    # Allow for the jitter of the local connections
+    assert starts[-1] - starts[0] >= (len(starts) - 1) / rate_limit - 0.02
+    assert min(later - earlier for earlier, later in zip(starts, starts[1:])) >= 0.5 / rate_limit
+
+
+def test_rate_limiter_is_per_host():
+    rate_limiter = nse_session.RateLimiter(rate=2.0)
+
+    start = time.monotonic()
+    rate_limiter.wait('https://www.nseindia.com/api/a')
+    rate_limiter.wait('https://archives.nseindia.com/a.csv')
+    assert time.monotonic() - start < 0.25
+
+    rate_limiter.wait('https://www.nseindia.com/api/b')
+    assert time.monotonic() - start >= 0.5
+
+
+@pytest.mark.parametrize('failures', [[429], [503, 500], [502, 504, 429]])
+def test_retries_with_jittered_backoff(fetcher, sector_list_path, stub_server, backoffs, failures):
+    server, base_url = stub_server(sector_list_path, failures={'NIFTY BANK': failures})
+
+    sector_data = fetcher.fetch_all_sector_data(fetcher.create_session(), '03-Jul-2023', SECTOR_INDEX,
+                                                rate_limit=NO_RATE_LIMIT, base_url=base_url)
+
+    assert [request['status'] for request in server.requests_of('NIFTY BANK')] == failures + [200]
+    assert symbols_by_sector(sector_data)['NIFTY BANK'] == ['BANK0', 'BANK1', 'BANK2']
+    # Full jitter, under an exponential bound
+    assert backoffs == [(0, 0.5 * 2 ** attempt) for attempt in range(len(failures))]
+
+
+def test_falls_back_to_constituent_history(fetcher, sector_list_path, stub_server, backoffs):
+    snapshot_df = pd.DataFrame({'SYMBOL': ['HDFCBANK', 'SBIN', 'INFY'], 'SECTOR': ['NIFTY BANK', 'NIFTY BANK', 'NIFTY IT']})
+    ConstituentHistory.from_snapshot(snapshot_df, '2023-06-30').save()
+    # Still failing after the retries
+    server, base_url = stub_server(sector_list_path, failures={'NIFTY BANK': [500] * 4})
+
+    sector_data = fetcher.fetch_all_sector_data(fetcher.create_session(), '03-Jul-2023', SECTOR_INDEX,
+                                                rate_limit=NO_RATE_LIMIT, base_url=base_url)
+
+    assert len(server.requests_of('NIFTY BANK')) == 4
+    assert symbols_by_sector(sector_data)['NIFTY BANK'] == ['HDFCBANK', 'SBIN']
+    assert symbols_by_sector(sector_data)['NIFTY IT'] == ['IT0', 'IT1', 'IT2']
+
+
+def test_unauthorized_is_not_retried(fetcher, sector_list_path, stub_server, backoffs):
+    pd.DataFrame({'SYMBOL': ['AXISBANK'], 'SECTOR': ['NIFTY BANK']}).to_csv(
+        f'{fetcher.COMBINED_DATA_PATH}{fetcher.COMBINED_DATA_FILE}', index=False)
+    server, base_url = stub_server(sector_list_path, failures={'NIFTY BANK': [401]})
+
+    sector_data = fetcher.fetch_all_sector_data(fetcher.create_session(), '03-Jul-2023', SECTOR_INDEX,
+                                                rate_limit=NO_RATE_LIMIT, base_url=base_url)
+
+    assert [request['status'] for request in server.requests_of('NIFTY BANK')] == [401]
+    assert backoffs == []
+    # No constituent history: the last saved sector list is used
+    assert symbols_by_sector(sector_data)['NIFTY BANK'] == ['AXISBANK']
+
+
+def test_sector_never_fetched_is_empty(fetcher, sector_list_path, stub_server, backoffs):
+    server, base_url = stub_server(sector_list_path, failures={'NIFTY BANK': [404]})
+
+    sector_data = fetcher.fetch_all_sector_data(fetcher.create_session(), '03-Jul-2023', SECTOR_INDEX,
+                                                rate_limit=NO_RATE_LIMIT, base_url=base_url)
+
+    assert sector_data[SECTORS.index('NIFTY BANK')].empty
+    assert list(sector_data[SECTORS.index('NIFTY BANK')].columns) == ['SYMBOL', 'SECTOR']
+    assert len(fetcher.combine_sector_data(sector_data)) == 3 * (len(SECTORS) - 1)
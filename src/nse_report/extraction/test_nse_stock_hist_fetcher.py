@@ -0,0 +1,69 @@
+import os
+import json
+import pytest
+from nse_report.extraction.trading_calendar import get_trading_calendar
+
+
+@pytest.fixture
+def hist_fetcher(data_root):
+    # Imported from the data folder, as it logs to logs/app.log
+    from nse_report.extraction import nse_stock_hist_fetcher
+
+    os.makedirs(data_root / 'data/raw/holiday_data')
+    with open(data_root / nse_stock_hist_fetcher.HOLIDAY_DATA_PATH, 'w') as file:
+        file.write('HolidayDate\n07-Jul-2023\n')
+    get_trading_calendar.cache_clear()
+    yield nse_stock_hist_fetcher
+    get_trading_calendar.cache_clear()
+
+
+@pytest.fixture
+def saves(hist_fetcher, monkeypatch):
+    """
+    This fixture counts the writes of the backfill state file.
+    """
+
+    counts = []
+    original_save = hist_fetcher.BackfillState._save
+
+    def counting_save(state):
+        counts.append(len(state.statuses))
+        original_save(state)
+
+    monkeypatch.setattr(hist_fetcher.BackfillState, '_save', counting_save)
+    return counts
+
+
+def write_report(job):
+    os.makedirs(job['folder'], exist_ok=True)
+    with open(job['file_path'], 'w') as file:
+        file.write('SYMBOL,SERIES\nSBIN,EQ\n')
+
+
+def test_present_files_are_checkpointed_once(hist_fetcher, saves, monkeypatch):
+    jobs = hist_fetcher.plan_jobs('01-Jun-2023', '31-Jul-2023')
+    for job in jobs:
+        write_report(job)
+    monkeypatch.setattr(hist_fetcher, 'run_job', lambda *args: pytest.fail('a present file was downloaded'))
+
+    summary = hist_fetcher.backfill(None, '01-Jun-2023', '31-Jul-2023', state_path='state.json')
+
+    assert summary['present'] == summary['planned'] == len(jobs) > 2 * hist_fetcher.CHECKPOINT_EVERY
+    # One checkpoint for the batch of present files, one at the end of the run
+    assert saves == [len(jobs), len(jobs)]
+    with open('state.json') as file:
+        assert set(json.load(file).values()) == {'present'}
+
+
+def test_downloads_are_checkpointed_every_few_jobs(hist_fetcher, saves, monkeypatch):
+    jobs = hist_fetcher.plan_jobs('01-Jun-2023', '31-Jul-2023')
+    present_jobs = jobs[:10]
+    for job in present_jobs:
+        write_report(job)
+    monkeypatch.setattr(hist_fetcher, 'run_job', lambda session, job, rate_limiter, cache: 'downloaded')
+
+    summary = hist_fetcher.backfill(None, '01-Jun-2023', '31-Jul-2023', workers=2, state_path='state.json')
+
+    assert (summary['present'], summary['downloaded']) == (len(present_jobs), len(jobs) - len(present_jobs))
+    assert len(saves) == 1 + (len(jobs) - len(present_jobs)) // hist_fetcher.CHECKPOINT_EVERY + 1
+    assert '2023-07-07/ma_report' not in hist_fetcher.BackfillState('state.json').statuses
@@ -0,0 +1,184 @@
+import os
+import datetime
+import pytest
+import requests
+from nse_report.extraction import http_cache
+from nse_report.extraction.http_cache import DownloadCache
+from nse_report.extraction.nse_session import create_session
+from nse_report.extraction.report_downloader import ARCHIVES_URL, REPORT_TYPES, download_jobs, report_jobs
+
+DATES = [datetime.datetime(2023, 7, day) for day in [3, 4, 5, 6, 7, 10]]
+
+# Bhavcopy whose download is dropped in the middle of the body
+TRUNCATED_FILE = f'sec_bhavdata_full_{DATES[0]:%d%m%Y}.csv'
+
+
+@pytest.fixture
+def served_path(data_root):
+    """
+    This fixture writes the archive files served by the stub: a bhavcopy of
+    a few chunks and an MA report per date.
+    """
+
+    served_path = data_root / 'served'
+    os.makedirs(served_path)
+    for number, date in enumerate(DATES):
+        with open(served_path / f"sec_bhavdata_full_{date:%d%m%Y}.csv", 'wb') as file:
+            file.write(os.urandom(3 * 64 * 1024 + number))
+        with open(served_path / f"MA{date:%d%m%y}.csv", 'wb') as file:
+            file.write(f'MA report of {date:%d-%b-%Y}\n'.encode() * 100)
+    return served_path
+
+
+@pytest.fixture
+def start_archives(served_path, stub_server):
+    """
+    This fixture starts a stub of the NSE archives and returns the download
+    jobs of every date against it.
+    """
+
+    def start(**kwargs):
+        server, base_url = stub_server(files_path=str(served_path), **kwargs)
+        report_types = {report_type: {**report, 'url': base_url + report['url'][len(ARCHIVES_URL):]}
+                        for report_type, report in REPORT_TYPES.items()}
+        jobs = [job for date in DATES for job in report_jobs(date, report_types, immutable=True)]
+        return server, jobs
+
+    return start
+
+
+def download(jobs, concurrency=4, cache=None):
+    status_codes = download_jobs(create_session(pool_size=concurrency), jobs, concurrency, cache=cache)
+    return [status_codes[job['url']] for job in jobs]
+
+
+def served_file(served_path, job):
+    with open(served_path / os.path.basename(job['file_path']), 'rb') as file:
+        return file.read()
+
+
+def leftover_files(data_root):
+    return [name for _, _, file_names in os.walk(data_root / 'data') for name in file_names
+            if name.endswith(('.part', '.tmp'))]
+
+
+def test_downloads_every_job(start_archives, served_path):
+    server, jobs = start_archives()
+
+    status_codes = download(jobs)
+
+    assert status_codes == [200] * len(jobs)
+    for job in jobs:
+        with open(job['file_path'], 'rb') as file:
+            assert file.read() == served_file(served_path, job)
+
+
+@pytest.mark.parametrize('concurrency', [1, 3])
+def test_concurrency_is_capped(start_archives, concurrency):
+    server, jobs = start_archives(latency=0.05)
+
+    status_codes = download(jobs, concurrency)
+
+    assert status_codes == [200] * len(jobs)
+    # The cap holds over all the reports and dates
+    assert server.max_in_flight == concurrency
+
+
+def test_missing_report_does_not_stop_the_others(start_archives, served_path):
+    server, jobs = start_archives()
+    missing_job = jobs[5]
+    os.remove(served_path / os.path.basename(missing_job['file_path']))
+
+    status_codes = download(jobs)
+
+    assert status_codes[5] == 404
+    assert status_codes[:5] + status_codes[6:] == [200] * (len(jobs) - 1)
+    assert not os.path.exists(missing_job['file_path'])
+    assert all(os.path.exists(job['file_path']) for job in jobs if job is not missing_job)
+
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_failed_download_leaves_no_partial_file(start_archives, data_root, cached):
+    from stub_server import TRUNCATED
+
+    server, jobs = start_archives(failures={TRUNCATED_FILE: [TRUNCATED]})
+    cache = DownloadCache(str(data_root / 'cache')) if cached else None
+
+    status_codes = download(jobs, cache=cache)
+
+    position = [os.path.basename(job['file_path']) for job in jobs].index(TRUNCATED_FILE)
+    # The connection dropped in the middle of the body: the download failed, the others did not
+    assert [request['status'] for request in server.requests_of(TRUNCATED_FILE)] == [TRUNCATED]
+    assert status_codes[position] is None
+    assert status_codes[:position] + status_codes[position + 1:] == [200] * (len(jobs) - 1)
+    assert not os.path.exists(jobs[position]['file_path'])
+    assert leftover_files(data_root) == []
+    if cached:
+        assert cache.lookup(jobs[position]['url']) is None
+
+
+def test_failed_download_keeps_the_previous_file(start_archives, data_root):
+    from stub_server import TRUNCATED
+
+    server, jobs = start_archives(failures={TRUNCATED_FILE: [TRUNCATED]})
+    job = [job for job in jobs if os.path.basename(job['file_path']) == TRUNCATED_FILE][0]
+    os.makedirs(job['folder'], exist_ok=True)
+    with open(job['file_path'], 'wb') as file:
+        file.write(b'previous download')
+
+    status_codes = download([job])
+
+    assert status_codes == [None]
+    with open(job['file_path'], 'rb') as file:
+        assert file.read() == b'previous download'
+    assert leftover_files(data_root) == []
+
+
+def test_bodies_are_streamed_in_chunks(start_archives, served_path, monkeypatch):
+    server, jobs = start_archives()
+    chunk_sizes = []
+
+    def recording_iter_content(response, chunk_size=1, decode_unicode=False):
+        chunk_sizes.append(chunk_size)
+        return original_iter_content(response, chunk_size, decode_unicode)
+
+    original_iter_content = requests.Response.iter_content
+    monkeypatch.setattr(requests.Response, 'iter_content', recording_iter_content)
+    monkeypatch.setattr(http_cache, 'CHUNK_SIZE', 64 * 1024)
+
+    status_codes = download(jobs)
+
+    assert status_codes == [200] * len(jobs)
+    assert chunk_sizes == [64 * 1024] * len(jobs)
+    for job in jobs:
+        with open(job['file_path'], 'rb') as file:
+            assert file.read() == served_file(served_path, job)
+
+
+def test_cached_reports_are_not_requested_again(start_archives, data_root):
+    server, jobs = start_archives()
+    cache = DownloadCache(str(data_root / 'cache'))
+
+    assert download(jobs, cache=cache) == [200] * len(jobs)
+    for job in jobs:
+        os.remove(job['file_path'])
+    assert download(jobs, cache=cache) == [200] * len(jobs)
+
+    # The past dates are immutable: served from the cache
+    assert len(server.requests) == len(jobs)
+    assert all(os.path.exists(job['file_path']) for job in jobs)
+
+
+def test_eviction_frees_the_cache_space(start_archives, data_root):
+    server, jobs = start_archives()
+    max_bytes = 4 * 64 * 1024
+    cache = DownloadCache(str(data_root / 'cache'), max_bytes=max_bytes)
+
+    assert download(jobs, cache=cache) == [200] * len(jobs)
+
+    object_paths = [os.path.join(folder, name) for folder, _, names in os.walk(data_root / 'cache' / 'objects')
+                    for name in names]
+    # The reports are copies, so the evicted bodies are gone from the disk
+    assert sum(os.path.getsize(path) for path in object_paths) <= max_bytes
+    assert all(os.stat(path).st_nlink == 1 for path in object_paths)
+    assert all(os.stat(job['file_path']).st_nlink == 1 for job in jobs)
@@ -0,0 +1,146 @@
+import os
+import hashlib
+import datetime
+import functools
+import numpy as np
+import pandas as pd
+
+# Constants
+HOLIDAY_DATA_PATH = 'data/raw/holiday_data/trading_holiday.csv'
+HOLIDAY_BINARY_PATH = 'data/raw/holiday_data/trading_holiday.npy'
+HOLIDAY_DATE_FORMAT = '%d-%b-%Y'
+
+# NSE trades Monday to Friday
+WEEKMASK = '1111100'
+
+
+def to_days(dates):
+    """
+    This function converts a date or an array of dates to numpy datetime64[D].
+    It accepts '%d-%b-%Y' strings (as used throughout the scripts), ISO strings,
+    datetime/date objects, pandas Timestamps/Series and datetime64 values.
+    """
+
+    if isinstance(dates, str):
+        try:
+            return np.datetime64(datetime.datetime.strptime(dates.strip(), HOLIDAY_DATE_FORMAT).date(), 'D')
+        except ValueError:
+            return np.datetime64(pd.Timestamp(dates).date(), 'D')
+    if isinstance(dates, (datetime.date, np.datetime64)):
+        return np.datetime64(pd.Timestamp(dates).date(), 'D')
+    if isinstance(dates, np.ndarray) and np.issubdtype(dates.dtype, np.datetime64):
+        return dates.astype('datetime64[D]')
+    return pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]')
+
+
+class TradingCalendar:
+    """
+    This class answers trading-day questions from a holiday list loaded once.
+    It holds the holidays as a set (O(1) scalar lookups), a numpy business-day
+    calendar (vectorized offsets, weekends included for every year) and the
+    sorted array of trading days covering the holiday list's years.
+    """
+
+    def __init__(self, holidays):
+        self.holiday_array = np.unique(to_days(np.asarray(holidays))) if len(holidays) else np.array([], dtype='datetime64[D]')
+        self.holidays = set(self.holiday_array.astype('int64').tolist())
+        self.busday_calendar = np.busdaycalendar(weekmask=WEEKMASK, holidays=self.holiday_array)
+
+        # Precompute the trading days of every year covered by the holiday list
+        if len(self.holiday_array):
+            self.coverage_start = self.holiday_array[0].astype('datetime64[Y]').astype('datetime64[D]')
+            self.coverage_end = (self.holiday_array[-1].astype('datetime64[Y]') + 1).astype('datetime64[D]')
+        else:
+            self.coverage_start = self.coverage_end = np.datetime64('1970-01-01', 'D')
+        all_days = np.arange(self.coverage_start, self.coverage_end)
+        self.trading_days = all_days[np.is_busday(all_days, busdaycal=self.busday_calendar)]
+
+    @classmethod
+    def from_csv(cls, file_path=HOLIDAY_DATA_PATH):
+        """
+        This function builds a calendar from the trading holiday CSV file.
+        """
+
+        holiday_df = pd.read_csv(file_path)
+        holidays = pd.to_datetime(holiday_df['HolidayDate'].str.strip(), format=HOLIDAY_DATE_FORMAT)
+        return cls(holidays.to_numpy())
+
+    @classmethod
+    def from_binary(cls, file_path=HOLIDAY_BINARY_PATH):
+        """
+        This function builds a calendar from the numpy binary form of the holiday store.
+        """
+
+        return cls(np.load(file_path))
+
+    def is_trading_day(self, dates):
+        """
+        This function checks if the given date(s) are trading days.
+        It returns a bool for a single date and a boolean array for an array of dates.
+        """
+
+        days = to_days(dates)
+        if days.ndim == 0:
+            day_number = int(days.astype('int64'))
+            # 1970-01-01 was a Thursday, so (day_number + 3) % 7 is the weekday with Monday as 0
+            return (day_number + 3) % 7 < 5 and day_number not in self.holidays
+        return np.is_busday(days, busdaycal=self.busday_calendar)
+
+    def is_holiday(self, dates):
+        """
+        This function checks if the given date(s) are holidays or weekends.
+        """
+
+        is_trading_day = self.is_trading_day(dates)
+        return not is_trading_day if isinstance(is_trading_day, bool) else ~is_trading_day
+
+    def previous_trading_day(self, dates, n=1):
+        """
+        This function returns the n-th trading day strictly before the given date(s).
+        """
+
+        return np.busday_offset(to_days(dates), -n, roll='forward', busdaycal=self.busday_calendar)
+
+    def next_trading_day(self, dates, n=1):
+        """
+        This function returns the n-th trading day strictly after the given date(s).
+        """
+
+        return np.busday_offset(to_days(dates), n, roll='backward', busdaycal=self.busday_calendar)
+
+    def fingerprint(self):
+        """
+        This function returns a fingerprint of the holidays and trading week,
+        to detect when the outputs derived from the calendar are stale.
+        """
+
+        return hashlib.sha256(WEEKMASK.encode() + self.holiday_array.astype('int64').tobytes()).hexdigest()
+
+    def trading_days_between(self, start_date, end_date):
+        """
+        This function returns the sorted array of trading days in [start_date, end_date].
+        """
+
+        start_day, end_day = to_days(start_date), to_days(end_date)
+        if self.coverage_start <= start_day and end_day < self.coverage_end:
+            start_index = np.searchsorted(self.trading_days, start_day, side='left')
+            end_index = np.searchsorted(self.trading_days, end_day, side='right')
+            return self.trading_days[start_index:end_index]
+
+        all_days = np.arange(start_day, end_day + 1)
+        return all_days[np.is_busday(all_days, busdaycal=self.busday_calendar)]
+
+
+@functools.lru_cache(maxsize=None)
+def get_trading_calendar(file_path=HOLIDAY_DATA_PATH):
+    """
+    This function returns the calendar built from the holiday file, loading it
+    only once per process. The binary form written next to the CSV file is used
+    when it is up to date. Call `get_trading_calendar.cache_clear()` after the
+    holiday file is rewritten.
+    """
+
+    binary_path = os.path.splitext(file_path)[0] + '.npy'
+    if os.path.exists(binary_path) and os.path.getmtime(binary_path) >= os.path.getmtime(file_path):
+        return TradingCalendar.from_binary(binary_path)
+    return TradingCalendar.from_csv(file_path)
@@ -0,0 +1,718 @@
+import pandas as pd
+import os
+import sys
+import hashlib
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from nse_report.integration.file_manifest import FileManifest
+from nse_report.integration.storage import CsvStore, STORAGE_BACKENDS, get_store
+from nse_report.integration.keys import fingerprint, surrogate_key
+from nse_report.integration.percent_change import compute_percent_changes, update_percent_changes
+from nse_report.integration.schemas import BHAVDATA_SCHEMA, file_date, read_bhavdata_csv
+from nse_report.integration.ma_report_parser import read_ma_report
+from nse_report.integration.sector_membership import SectorMembership
+from nse_report.integration.matrix_store import PriceMatrixStore
+from nse_report.integration.top_movers import (TOP_MOVERS_COLUMNS, TOP_MOVERS_MANIFEST_PATH, TOP_MOVERS_TABLE,
+                                               constituent_percent_changes, rank_top_movers)
+from nse_report.integration.sector_aggregation import (QUANTITY_COLUMN, RETURN_PRICE_COLUMN, aggregate_sectors,
+                                                       reconcile_with_ma_report)
+from nse_report.integration.date_dimension import date_dimension_range, extend_date_dimension
+
+# Modules shared with the extraction scripts
+from nse_report.extraction.trading_calendar import get_trading_calendar
+from nse_report.extraction.constituent_history import CONSTITUENT_HISTORY_PATH, ConstituentHistory
+from nse_report.extraction.metrics import PROFILE_MODES, count, metrics, timed, timer
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak memory is then not reported
+    resource = None
+
+# Set up logging
+logging.basicConfig(filename='logs/data_processing.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Constants
+BHAVDATA_FOLDER_PATH = 'data/raw/sec_bhavdata_full/'
+MA_REPORT_FOLDER_PATH = 'data/raw/ma_report/'
+STAGING_FOLDER_PATH = 'data/interim/'
+PROCESSED_FOLDER_PATH = 'data/processed/'
+SECTOR_LIST_FILE_PATH = 'data/raw/sector_list/combined_data.csv'
+HOLIDAY_DATA_PATH = 'data/raw/holiday_data/trading_holiday.csv'
+BHAVDATA_MANIFEST_PATH = os.path.join(STAGING_FOLDER_PATH, 'sec_bhavdata_full_manifest.json')
+MA_REPORT_MANIFEST_PATH = os.path.join(STAGING_FOLDER_PATH, 'ma_report_manifest.json')
+DIM_DATETIME_MANIFEST_PATH = os.path.join(STAGING_FOLDER_PATH, 'dim_datetime_manifest.json')
+PRICE_MATRIX_FOLDER_PATH = os.path.join(STAGING_FOLDER_PATH, 'price_matrix')
+
+# Tables of the processed folder read by the Power BI report
+PROCESSED_TABLES = ['fact_bhavdata', 'fact_MA_report', 'dim_datetime',
+                    'fact_percent_change_symbol', 'fact_percent_change_sector',
+                    'fact_sector_returns', 'fact_sector_contribution']
+
+# Index universes whose stocks are kept in the Bhavdata fact, in tagging priority order
+FACT_UNIVERSES = ['NIFTY 50', 'NIFTY NEXT 50', 'NIFTY MIDCAP 50']
+
+# Number of files parsed per task of the process pool
+PARSE_CHUNK_SIZE = 8
+
+# Percent change tables: source fact table, key, price column and the manifest of the fact table
+PERCENT_CHANGE_TABLES = {
+    'fact_percent_change_symbol': ('fact_bhavdata', 'SYMBOL', 'LAST_PRICE', BHAVDATA_MANIFEST_PATH),
+    'fact_percent_change_sector': ('fact_MA_report', 'SECTOR', 'CLOSE', MA_REPORT_MANIFEST_PATH),
+}
+
+# Function to get the peak memory (resident set size) of the process so far, in MB
+def get_peak_memory_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+# Function to get the trading date of a Bhavdata file from its name (sec_bhavdata_full_DDMMYYYY.csv)
+def bhavdata_file_date(file):
+    return file_date(file, BHAVDATA_SCHEMA)
+
+# Function to read and clean a single Bhavdata file
+def read_bhavdata_file(file_path):
+    # Only the needed columns are parsed, with their dtypes and date format from the schema
+    return read_bhavdata_csv(file_path)
+
+# Function to read and clean a single MA Report file
+def read_ma_report_file(file_path):
+    # Read the index table of the report, parsed reports are cached so the table is copied
+    report = read_ma_report(file_path)
+    dfs = report['index'].copy()
+
+    # Add the date column to the dataframe, from the report title or else the file name
+    dfs['DATE'] = pd.Timestamp(report.date)
+
+    # Data cleaning operations
+    dfs['INDEX'] = dfs['INDEX'].str.upper()
+    dfs = dfs[['INDEX', 'DATE', 'OPEN', 'HIGH', 'LOW', 'CLOSE']]
+    dfs = dfs.rename(columns={'INDEX': 'SECTOR'})
+
+    return dfs
+
+# Function to parse raw files, in a process pool when one is given
+def read_files(read_file, file_paths, executor=None):
+    """
+    The files are parsed by the worker processes in chunks and the data frames
+    are returned in the order of file_paths, so the result does not depend on
+    the number of workers. Their columns are typed NumPy and Arrow arrays,
+    which are pickled back to the parent as raw buffers.
+    """
+
+    if executor is None or len(file_paths) < 2:
+        return [read_file(file_path) for file_path in file_paths]
+    return list(executor.map(read_file, file_paths, chunksize=PARSE_CHUNK_SIZE))
+
+# Function to bring a staged data frame up to date with the raw folder
+def load_staged_data(folder_path, staging_store, table_name, manifest_path, read_file, sort_columns, full_rebuild=False,
+                     executor=None):
+    """
+    Only raw files that are new or changed since the last run (according to the
+    manifest) are parsed; the rows they contributed before are replaced.
+    The result is sorted on sort_columns so that an incremental run and a full
+    rebuild over the same raw files produce identical outputs.
+    With an executor the files are parsed in its worker processes.
+    Returns the combined data frame, the updated (unsaved) manifest and the
+    trading dates whose rows were added, replaced or removed (None for a full rebuild).
+    """
+
+    # Get a list of all CSV files in the folder
+    csv_files = sorted(file for file in os.listdir(folder_path) if file.endswith('.csv'))
+
+    manifest = FileManifest(manifest_path)
+
+    if full_rebuild or not manifest.entries or not staging_store.exists(table_name):
+        logging.info(f'Full rebuild of {table_name} from {len(csv_files)} files')
+        manifest.clear()
+        changed_files, removed_files = csv_files, []
+        staged_df_list = []
+        stale_dates = None
+    else:
+        changed_files, removed_files = manifest.diff(folder_path, csv_files)
+        logging.info(f'Incremental update of {table_name}: {len(changed_files)} new or changed, {len(removed_files)} removed files')
+
+        # Drop the rows previously contributed by changed or removed files
+        stale_dates = manifest.stale_dates(changed_files + removed_files)
+        with timer('read', table=table_name):
+            staged_df = staging_store.read(table_name)
+        staged_df = staged_df[~staged_df['DATE'].dt.strftime('%Y-%m-%d').isin(stale_dates)]
+        staged_df_list = [staged_df]
+
+    # Read each new or changed CSV file
+    with timer('parse', table=table_name, files=len(changed_files)):
+        new_df_list = read_files(read_file, [os.path.join(folder_path, file) for file in changed_files], executor)
+    count('files_read', len(changed_files), table=table_name)
+    count('rows_read', sum(len(dfs) for dfs in new_df_list), table=table_name)
+    new_dates = set()
+    for file, dfs in zip(changed_files, new_df_list):
+        file_dates = dfs['DATE'].dt.strftime('%Y-%m-%d').unique()
+        manifest.record(folder_path, file, file_dates)
+        new_dates.update(file_dates)
+
+    manifest.remove(removed_files)
+
+    # Concatenate the data frames into a single data frame
+    with timer('concat', table=table_name):
+        combined_df = pd.concat(staged_df_list + new_df_list, ignore_index=True)
+        combined_df = combined_df.sort_values(sort_columns, kind='mergesort').reset_index(drop=True)
+
+    changed_dates = None if stale_dates is None else pd.to_datetime(sorted(stale_dates | new_dates))
+    return combined_df, manifest, changed_dates
+
+# Function to write a table, or only replace the rows of the changed dates
+def save_table(store, df, table_name, changed_dates=None):
+    if changed_dates is None:
+        with timer('write', table=table_name, storage=store.name):
+            store.write(df, table_name)
+        count('rows_written', len(df), table=table_name)
+    elif len(changed_dates) > 0:
+        changed_df = df[df['DATE'].isin(changed_dates)]
+        with timer('upsert', table=table_name, storage=store.name, dates=len(changed_dates)):
+            store.upsert(changed_df, table_name, changed_dates)
+        count('rows_written', len(changed_df), table=table_name)
+
+# Function to bring the date x symbol price matrices up to date with the staged Bhavdata
+def save_price_matrix(bhavdata_df, changed_dates=None, matrix_store=None):
+    # New trading days are appended as one row, changed days are replaced in place
+    matrix_store = matrix_store or PriceMatrixStore(PRICE_MATRIX_FOLDER_PATH)
+    with timer('write', table='price_matrix', storage='memmap'):
+        matrix_store.write(bhavdata_df, changed_dates)
+    count('rows_written', len(bhavdata_df) if changed_dates is None else int(bhavdata_df['DATE'].isin(changed_dates).sum()),
+          table='price_matrix')
+
+# Function to load the sector membership index from the sector list file, unless it was already loaded
+def load_sector_membership(membership=None):
+    if membership is not None:
+        return membership
+    return SectorMembership.from_csv(SECTOR_LIST_FILE_PATH)
+
+# Function to load the point-in-time constituent history
+def load_constituent_history(membership=None):
+    constituent_history = ConstituentHistory.load(CONSTITUENT_HISTORY_PATH)
+    if constituent_history.empty:
+        # No history recorded yet: the current sector list applies to every date
+        membership = load_sector_membership(membership)
+        constituent_history = ConstituentHistory.from_snapshot(membership.pairs(), pd.Timestamp(0))
+    return constituent_history
+
+# Function to build the Bhavdata fact rows, keyed by (SYMBOL, DATE)
+def build_fact_bhavdata(bhavdata_df, constituent_history, universes=FACT_UNIVERSES):
+    # Keep the stocks of the universes on each date and tag them with their sector at that date
+    with timer('tag', table='fact_bhavdata'):
+        fact_daily_bhavdata_df = constituent_history.tag(bhavdata_df, universes)
+    count('rows_filtered', len(bhavdata_df) - len(fact_daily_bhavdata_df), table='fact_bhavdata')
+
+    fact_daily_bhavdata_df.reset_index(drop =True, inplace=True)
+    fact_daily_bhavdata_df.insert(0, 'ID_BHAV', surrogate_key(fact_daily_bhavdata_df, ['SYMBOL', 'DATE']))
+    return fact_daily_bhavdata_df[['ID_BHAV','SYMBOL', 'SECTOR' , 'DATE', 'LAST_PRICE',]]
+
+# Function to build the MA Report fact rows, keyed by (SECTOR, DATE)
+def build_fact_ma_report(ma_report_df, membership):
+    # Filter the sectors based on those present in the sector list
+    fact_ma_report_df = ma_report_df[membership.has_sector(ma_report_df['SECTOR'])]
+    count('rows_filtered', len(ma_report_df) - len(fact_ma_report_df), table='fact_MA_report')
+
+    fact_ma_report_df = fact_ma_report_df.reset_index(drop=True)
+    fact_ma_report_df.insert(0, 'ID_MA', surrogate_key(fact_ma_report_df, ['SECTOR', 'DATE']))
+    return fact_ma_report_df[['ID_MA','SECTOR','DATE','CLOSE']]
+
+# Function to get the dates of a fact table to rebuild: all of them (None) when its sector list changed
+def fact_changed_dates(manifest, sector_list_fingerprint, changed_dates, processed_store, table_name,
+                       dates=None, changed_since=None):
+    """
+    With a point-in-time sector list, a change only affects the dates from
+    changed_since on, which are rebuilt along with the changed dates.
+    """
+
+    sector_list_changed = manifest.inputs.get('sector_list') != sector_list_fingerprint
+    manifest.inputs['sector_list'] = sector_list_fingerprint
+    if changed_dates is None or not processed_store.exists(table_name):
+        return None
+    if not sector_list_changed:
+        return changed_dates
+    if changed_since is None:
+        return None
+
+    unique_dates = pd.DatetimeIndex(dates.unique())
+    return changed_dates.union(unique_dates[unique_dates >= changed_since])
+
+# Function to record in the manifest the constituent history the Bhavdata fact is built from
+# Returns the date from which the constituents may have changed since the last run (None for all dates)
+def record_constituent_history(manifest, constituent_history):
+    changed_since = constituent_history.changed_since(manifest.inputs.get('sector_list_changed_on'))
+    manifest.inputs['sector_list_changed_on'] = f'{constituent_history.last_change_date():%Y-%m-%d}'
+    return changed_since
+
+# Function to record in a manifest the dates a derived table (percent changes, top movers) must recompute, under `name`
+# The dates are kept until the derived table is saved, so a run failing in between does not lose them
+def record_pending_dates(manifest, name, fact_dates):
+    pending_dates = manifest.inputs.get(name, [])
+    if fact_dates is None or pending_dates == 'all':
+        manifest.inputs[name] = 'all'
+    else:
+        manifest.inputs[name] = sorted(set(pending_dates) | set(pd.DatetimeIndex(fact_dates).strftime('%Y-%m-%d')))
+
+# Function to record the dates whose top movers must be ranked again
+# The rankings cover every constituent of the staged Bhavdata, so they follow the changes of every sector
+def record_top_movers_dates(changed_dates, processed_store, dates, constituent_history, changed_since=None):
+    manifest = FileManifest(TOP_MOVERS_MANIFEST_PATH)
+    top_movers_dates = fact_changed_dates(manifest, constituent_history.fingerprint(), changed_dates, processed_store,
+                                          TOP_MOVERS_TABLE, dates, changed_since)
+    record_pending_dates(manifest, 'top_movers_dates', top_movers_dates)
+    manifest.save()
+
+# Function to clean Bhavdata files one at a time, with a memory ceiling independent of the history size
+@timed()
+def stream_bhavdata_files(staging_store=None, processed_store=None, membership=None, universes=FACT_UNIVERSES,
+                          constituent_history=None):
+    """
+    Every file is read, cleaned, filtered and projected on its own and then
+    appended to the staged and fact outputs, so only one day of data is held
+    in memory. Files are processed in date order and sorted by symbol, which
+    gives the same outputs as the in-memory modes.
+    Returns a data frame of the trading dates that were processed.
+    """
+
+    try:
+        staging_store = staging_store or CsvStore(STAGING_FOLDER_PATH)
+        processed_store = processed_store or CsvStore(PROCESSED_FOLDER_PATH)
+
+        # Get a list of all CSV files in the folder, in date order
+        csv_files = sorted((file for file in os.listdir(BHAVDATA_FOLDER_PATH) if file.endswith('.csv')), key=bhavdata_file_date)
+
+        manifest = FileManifest(BHAVDATA_MANIFEST_PATH)
+        manifest.clear()
+
+        staging_store.delete('sec_bhavdata_full_combined')
+        processed_store.delete('fact_bhavdata')
+        matrix_store = PriceMatrixStore(PRICE_MATRIX_FOLDER_PATH)
+        matrix_store.clear()
+        constituent_history = constituent_history or load_constituent_history(membership)
+        manifest.inputs['sector_list'] = constituent_history.fingerprint(universes)
+        record_constituent_history(manifest, constituent_history)
+
+        dates = []
+        row_count = fact_row_count = 0
+        for file in csv_files:
+            with timer('parse', table='sec_bhavdata_full_combined', file=file):
+                dfs = read_bhavdata_file(os.path.join(BHAVDATA_FOLDER_PATH, file))
+                dfs = dfs.sort_values(['DATE', 'SYMBOL'], kind='mergesort')
+            with timer('append', table='sec_bhavdata_full_combined', storage=staging_store.name):
+                staging_store.append(dfs, 'sec_bhavdata_full_combined')
+            save_price_matrix(dfs, pd.DatetimeIndex(dfs['DATE'].unique()), matrix_store)
+
+            fact_dfs = build_fact_bhavdata(dfs, constituent_history, universes)
+            with timer('append', table='fact_bhavdata', storage=processed_store.name):
+                processed_store.append(fact_dfs, 'fact_bhavdata')
+
+            manifest.record(BHAVDATA_FOLDER_PATH, file, dfs['DATE'].dt.strftime('%Y-%m-%d').unique())
+            dates.extend(dfs['DATE'].unique())
+            row_count += len(dfs)
+            fact_row_count += len(fact_dfs)
+
+        record_top_movers_dates(None, processed_store, None, constituent_history)
+        record_pending_dates(manifest, 'percent_change_dates', None)
+        manifest.save()
+
+        count('files_read', len(csv_files), table='sec_bhavdata_full_combined')
+        count('rows_read', row_count, table='sec_bhavdata_full_combined')
+        count('rows_written', row_count, table='sec_bhavdata_full_combined')
+        count('rows_written', fact_row_count, table='fact_bhavdata')
+        logging.info(f'Bhavdata streamed from {len(csv_files)} files: {row_count} staged rows, {fact_row_count} fact rows')
+
+        return pd.DataFrame({'DATE': pd.to_datetime(sorted(set(dates)))})
+    except Exception as e:
+
+        logging.error(f'Error in streaming Bhavdata files: {str(e)}')
+        raise
+
+# Function to clean Bhavdata files
+@timed()
+def clean_bhavdata_files(full_rebuild=False, staging_store=None, processed_store=None, membership=None, executor=None,
+                         universes=FACT_UNIVERSES, constituent_history=None):
+    try:
+        staging_store = staging_store or CsvStore(STAGING_FOLDER_PATH)
+        processed_store = processed_store or CsvStore(PROCESSED_FOLDER_PATH)
+
+        bhavdata_df, manifest, changed_dates = load_staged_data(BHAVDATA_FOLDER_PATH, staging_store, 'sec_bhavdata_full_combined',
+                                                                BHAVDATA_MANIFEST_PATH, read_bhavdata_file, ['DATE', 'SYMBOL'],
+                                                                full_rebuild, executor)
+
+        # Save cleaned Bhavdata to staging folder, replacing only the changed dates
+        save_table(staging_store, bhavdata_df, 'sec_bhavdata_full_combined', changed_dates)
+        save_price_matrix(bhavdata_df, changed_dates)
+
+        logging.info('Bhavdata cleaning completed.')
+
+        # Save the fact bhavdata, also rebuilding the dates affected by constituent changes
+        constituent_history = constituent_history or load_constituent_history(membership)
+        changed_since = record_constituent_history(manifest, constituent_history)
+        fact_dates = fact_changed_dates(manifest, constituent_history.fingerprint(universes), changed_dates, processed_store,
+                                        'fact_bhavdata', bhavdata_df['DATE'], changed_since)
+        fact_bhavdata_df = bhavdata_df if fact_dates is None else bhavdata_df[bhavdata_df['DATE'].isin(fact_dates)]
+        fact_daily_bhavdata_df = build_fact_bhavdata(fact_bhavdata_df, constituent_history, universes)
+        save_table(processed_store, fact_daily_bhavdata_df, 'fact_bhavdata', fact_dates)
+
+        logging.info('Daily Bhavdata Fact file saved')
+
+        # Only remember the ingested files once every output is written
+        record_top_movers_dates(changed_dates, processed_store, bhavdata_df['DATE'], constituent_history, changed_since)
+        record_pending_dates(manifest, 'percent_change_dates', fact_dates)
+        manifest.save()
+
+        return bhavdata_df
+    except Exception as e:
+
+        logging.error(f'Error in cleaning Bhavdata files: {str(e)}')
+        raise
+
+# Function to clean MA Report files
+@timed()
+def clean_ma_report_files(full_rebuild=False, staging_store=None, processed_store=None, membership=None, executor=None):
+    try:
+        staging_store = staging_store or CsvStore(STAGING_FOLDER_PATH)
+        processed_store = processed_store or CsvStore(PROCESSED_FOLDER_PATH)
+
+        ma_report_df, manifest, changed_dates = load_staged_data(MA_REPORT_FOLDER_PATH, staging_store, 'ma_report_combined',
+                                                                 MA_REPORT_MANIFEST_PATH, read_ma_report_file, ['DATE', 'SECTOR'],
+                                                                 full_rebuild, executor)
+
+        # Save cleaned MA Report to staging folder, replacing only the changed dates
+        save_table(staging_store, ma_report_df, 'ma_report_combined', changed_dates)
+
+        logging.info('MA Report cleaning completed.')
+
+        # Load the sector list
+        membership = load_sector_membership(membership)
+        sectors_fingerprint = fingerprint(pd.DataFrame({'SECTOR': membership.sectors}))
+
+        # Save the fact MA report, in full when the sector list changed
+        fact_dates = fact_changed_dates(manifest, sectors_fingerprint, changed_dates, processed_store, 'fact_MA_report')
+        fact_ma_report_df = ma_report_df if fact_dates is None else ma_report_df[ma_report_df['DATE'].isin(fact_dates)]
+        fact_ma_report_df = build_fact_ma_report(fact_ma_report_df, membership)
+        save_table(processed_store, fact_ma_report_df, 'fact_MA_report', fact_dates)
+
+        logging.info('MA report Fact file saved')
+
+        # Only remember the ingested files once every output is written
+        record_pending_dates(manifest, 'percent_change_dates', fact_dates)
+        manifest.save()
+
+        return ma_report_df
+    
+    except Exception as e:
+
+        logging.error(f'Error in cleaning MA Report files: {str(e)}')
+        raise
+
+# Function to create and save dimensions
+@timed()
+def create_dimensions(bhavdata_df, processed_store=None, full_rebuild=False, start_date=None, end_date=None):
+    """
+    Dim_Datetime is a contiguous calendar covering the years of the holiday
+    list, the dates of the data and the configured start and end dates.
+    Only the days missing from the saved dimension are built and added, and
+    it is rebuilt in full when the holiday list changed.
+    Returns the rows that were added.
+    """
+
+    try:
+        processed_store = processed_store or CsvStore(PROCESSED_FOLDER_PATH)
+
+        # Load the trading calendar
+        trading_calendar = get_trading_calendar(HOLIDAY_DATA_PATH)
+        calendar_fingerprint = trading_calendar.fingerprint()
+
+        # Days already covered by the saved dimension, unless it is stale
+        manifest = FileManifest(DIM_DATETIME_MANIFEST_PATH)
+        stored_range = manifest.inputs.get('date_range')
+        if full_rebuild or manifest.inputs.get('holiday_calendar') != calendar_fingerprint or not processed_store.exists('dim_datetime'):
+            stored_range = None
+
+        # Create and save Dim_Datetime
+        range_start, range_end = date_dimension_range(trading_calendar, bhavdata_df['DATE'], start_date, end_date)
+        datetime_df, date_range = extend_date_dimension(trading_calendar, range_start, range_end, stored_range)
+        save_table(processed_store, datetime_df, 'dim_datetime', None if stored_range is None else pd.DatetimeIndex(datetime_df['DATE']))
+
+        manifest.inputs['holiday_calendar'] = calendar_fingerprint
+        manifest.inputs['date_range'] = [str(day) for day in date_range]
+        manifest.save()
+
+        logging.info(f'Dimensions created and saved: {len(datetime_df)} days added, covering {date_range[0]} to {date_range[1]}.')
+
+        return datetime_df
+    
+    except Exception as e:
+    
+        logging.error(f'Error in creating dimensions: {str(e)}')
+        raise
+
+# Function to create and save the percent change facts
+@timed()
+def create_percent_change_facts(full_rebuild=False, processed_store=None):
+    """
+    The 1D/1W/1M/3M/YTD percent changes of every symbol and sector are
+    precomputed from the fact tables. Unless full_rebuild, only the dates
+    from the first date changed by the cleaners (recorded in the manifest of
+    the fact table), or missing from the existing tables, are computed, over
+    their lookback window.
+    """
+
+    try:
+        processed_store = processed_store or CsvStore(PROCESSED_FOLDER_PATH)
+
+        for table_name, (fact_table_name, key, price_column, manifest_path) in PERCENT_CHANGE_TABLES.items():
+            prices_df = processed_store.read(fact_table_name, columns=[key, 'DATE', price_column])
+            manifest = FileManifest(manifest_path)
+            changed_dates = manifest.inputs.get('percent_change_dates', [])
+
+            with timer('percent_change', table=table_name):
+                if not full_rebuild and changed_dates != 'all' and processed_store.exists(table_name):
+                    percent_change_df = update_percent_changes(processed_store.read(table_name), prices_df, key, price_column,
+                                                               changed_dates)
+                else:
+                    percent_change_df = compute_percent_changes(prices_df, key, price_column)
+
+            save_table(processed_store, percent_change_df, table_name)
+
+            manifest.inputs['percent_change_dates'] = []
+            manifest.save()
+
+        logging.info('Percent change facts saved.')
+
+    except Exception as e:
+
+        logging.error(f'Error in creating percent change facts: {str(e)}')
+        raise
+
+# Function to create and save the top gainers and losers of every sector, horizon and date
+@timed()
+def create_top_movers(staging_store=None, processed_store=None, membership=None, constituent_history=None,
+                      full_rebuild=False):
+    """
+    The percent changes of every constituent in the staged Bhavdata (not
+    only the stocks of the fact universes) are ranked among the constituents
+    of every sector on each date, for every horizon, and the top and bottom
+    TOP_K are saved for the query service. Unless full_rebuild, only the
+    dates from the first date changed by the Bhavdata cleaner (recorded in
+    the manifest of the rankings) are ranked again, over their lookback
+    window, and replaced in the table. The version and last date of the
+    rankings are recorded in their manifest, which the service watches to
+    reload them and clear its cache.
+    Returns the rankings of the ranked dates.
+    """
+
+    try:
+        staging_store = staging_store or CsvStore(STAGING_FOLDER_PATH)
+        processed_store = processed_store or CsvStore(PROCESSED_FOLDER_PATH)
+
+        manifest = FileManifest(TOP_MOVERS_MANIFEST_PATH)
+        pending_dates = manifest.inputs.get('top_movers_dates', 'all')
+        bhavdata_df = staging_store.read('sec_bhavdata_full_combined', columns=['SYMBOL', 'DATE', 'LAST_PRICE'])
+        constituent_history = constituent_history or load_constituent_history(membership)
+
+        rank_dates = None
+        if not full_rebuild and pending_dates != 'all' and processed_store.exists(TOP_MOVERS_TABLE):
+            if not pending_dates:
+                logging.info('Top movers up to date.')
+                return pd.DataFrame(columns=TOP_MOVERS_COLUMNS)
+            # Dates after the first changed one have shifted horizons, so they are ranked again too
+            pending_dates = pd.to_datetime(pending_dates)
+            trading_dates = pd.DatetimeIndex(bhavdata_df['DATE'].unique())
+            rank_dates = pending_dates.union(trading_dates[trading_dates >= pending_dates.min()])
+
+        with timer('rank', table=TOP_MOVERS_TABLE, dates='all' if rank_dates is None else len(rank_dates)):
+            percent_change_df = constituent_percent_changes(bhavdata_df, constituent_history, dates=rank_dates)
+            top_movers_df = rank_top_movers(percent_change_df, constituent_history)
+        save_table(processed_store, top_movers_df, TOP_MOVERS_TABLE, rank_dates)
+
+        # The manifest is written last, so the service only reloads complete rankings
+        version = fingerprint(top_movers_df)
+        if rank_dates is None:
+            saved_dates = top_movers_df['DATE']
+        else:
+            # Chained with the previous version, as only the ranked dates were fingerprinted
+            version = hashlib.sha256(f"{manifest.inputs.get(TOP_MOVERS_TABLE)}{version}".encode()).hexdigest()
+            saved_dates = processed_store.read(TOP_MOVERS_TABLE, columns=['DATE'])['DATE']
+        last_date = pd.to_datetime(saved_dates).max()
+        manifest.inputs[TOP_MOVERS_TABLE] = version
+        manifest.inputs['last_date'] = None if saved_dates.empty else f'{last_date:%Y-%m-%d}'
+        manifest.inputs['top_movers_dates'] = []
+        manifest.save()
+
+        logging.info(f'Top movers saved: {len(top_movers_df)} rows.')
+
+        return top_movers_df
+
+    except Exception as e:
+
+        logging.error(f'Error in creating top movers: {str(e)}')
+        raise
+
+# Function to create and save the sector returns aggregated from their constituents
+@timed()
+def create_sector_aggregates(staging_store=None, processed_store=None, membership=None, constituent_history=None):
+    """
+    The equal-weighted and traded-value-weighted returns, breadth and
+    contributions of every sector of the constituent lists are computed
+    from the staged Bhavdata, and reconciled with the sector index close of
+    the staged MA report. Both staged tables are read with only the columns
+    needed, so this also follows a streaming run.
+    Returns the sector returns.
+    """
+
+    try:
+        staging_store = staging_store or CsvStore(STAGING_FOLDER_PATH)
+        processed_store = processed_store or CsvStore(PROCESSED_FOLDER_PATH)
+
+        bhavdata_df = staging_store.read('sec_bhavdata_full_combined',
+                                         columns=['SYMBOL', 'DATE', RETURN_PRICE_COLUMN, QUANTITY_COLUMN])
+        ma_report_df = staging_store.read('ma_report_combined', columns=['SECTOR', 'DATE', 'CLOSE'])
+        constituent_history = constituent_history or load_constituent_history(membership)
+
+        with timer('aggregate', table='fact_sector_returns'):
+            sector_returns_df, contributions_df = aggregate_sectors(bhavdata_df, constituent_history)
+            sector_returns_df = reconcile_with_ma_report(sector_returns_df, ma_report_df)
+
+        sector_returns_df.insert(0, 'ID_SECTOR_RETURN', surrogate_key(sector_returns_df, ['SECTOR', 'DATE']))
+        contributions_df.insert(0, 'ID_SECTOR_CONTRIBUTION', surrogate_key(contributions_df, ['SECTOR', 'DATE', 'SYMBOL']))
+        save_table(processed_store, sector_returns_df, 'fact_sector_returns')
+        save_table(processed_store, contributions_df, 'fact_sector_contribution')
+
+        # Gap of the weighted constituent returns to the index returns of the MA report
+        gaps = sector_returns_df['VW_GAP'].abs().dropna()
+        if len(gaps):
+            logging.info(f'Sector returns reconciled with the MA report on {len(gaps)} sector days: '
+                         f'median gap {gaps.median():.4f} pp, maximum {gaps.max():.4f} pp (traded value weighted)')
+        logging.info('Sector aggregates saved.')
+
+        return sector_returns_df
+
+    except Exception as e:
+
+        logging.error(f'Error in creating sector aggregates: {str(e)}')
+        raise
+
+# Function to export the processed tables as CSV for the Power BI report
+@timed()
+def export_csv(processed_store):
+    csv_store = CsvStore(PROCESSED_FOLDER_PATH)
+    for table_name in PROCESSED_TABLES:
+        if processed_store.exists(table_name):
+            csv_store.write(processed_store.read(table_name), table_name)
+
+    logging.info('Processed tables exported to CSV.')
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Clean the raw NSE files and build the fact and dimension tables.')
+    parser.add_argument('--full-rebuild', action='store_true',
+                        help='Re-read every raw file instead of only the new or changed ones')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Rebuild the Bhavdata outputs one file at a time, with bounded memory')
+    parser.add_argument('--storage', choices=sorted(STORAGE_BACKENDS), default='csv',
+                        help='Storage backend for the staged and processed tables')
+    parser.add_argument('--export-csv', action='store_true',
+                        help='Also export the processed tables as CSV (for a non-CSV storage backend)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of processes parsing the raw files; above 1 the two cleaners also run concurrently')
+    parser.add_argument('--universes', nargs='+', default=FACT_UNIVERSES, metavar='SECTOR',
+                        help='Index universes whose stocks are kept in the Bhavdata fact, in tagging priority order')
+    parser.add_argument('--calendar-start', help='First date of the date dimension (YYYY-MM-DD), when earlier than the data')
+    parser.add_argument('--calendar-end', help='Last date of the date dimension (YYYY-MM-DD), when later than the data')
+    parser.add_argument('--profile', choices=PROFILE_MODES,
+                        help='Also capture a cProfile or tracemalloc profile of the run in its metrics file')
+    return parser.parse_args(argv)
+
+# Function to clean the Bhavdata and MA Report files, concurrently when an executor is given
+def clean_files(args, staging_store, processed_store, executor=None):
+    """
+    With an executor both cleaners run at the same time in threads of this
+    process and share its worker processes for parsing. The outputs are the
+    same as with the serial path.
+    Returns the Bhavdata and MA Report data frames.
+    """
+
+    # Sector list index shared by both cleaners
+    membership = load_sector_membership()
+
+    def clean_bhavdata():
+        with metrics.profiled():
+            if args.streaming:
+                return stream_bhavdata_files(staging_store, processed_store, membership, args.universes)
+            return clean_bhavdata_files(args.full_rebuild, staging_store, processed_store, membership, executor, args.universes)
+
+    def clean_ma_report():
+        with metrics.profiled():
+            return clean_ma_report_files(args.full_rebuild, staging_store, processed_store, membership, executor)
+
+    if executor is None:
+        return clean_bhavdata(), clean_ma_report()
+
+    with ThreadPoolExecutor(max_workers=2) as cleaner_executor:
+        bhavdata_future = cleaner_executor.submit(clean_bhavdata)
+        ma_report_future = cleaner_executor.submit(clean_ma_report)
+        return bhavdata_future.result(), ma_report_future.result()
+
+def main(argv=None):
+    """
+    The timings, counters and optional profile of the run are recorded in
+    its metrics file (logs/metrics/). Returns the exit code: 1 when a step failed.
+    """
+
+    args = parse_args(argv)
+
+    metrics.start_run('data_preprocessing', args.profile)
+    try:
+        staging_store = get_store(args.storage, STAGING_FOLDER_PATH)
+        processed_store = get_store(args.storage, PROCESSED_FOLDER_PATH)
+
+        # Clean Bhavdata and MA Report files
+        if args.workers > 1:
+            with ProcessPoolExecutor(max_workers=args.workers) as executor:
+                bhavdata_df, ma_report_df = clean_files(args, staging_store, processed_store, executor)
+        else:
+            bhavdata_df, ma_report_df = clean_files(args, staging_store, processed_store)
+
+        with metrics.profiled():
+            # Create and save dimensions
+            create_dimensions(bhavdata_df, processed_store, args.full_rebuild, args.calendar_start, args.calendar_end)
+
+            # Create and save the percent change facts
+            create_percent_change_facts(args.full_rebuild, processed_store)
+
+            # Rank the top gainers and losers for the query service
+            create_top_movers(staging_store, processed_store, full_rebuild=args.full_rebuild)
+
+            # Create and save the sector returns aggregated from the constituents
+            create_sector_aggregates(staging_store, processed_store)
+
+            # Export the processed tables for the Power BI report
+            if args.export_csv and processed_store.name != CsvStore.name:
+                export_csv(processed_store)
+
+        logging.info('Additional files created and saved.')
+
+        peak_memory_mb = get_peak_memory_mb()
+        if peak_memory_mb is not None:
+            logging.info(f'Peak memory of the run: {peak_memory_mb:.1f} MB')
+
+    except Exception as e:
+
+        logging.error(f'Error in data processing: {str(e)}')
+        metrics.finish_run('failed')
+        return 1
+
+    metrics.finish_run()
+    return 0
+
+
+
+# Main script
+if __name__ == '__main__':
+
+    sys.exit(main())
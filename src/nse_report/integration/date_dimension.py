@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+from nse_report.integration.keys import date_key
+from nse_report.extraction.trading_calendar import to_days
+
+# Trading day ordinals count the trading days from this Monday on
+ORDINAL_EPOCH = np.datetime64('2000-01-03', 'D')
+
+
+def build_date_dimension(calendar, start_date, end_date):
+    """
+    This function builds the date dimension of every calendar day in
+    [start_date, end_date], in one vectorized pass over the day array.
+    Besides the calendar attributes it holds, from the trading calendar:
+    FLAG ('Working' or 'Holiday'), TRADING_DAY_ORDINAL (number of trading
+    days from ORDINAL_EPOCH up to and including the date, so a holiday has
+    the ordinal of the trading day before it), the previous and next trading
+    days (strictly before and after the date) and the number of trading days
+    of the month and quarter up to and including the date.
+    Every column only depends on the date and the calendar, so a dimension
+    built in several ranges is the same as one built at once.
+    """
+
+    days = np.arange(to_days(start_date), to_days(end_date) + 1, dtype='datetime64[D]')
+    dates = pd.DatetimeIndex(days)
+    busday_calendar = calendar.busday_calendar
+
+    # First day of the month and of the quarter (months are counted from 1970-01)
+    months = days.astype('datetime64[M]')
+    month_starts = months.astype('datetime64[D]')
+    quarter_starts = (months - months.astype('int64') % 3).astype('datetime64[D]')
+    following_days = days + 1
+
+    datetime_df = pd.DataFrame({
+        'ID_DATETIME': date_key(dates),
+        'DATE': dates,
+        'DAY': dates.day,
+        'WEEKDAY': dates.weekday,
+        'WEEK': dates.isocalendar()['week'].to_numpy(),
+        'MONTH': dates.month,
+        'QUARTER': dates.quarter,
+        'YEAR': dates.year,
+        'FLAG': np.where(calendar.is_trading_day(days), 'Working', 'Holiday'),
+        'TRADING_DAY_ORDINAL': np.busday_count(ORDINAL_EPOCH, following_days, busdaycal=busday_calendar),
+        'PREVIOUS_TRADING_DAY': pd.DatetimeIndex(calendar.previous_trading_day(days)),
+        'NEXT_TRADING_DAY': pd.DatetimeIndex(calendar.next_trading_day(days)),
+        'MTD_TRADING_DAYS': np.busday_count(month_starts, following_days, busdaycal=busday_calendar),
+        'QTD_TRADING_DAYS': np.busday_count(quarter_starts, following_days, busdaycal=busday_calendar),
+    })
+    return datetime_df
+
+
+def date_dimension_range(calendar, dates=None, start_date=None, end_date=None):
+    """
+    This function returns the range of days the date dimension must cover:
+    the years of the holiday list, the dates of the data and the configured
+    start and end dates.
+    """
+
+    bounds = []
+    if len(calendar.holiday_array):
+        bounds += [calendar.coverage_start, calendar.coverage_end - 1]
+    if dates is not None and len(dates):
+        bounds += [to_days(dates.min()), to_days(dates.max())]
+    bounds += [to_days(date) for date in (start_date, end_date) if date is not None]
+    if not bounds:
+        raise ValueError('No holiday list, data or configured dates to derive the date dimension range from')
+    return min(bounds), max(bounds)
+
+
+def extend_date_dimension(calendar, start_date, end_date, stored_range=None):
+    """
+    This function returns the rows of the date dimension that a dimension
+    already built over `stored_range` (start, end) is missing to cover
+    [start_date, end_date], and the range covered once they are added.
+    The covered range is only ever extended, so it stays contiguous.
+    Without a stored range the whole dimension is built.
+    """
+
+    start_day, end_day = to_days(start_date), to_days(end_date)
+    if stored_range is None:
+        return build_date_dimension(calendar, start_day, end_day), (start_day, end_day)
+
+    stored_start, stored_end = to_days(stored_range[0]), to_days(stored_range[1])
+    new_start, new_end = min(start_day, stored_start), max(end_day, stored_end)
+    datetime_df = pd.concat([build_date_dimension(calendar, new_start, stored_start - 1),
+                             build_date_dimension(calendar, stored_end + 1, new_end)], ignore_index=True)
+    return datetime_df, (new_start, new_end)
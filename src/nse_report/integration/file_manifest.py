@@ -0,0 +1,121 @@
+import os
+import json
+import hashlib
+import logging
+
+
+class FileManifest:
+    """
+    This class keeps track of the raw files that have already been ingested.
+    For every file it records the name, size, modification time, content hash
+    and the trading dates the file contributed, and it is persisted as JSON
+    next to the staged outputs. `inputs` holds the fingerprints of the other
+    inputs the outputs were built from (e.g. the sector list).
+    """
+
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.entries = {}
+        self.inputs = {}
+
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as file:
+                content = json.load(file)
+            self.entries, self.inputs = content['files'], content['inputs']
+
+    @staticmethod
+    def file_hash(file_path):
+        """
+        This function returns the SHA-256 hex digest of a file, read in chunks.
+        """
+
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def is_unchanged(self, folder_path, file):
+        """
+        This function checks if a file matches its manifest entry.
+        Size and mtime are compared first, and the content hash is only
+        computed when they differ, so untouched files are never read.
+        """
+
+        entry = self.entries.get(file)
+        if entry is None:
+            return False
+
+        stat = os.stat(os.path.join(folder_path, file))
+        if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+            return True
+
+        if stat.st_size != entry['size']:
+            return False
+
+        if self.file_hash(os.path.join(folder_path, file)) == entry['sha256']:
+            # Touched but not modified, refresh the mtime so the next run is cheap
+            entry['mtime_ns'] = stat.st_mtime_ns
+            return True
+
+        return False
+
+    def diff(self, folder_path, files):
+        """
+        This function compares the files on disk with the manifest.
+        It returns the list of new or changed files and the list of
+        manifest entries whose file no longer exists.
+        """
+
+        files_on_disk = set(files)
+        changed_files = [file for file in files if not self.is_unchanged(folder_path, file)]
+        removed_files = [file for file in self.entries if file not in files_on_disk]
+        return changed_files, removed_files
+
+    def stale_dates(self, files):
+        """
+        This function returns the trading dates previously contributed by the given files.
+        """
+
+        dates = set()
+        for file in files:
+            dates.update(self.entries.get(file, {}).get('dates', []))
+        return dates
+
+    def record(self, folder_path, file, dates):
+        """
+        This function adds or replaces the manifest entry of a file.
+        """
+
+        file_path = os.path.join(folder_path, file)
+        stat = os.stat(file_path)
+        self.entries[file] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': self.file_hash(file_path),
+            'dates': sorted(dates),
+        }
+
+    def remove(self, files):
+        """
+        This function drops the manifest entries of the given files.
+        """
+
+        for file in files:
+            self.entries.pop(file, None)
+
+    def clear(self):
+        self.entries = {}
+        self.inputs = {}
+
+    def save(self):
+        """
+        This function writes the manifest to disk atomically.
+        """
+
+        os.makedirs(os.path.dirname(self.manifest_path) or '.', exist_ok=True)
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump({'files': self.entries, 'inputs': self.inputs}, file, indent=2, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+        logging.info(f'Manifest saved to {self.manifest_path}')
@@ -0,0 +1,38 @@
+import hashlib
+import numpy as np
+import pandas as pd
+
+
+def date_key(dates):
+    """
+    This function returns the yyyymmdd integer key of dates (e.g. 20230703),
+    the ID_DATETIME of the date dimension.
+    """
+
+    dates = pd.Series(pd.to_datetime(dates))
+    return (dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day).astype('int64').to_numpy()
+
+
+def surrogate_key(df, columns):
+    """
+    This function derives a stable int64 key from the natural key `columns`
+    of every row, so a row keeps its ID across reruns and rebuilds.
+    Dates are keyed by their yyyymmdd value and the other columns by their
+    values, whatever their dtype (str, object or category). The 64-bit hash
+    is shifted to a non-negative int64, as expected by the report.
+    """
+
+    key_df = pd.DataFrame({column: date_key(df[column]) if column == 'DATE' else df[column].to_numpy()
+                           for column in columns})
+    hashes = pd.util.hash_pandas_object(key_df, index=False).to_numpy()
+    return (hashes >> np.uint64(1)).astype('int64')
+
+
+def fingerprint(df):
+    """
+    This function returns a SHA-256 hex digest of the values of a data frame,
+    used to detect when an input of the outputs changed.
+    """
+
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha256(hashes.tobytes()).hexdigest()
@@ -0,0 +1,266 @@
+import re
+import csv
+import hashlib
+import datetime
+import threading
+from collections import OrderedDict, namedtuple
+import numpy as np
+import pandas as pd
+from nse_report.integration.schemas import (MA_ADVANCES_DECLINES_SCHEMA, MA_REPORT_SCHEMA, MA_TOP_GAINERS_SCHEMA,
+                                            SchemaDriftError, check_columns, file_date)
+
+# Number of parsed reports kept in memory, by file hash (about two years of reports)
+MA_REPORT_CACHE_SIZE = 512
+
+# Cells read as missing values in the numeric columns, as with pandas.read_csv
+MISSING_VALUES = {'', '-'}
+
+# Report date in the title of the report, e.g. 'MARKET ACTIVITY REPORT FOR 03-JUL-2023'
+TITLE_DATE_PATTERN = re.compile(r'\b(\d{1,2}-[A-Za-z]{3}-\d{4})\b')
+
+# Sections parsed into typed frames: name, schema and the test of the section title and header.
+# The other sections are kept as frames of strings, named after their title
+SECTION_TYPES = [
+    ('advances_declines', MA_ADVANCES_DECLINES_SCHEMA, lambda title, header: 'ADVANCES' in header),
+    ('index', MA_REPORT_SCHEMA, lambda title, header: 'INDEX' in header and 'CLOSE' in header),
+    ('top_gainers', MA_TOP_GAINERS_SCHEMA, lambda title, header: 'SYMBOL' in header and 'GAINER' in title),
+]
+
+# Offset index entry of a section: its name, title, header and the rows of its records [start, end)
+Section = namedtuple('Section', ['name', 'title', 'header', 'start', 'end'])
+
+
+class MaReport:
+    """
+    This class holds a parsed market activity report: its date, the offset
+    index of its sections and their records. The frame of a section
+    ('index', 'advances_declines', 'top_gainers' or the name of an untyped
+    section) is built the first time it is requested, then kept.
+    Parsed reports are shared by the cache, so their frames must be copied
+    before being modified.
+    """
+
+    def __init__(self, date, section_index, records, file_path='', frames=None):
+        self.date = date
+        self.section_index = section_index
+        self.records = records
+        self.file_path = file_path
+        self.frames = {} if frames is None else frames
+
+    @property
+    def section_names(self):
+        return [section.name for section in self.section_index]
+
+    def __getitem__(self, name):
+        frame = self.frames.get(name)
+        if frame is None:
+            section = next((section for section in self.section_index if section.name == name), None)
+            if section is None:
+                raise KeyError(name)
+            frame = self.frames[name] = section_frame(section, self.records, self.file_path)
+        return frame
+
+    def __contains__(self, name):
+        return name in self.section_names
+
+    def with_date(self, date):
+        # Same parsed report, with another date; the frames are shared
+        return MaReport(date, self.section_index, self.records, self.file_path, self.frames)
+
+
+def is_blank(record):
+    return not any(field.strip() for field in record)
+
+
+def index_sections(records):
+    """
+    This function builds the offset index of the sections of a report, in a
+    single pass over its records. Sections are separated by blank lines; the
+    leading single-field lines of a section are its title and the first line
+    with several fields is its header.
+    It returns the sections and the title lines of the sections without a
+    header (the report title).
+    """
+
+    section_index = []
+    title_lines = []
+    row = 0
+    while row < len(records):
+        if is_blank(records[row]):
+            row += 1
+            continue
+
+        titles = []
+        while row < len(records) and not is_blank(records[row]) and sum(1 for field in records[row] if field.strip()) == 1:
+            titles.append(next(field.strip() for field in records[row] if field.strip()))
+            row += 1
+
+        if row == len(records) or is_blank(records[row]):
+            title_lines += titles
+            continue
+
+        header = [field.strip().upper() for field in records[row]]
+        start = end = row + 1
+        while end < len(records) and not is_blank(records[end]):
+            end += 1
+        section_index.append(Section(None, ' '.join(titles).upper(), header, start, end))
+        row = end
+
+    return section_index, title_lines
+
+
+def section_name(title, header, names):
+    """
+    This function names a section after its type, or else its title, made unique among `names`.
+    """
+
+    name = next((name for name, _, matches in SECTION_TYPES if matches(title, header)), None)
+    if name is None:
+        name = re.sub(r'[^a-z0-9]+', '_', title.lower()).strip('_') or 'section'
+    unique_name, suffix = name, 2
+    while unique_name in names:
+        unique_name, suffix = f'{name}_{suffix}', suffix + 1
+    return unique_name
+
+
+def typed_frame(schema, header, rows, file_path):
+    """
+    This function builds the frame of a section from its records, projecting
+    the schema columns by position with their dtypes. Blank and '-' cells of
+    the numeric columns are NaN; an integer column with such cells is read as
+    float64, as pandas.read_csv does. Any other text raises SchemaDriftError.
+    """
+
+    check_columns(schema, header, file_path)
+
+    data = {}
+    for column in schema['usecols']:
+        position = header.index(column)
+        values = [row[position].strip() if position < len(row) else '' for row in rows]
+        dtype = schema['dtypes'][column]
+        if dtype == 'str':
+            data[column] = pd.array(values, dtype='str')
+            continue
+        missing = [value in MISSING_VALUES for value in values]
+        if any(missing):
+            values = ['nan' if is_missing else value for value, is_missing in zip(values, missing)]
+            dtype = np.result_type(dtype, np.float64)
+        try:
+            data[column] = np.array(values, dtype=dtype)
+        except ValueError:
+            raise SchemaDriftError(f'Schema drift in {file_path}: column {column} is not {dtype}')
+    return pd.DataFrame(data)
+
+
+def untyped_frame(header, rows):
+    columns = [column or f'COLUMN_{position}' for position, column in enumerate(header)]
+    rows = [[field.strip() for field in row[:len(columns)]] + [''] * (len(columns) - len(row)) for row in rows]
+    return pd.DataFrame(rows, columns=columns, dtype='str')
+
+
+def report_title_date(title_lines):
+    for line in title_lines:
+        match = TITLE_DATE_PATTERN.search(line)
+        if match:
+            return datetime.datetime.strptime(match.group(1).title(), '%d-%b-%Y')
+    return None
+
+
+def section_frame(section, records, file_path=''):
+    """
+    This function builds the frame of a section from its records: typed with
+    the schema of its type, or else of strings.
+    """
+
+    rows = records[section.start:section.end]
+    schema = next((schema for name, schema, _ in SECTION_TYPES if name == section.name), None)
+    if schema is None:
+        return untyped_frame(section.header, rows)
+    return typed_frame(schema, section.header, rows, file_path)
+
+
+def parse_ma_report(data, file_path=''):
+    """
+    This function parses the content of a market activity report: the
+    records are split once and indexed by section. The index table is
+    required and parsed at once, the other sections when requested.
+    It returns the MaReport; its date is the one of the report title, if any.
+    """
+
+    records = list(csv.reader(data.decode('utf-8', errors='replace').splitlines()))
+    section_index, title_lines = index_sections(records)
+
+    names = []
+    for position, section in enumerate(section_index):
+        name = section_name(section.title, section.header, names)
+        section_index[position] = section._replace(name=name)
+        names.append(name)
+
+    if 'index' not in names:
+        raise SchemaDriftError(f'Schema drift in {file_path}: index table header not found')
+
+    report = MaReport(report_title_date(title_lines), section_index, records, file_path)
+    report['index']
+    return report
+
+
+class MaReportCache:
+    """
+    This class keeps the parsed reports in memory by hash of the file
+    content, so a report read again (by another stage, or after a rebuild)
+    is not parsed again. The least recently used reports are evicted above
+    `max_size` reports.
+    """
+
+    def __init__(self, max_size=MA_REPORT_CACHE_SIZE):
+        self.max_size = max_size
+        self.reports = OrderedDict()
+        self.lock = threading.Lock()
+
+    def read(self, file_path):
+        """
+        This function reads a report, parsing it only if its content was not parsed before.
+        A report without a date in its title is dated from its file name.
+        """
+
+        with open(file_path, 'rb') as file:
+            data = file.read()
+        file_hash = hashlib.sha256(data).hexdigest()
+
+        with self.lock:
+            report = self.reports.get(file_hash)
+            if report is not None:
+                self.reports.move_to_end(file_hash)
+
+        if report is None:
+            report = parse_ma_report(data, file_path)
+            with self.lock:
+                self.reports[file_hash] = report
+                while len(self.reports) > self.max_size:
+                    self.reports.popitem(last=False)
+
+        if report.date is None:
+            # The same content may be saved under another name, so the dated report is not cached
+            file_name = file_path.replace('\\', '/').rsplit('/', 1)[-1]
+            return report.with_date(file_date(file_name, MA_REPORT_SCHEMA))
+        return report
+
+
+# Parsed reports of the process
+ma_report_cache = MaReportCache()
+
+
+def read_ma_report(file_path):
+    """
+    This function reads and parses a market activity report, through the cache of the process.
+    """
+
+    return ma_report_cache.read(file_path)
+
+
+def read_ma_report_csv(file_path):
+    """
+    This function reads the index table of a market activity report.
+    """
+
+    return read_ma_report(file_path)['index']
@@ -0,0 +1,271 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# Columns of the Bhavdata stored as date x symbol matrices. Both are float64, so a
+# symbol without data on a date (not listed yet, suspended) is NaN
+MATRIX_FIELDS = ['LAST_PRICE', 'DELIV_QTY']
+
+# Symbol columns reserved when the matrices are created or outgrown, so new listings
+# are usually added without rewriting the matrices
+MIN_SYMBOL_CAPACITY = 1024
+
+META_FILE = 'meta.json'
+DATES_FILE = 'dates.i8'
+SYMBOLS_FILE = 'symbols.npy'
+
+
+class PriceMatrixStore:
+    """
+    This class stores Bhavdata columns as dense, memory-mapped date x symbol
+    matrices (one raw float64 file per column, data/interim/price_matrix/),
+    one row per trading day in date order and one column per symbol.
+    Sidecar files map the rows to dates (dates.i8, days since the epoch) and
+    the columns to symbols (symbols.npy); meta.json holds the number of rows
+    and symbols and is replaced last, so an append interrupted half way is
+    ignored. A new trading day is appended as one row of every matrix.
+    Readers map the files without loading them: rows and columns are views
+    of the mapped matrices, and only the pages read are loaded in memory.
+    """
+
+    def __init__(self, folder_path, fields=MATRIX_FIELDS):
+        self.folder_path = folder_path
+        self.fields = list(fields)
+        self.load()
+
+    def load(self):
+        """
+        This function reads the sidecar files: the dates and symbols of the stored rows and columns.
+        """
+
+        meta_path = os.path.join(self.folder_path, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as file:
+                meta = json.load(file)
+        else:
+            meta = {'fields': self.fields, 'rows': 0, 'symbols': 0, 'capacity': 0}
+
+        self.row_count = meta['rows']
+        self.capacity = meta['capacity']
+        self.stored = meta['fields'] == self.fields and os.path.exists(meta_path)
+
+        self.dates = np.array([], dtype='datetime64[D]')
+        self.symbols = np.array([], dtype=str)
+        if self.stored:
+            days = np.fromfile(os.path.join(self.folder_path, DATES_FILE), dtype='int64', count=self.row_count)
+            self.dates = days.astype('datetime64[D]')
+            self.symbols = np.load(os.path.join(self.folder_path, SYMBOLS_FILE))[:meta['symbols']]
+        self.symbol_offsets = {symbol: offset for offset, symbol in enumerate(self.symbols.tolist())}
+
+    def exists(self):
+        return self.stored
+
+    def field_path(self, field):
+        return os.path.join(self.folder_path, f'{field}.f8')
+
+    def date_offset(self, date):
+        """
+        This function returns the row of a date, or None when it is not stored.
+        """
+
+        day = np.datetime64(pd.Timestamp(date).date(), 'D')
+        row = int(np.searchsorted(self.dates, day))
+        return row if row < self.row_count and self.dates[row] == day else None
+
+    def symbol_offset(self, symbol):
+        """
+        This function returns the column of a symbol, or None when it is not stored.
+        """
+
+        return self.symbol_offsets.get(symbol)
+
+    def matrix(self, field='LAST_PRICE'):
+        """
+        This function returns the read-only memory-mapped date x symbol matrix of a field.
+        """
+
+        if field not in self.fields:
+            raise KeyError(f'{field} is not stored, expected one of {self.fields}')
+        if not self.row_count:
+            return np.empty((0, len(self.symbols)))
+        mapped = np.memmap(self.field_path(field), dtype='float64', mode='r', shape=(self.row_count, self.capacity))
+        return mapped[:, :len(self.symbols)]
+
+    def cross_section(self, date, field='LAST_PRICE'):
+        """
+        This function returns the values of every symbol on a date, as a
+        Series over a view of the mapped row.
+        """
+
+        row = self.date_offset(date)
+        if row is None:
+            raise KeyError(f'{pd.Timestamp(date):%Y-%m-%d} is not stored')
+        return pd.Series(self.matrix(field)[row], index=self.symbols, name=field, copy=False)
+
+    def history(self, symbol, field='LAST_PRICE', start_date=None, end_date=None):
+        """
+        This function returns the values of a symbol over the dates in
+        [start_date, end_date], as a Series over a view of the mapped column.
+        """
+
+        column = self.symbol_offset(symbol)
+        if column is None:
+            raise KeyError(f'{symbol} is not stored')
+        start, end = self.date_range_rows(start_date, end_date)
+        return pd.Series(self.matrix(field)[start:end, column], index=pd.DatetimeIndex(self.dates[start:end]),
+                         name=symbol, copy=False)
+
+    def date_range_rows(self, start_date=None, end_date=None):
+        start = 0 if start_date is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start_date).date(), 'D')))
+        end = self.row_count if end_date is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end_date).date(), 'D'), side='right'))
+        return start, end
+
+    def percent_change(self, periods=1, field='LAST_PRICE', start_date=None, end_date=None):
+        """
+        This function computes the percent change of every symbol over
+        `periods` trading days, for the dates in [start_date, end_date]. Only
+        those rows and the `periods` rows before them are read from the
+        mapped matrix. The first rows of the history have no base and are NaN.
+        It returns a date x symbol frame, in percent.
+        """
+
+        start, end = self.date_range_rows(start_date, end_date)
+        prices = self.matrix(field)
+        changes = np.full((max(0, end - start), len(self.symbols)), np.nan)
+        first = max(start, periods)
+        if first < end:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                changes[first - start:] = (prices[first:end] / prices[first - periods:end - periods] - 1) * 100
+        return pd.DataFrame(changes, index=pd.DatetimeIndex(self.dates[start:end]), columns=self.symbols, copy=False)
+
+    def write(self, df, changed_dates=None):
+        """
+        This function writes the rows of `df` (DATE, SYMBOL and the fields)
+        of the changed dates (all of them by default). Dates after the last
+        stored date are appended, stored dates are replaced in place; any
+        other change (a date removed or added before the last one) rebuilds
+        the matrices from `df`, which must then hold the whole history.
+        """
+
+        if changed_dates is None or not self.stored:
+            self.rebuild(df)
+            return
+
+        changed_days = np.unique(np.asarray(pd.DatetimeIndex(changed_dates).values.astype('datetime64[D]')))
+        df_days = df['DATE'].to_numpy().astype('datetime64[D]')
+        last_day = self.dates[-1] if self.row_count else None
+        stored = np.isin(changed_days, self.dates)
+        present = np.isin(changed_days, df_days)
+        appended = last_day is None or changed_days > last_day
+        if not np.all(present & (stored | appended)):
+            self.rebuild(df)
+            return
+
+        changed_df = df[np.isin(df_days, changed_days)]
+        self.write_rows(changed_df)
+
+    def rebuild(self, df):
+        """
+        This function replaces the matrices by the rows of `df`.
+        """
+
+        # Without meta.json the matrices are not read until the rebuild is complete
+        self.clear()
+        os.makedirs(self.folder_path, exist_ok=True)
+        for field in self.fields:
+            open(self.field_path(field), 'wb').close()
+        open(os.path.join(self.folder_path, DATES_FILE), 'wb').close()
+        self.stored = True
+        self.write_rows(df)
+
+    def write_rows(self, df):
+        """
+        This function writes the rows of the dates of `df`, which are stored
+        dates or dates after the last stored one, with one vectorized
+        scatter per field.
+        """
+
+        if df.empty:
+            self.save_meta()
+            return
+
+        df_days = df['DATE'].to_numpy().astype('datetime64[D]')
+        new_days = np.setdiff1d(np.unique(df_days), self.dates)
+        symbols = df['SYMBOL'].to_numpy()
+        new_symbols = pd.unique(symbols[~pd.Index(symbols).isin(self.symbols)])
+        self.add_symbols(new_symbols)
+
+        rows = self.row_count + len(new_days)
+        all_days = np.concatenate([self.dates, new_days])
+        row_offsets = np.searchsorted(all_days, df_days)
+        column_offsets = pd.Index(self.symbols).get_indexer(symbols)
+
+        for field in self.fields:
+            # Appended rows are written as NaN first, after the rows of the last complete write
+            with open(self.field_path(field), 'r+b') as file:
+                file.truncate(self.row_count * self.capacity * 8)
+                file.seek(0, os.SEEK_END)
+                np.full((len(new_days), self.capacity), np.nan).tofile(file)
+            mapped = np.memmap(self.field_path(field), dtype='float64', mode='r+', shape=(rows, self.capacity))
+            touched_rows = np.unique(row_offsets)
+            mapped[touched_rows] = np.nan
+            mapped[row_offsets, column_offsets] = df[field].to_numpy(dtype='float64')
+            mapped.flush()
+            del mapped
+
+        with open(os.path.join(self.folder_path, DATES_FILE), 'r+b') as file:
+            file.seek(self.row_count * 8)
+            new_days.astype('int64').tofile(file)
+            file.truncate()
+
+        self.row_count = rows
+        self.dates = all_days
+        self.save_meta()
+
+    def add_symbols(self, new_symbols):
+        """
+        This function adds columns for new symbols, rewriting the matrices
+        with twice the capacity when the reserved columns are used up.
+        """
+
+        if not len(new_symbols):
+            return
+
+        symbol_count = len(self.symbols) + len(new_symbols)
+        if symbol_count > self.capacity:
+            capacity = max(MIN_SYMBOL_CAPACITY, 2 * self.capacity, symbol_count)
+            for field in self.fields:
+                grown = np.full((self.row_count, capacity), np.nan)
+                if self.row_count:
+                    grown[:, :self.capacity] = np.memmap(self.field_path(field), dtype='float64', mode='r',
+                                                         shape=(self.row_count, self.capacity))
+                temp_path = self.field_path(field) + '.tmp'
+                grown.tofile(temp_path)
+                os.replace(temp_path, self.field_path(field))
+            self.capacity = capacity
+            self.save_meta()
+
+        self.symbols = np.concatenate([self.symbols, np.asarray(new_symbols, dtype=str)])
+        self.symbol_offsets = {symbol: offset for offset, symbol in enumerate(self.symbols.tolist())}
+        temp_path = os.path.join(self.folder_path, SYMBOLS_FILE + '.tmp.npy')
+        np.save(temp_path, self.symbols)
+        os.replace(temp_path, os.path.join(self.folder_path, SYMBOLS_FILE))
+
+    def save_meta(self):
+        meta = {'fields': self.fields, 'rows': self.row_count, 'symbols': len(self.symbols), 'capacity': self.capacity}
+        temp_path = os.path.join(self.folder_path, META_FILE + '.tmp')
+        with open(temp_path, 'w') as file:
+            json.dump(meta, file)
+        os.replace(temp_path, os.path.join(self.folder_path, META_FILE))
+
+    def clear(self):
+        """
+        This function deletes the matrices and their sidecar files.
+        """
+
+        for file_name in [META_FILE, DATES_FILE, SYMBOLS_FILE] + [f'{field}.f8' for field in self.fields]:
+            file_path = os.path.join(self.folder_path, file_name)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        self.load()
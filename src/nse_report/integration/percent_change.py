@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+# Horizons in trading days, aligned on the trading dates present in the data
+HORIZONS = {
+    '1D': 1,
+    '1W': 5,
+    '1M': 21,
+    '3M': 63,
+}
+
+# Columns of the percent change tables, after the key and the date
+PERCENT_CHANGE_COLUMNS = [f'PCT_{horizon}' for horizon in HORIZONS] + ['PCT_YTD']
+
+
+def price_matrix(df, key, price_column):
+    """
+    This function pivots a long price frame into a dense date x key matrix,
+    with one row per trading date present in the data.
+    """
+
+    return df.pivot_table(index='DATE', columns=key, values=price_column, aggfunc='last', observed=True).sort_index()
+
+
+def year_to_date_base(prices):
+    """
+    This function returns, for every row of the price matrix, the price the YTD
+    change is measured against: the last price of the previous year, or the
+    first price of the year when the previous year is not in the data.
+    """
+
+    years = prices.index.year
+    year_end_prices = prices.ffill().groupby(years).last()
+    year_start_prices = prices.groupby(years).transform('first')
+
+    # Previous year's last price, only when that year is present
+    previous_year_end = year_end_prices.reindex(year_end_prices.index - 1)
+    previous_year_end.index = year_end_prices.index
+    base = previous_year_end.reindex(years)
+    base.index = prices.index
+    return base.fillna(year_start_prices)
+
+
+def compute_percent_changes(df, key, price_column, dates=None):
+    """
+    This function computes the percent changes of `price_column` per `key`
+    over every horizon with shifts of the date x key price matrix.
+    Only the rows of `dates` (all dates by default) are returned, in long format:
+    key, DATE and one PCT_* column per horizon, in percent.
+    """
+
+    prices = price_matrix(df, key, price_column)
+    changes = {f'PCT_{horizon}': prices / prices.shift(periods) - 1 for horizon, periods in HORIZONS.items()}
+    changes['PCT_YTD'] = prices / year_to_date_base(prices) - 1
+
+    # Keep the (date, key) cells that have a price
+    mask = prices.notna().to_numpy()
+    if dates is not None:
+        mask = mask & prices.index.isin(pd.to_datetime(dates))[:, np.newaxis]
+    date_positions, key_positions = np.nonzero(mask)
+
+    result = pd.DataFrame({
+        key: prices.columns.to_numpy()[key_positions],
+        'DATE': prices.index.to_numpy()[date_positions],
+    })
+    for column in PERCENT_CHANGE_COLUMNS:
+        result[column] = (changes[column].to_numpy()[mask] * 100).round(4)
+    return result
+
+
+def lookback_start(trading_dates, first_date):
+    """
+    This function returns the earliest trading date needed to compute every
+    horizon from `first_date` on: the longest horizon back, or the end of the
+    previous year for YTD, whichever is earlier.
+    """
+
+    position = trading_dates.searchsorted(first_date)
+    year_start_position = trading_dates.searchsorted(pd.Timestamp(year=first_date.year, month=1, day=1))
+    start_position = max(0, min(position - max(HORIZONS.values()), year_start_position - 1))
+    return trading_dates[start_position]
+
+
+def lookback_window(df, key, price_column, first_date):
+    """
+    This function returns the rows of `df` needed to compute every horizon
+    from `first_date` on: the rows from its lookback start, plus the last
+    price of every key before it (the YTD base of a key that did not trade on
+    the previous year's last date).
+    """
+
+    trading_dates = pd.DatetimeIndex(df['DATE'].unique()).sort_values()
+    window_start = lookback_start(trading_dates, first_date)
+    before_df = df[(df['DATE'] < window_start) & df[price_column].notna()]
+    last_before_df = before_df[before_df['DATE'] == before_df.groupby(key, observed=True)['DATE'].transform('max')]
+    return pd.concat([last_before_df, df[df['DATE'] >= window_start]])
+
+
+def update_percent_changes(existing_df, df, key, price_column, changed_dates=None):
+    """
+    This function brings `existing_df` up to date with the prices of `df`.
+    Rows are recomputed from the first changed date: the first date whose
+    (key, date) pairs differ (new dates, or rows added or removed on past
+    dates) or the first of `changed_dates`, the dates whose prices were
+    replaced. Every key is recomputed over the lookback window of that date
+    only, plus its last price before the window (the YTD base of a key that
+    did not trade on the previous year's last date), so adding the newest
+    day costs a few months of data instead of the full history.
+    """
+
+    trading_dates = pd.DatetimeIndex(df['DATE'].unique()).sort_values()
+    if trading_dates.empty:
+        return existing_df.iloc[0:0].reset_index(drop=True)
+
+    existing_keys = pd.MultiIndex.from_arrays([existing_df[key].astype(str), pd.to_datetime(existing_df['DATE'])])
+    keys = pd.MultiIndex.from_arrays([df[key].astype(str), pd.to_datetime(df['DATE'])])
+    first_dates = existing_keys.symmetric_difference(keys).get_level_values(1)
+    if changed_dates is not None:
+        first_dates = first_dates.append(pd.DatetimeIndex(pd.to_datetime(list(changed_dates))))
+    if first_dates.empty:
+        return existing_df
+
+    first_date = first_dates.min()
+    if first_date <= trading_dates[0]:
+        return compute_percent_changes(df, key, price_column)
+
+    # Dates after the first changed one have shifted horizons, so they are recomputed too
+    recompute_dates = trading_dates[trading_dates >= first_date]
+    existing_df = existing_df[existing_df['DATE'] < first_date]
+    if recompute_dates.empty:
+        # Only the latest dates were removed
+        return existing_df.reset_index(drop=True)
+
+    window_df = lookback_window(df, key, price_column, recompute_dates[0])
+    new_df = compute_percent_changes(window_df, key, price_column, recompute_dates)
+    return pd.concat([existing_df, new_df], ignore_index=True)
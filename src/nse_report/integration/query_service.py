@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from nse_report.integration.file_manifest import FileManifest
+from nse_report.integration.storage import STORAGE_BACKENDS, CsvStore, get_store
+from nse_report.integration.top_movers import TOP_MOVERS_MANIFEST_PATH, TOP_MOVERS_TABLE, TopMoversIndex
+
+# Set up logging
+logging.basicConfig(filename='logs/query_service.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Constants
+PROCESSED_FOLDER_PATH = 'data/processed/'
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8050
+
+# Number of query results kept in memory
+QUERY_CACHE_SIZE = 4096
+
+
+class RankingsUnavailableError(Exception):
+    """
+    Raised when the rankings cannot be loaded: the table was not built yet,
+    or is being rewritten by the preprocessing.
+    """
+
+
+class TopMoversService:
+    """
+    This class serves top gainers/losers queries from the rankings
+    precomputed by the preprocessing. Results are kept in an LRU cache of
+    `cache_size` queries. The preprocessing records the fingerprint and last
+    date of the rankings in their manifest: when it changes (a new trading
+    day was ingested, or past data corrected) the rankings are reloaded and
+    the cache is cleared, so cached results are never stale.
+    Cached results are shared between callers and must not be modified.
+    """
+
+    def __init__(self, processed_store=None, cache_size=QUERY_CACHE_SIZE, manifest_path=TOP_MOVERS_MANIFEST_PATH):
+        self.processed_store = processed_store or CsvStore(PROCESSED_FOLDER_PATH)
+        self.cache_size = cache_size
+        self.manifest_path = manifest_path
+        self.results = OrderedDict()
+        self.lock = threading.Lock()
+        self.index = None
+        self.manifest_stat = None
+        self.version = None
+        self.hits = self.misses = 0
+        self.refresh()
+
+    def refresh(self):
+        """
+        This function reloads the rankings when their manifest changed.
+        The manifest is only read when its size or modification time
+        changed, so checking costs one stat per query. A failed load raises
+        RankingsUnavailableError and is retried on the next call.
+        It returns True when the rankings were reloaded.
+        """
+
+        try:
+            stat = os.stat(self.manifest_path)
+            manifest_stat = (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            manifest_stat = None
+        if manifest_stat == self.manifest_stat and self.index is not None:
+            return False
+
+        with self.lock:
+            if manifest_stat == self.manifest_stat and self.index is not None:
+                return False
+            try:
+                version = FileManifest(self.manifest_path).inputs.get(TOP_MOVERS_TABLE)
+                if version == self.version and self.index is not None:
+                    self.manifest_stat = manifest_stat
+                    return False
+
+                if not self.processed_store.exists(TOP_MOVERS_TABLE):
+                    raise RankingsUnavailableError(f'The {TOP_MOVERS_TABLE} table was not built, run the preprocessing first')
+                index = TopMoversIndex(self.processed_store.read(TOP_MOVERS_TABLE))
+            except RankingsUnavailableError:
+                raise
+            except Exception as e:
+                raise RankingsUnavailableError(f'The {TOP_MOVERS_TABLE} table cannot be read: {str(e)}') from e
+
+            self.index = index
+            self.manifest_stat = manifest_stat
+            self.version = version
+            self.results.clear()
+
+        last_date = self.index.last_date
+        logging.info(f'Top movers loaded, up to {last_date:%Y-%m-%d}' if last_date is not None else 'Top movers loaded, empty')
+        return True
+
+    def query(self, sector, horizon, side='GAINERS', date=None, n=10):
+        """
+        This function returns the `n` top gainers or losers of a sector over
+        a horizon as of a date (see TopMoversIndex.query), from the cache
+        when the same query was answered since the last reload.
+        """
+
+        self.refresh()
+        key = (sector, horizon, side.upper(), None if date is None else str(date), n)
+
+        with self.lock:
+            result = self.results.get(key)
+            if result is not None:
+                self.results.move_to_end(key)
+                self.hits += 1
+                return result
+            index = self.index
+
+        result = index.query(sector, horizon, side, date, n)
+        with self.lock:
+            self.misses += 1
+            # Not cached when the rankings were reloaded in between
+            if index is self.index and self.cache_size > 0:
+                self.results[key] = result
+                while len(self.results) > self.cache_size:
+                    self.results.popitem(last=False)
+        return result
+
+    def status(self):
+        self.refresh()
+        last_date = self.index.last_date
+        return {
+            'last_date': None if last_date is None else f'{last_date:%Y-%m-%d}',
+            'sectors': len(self.index.sectors),
+            'cached': len(self.results),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+class TopMoversHandler(BaseHTTPRequestHandler):
+    """
+    This class answers the HTTP requests of the query service, with JSON:
+    GET /top-movers?sector=NIFTY BANK&horizon=1W&side=gainers&date=2023-07-03&n=10
+    (side, date and n are optional) and GET /health. While the rankings
+    cannot be loaded, the requests are answered 503.
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        service = self.server.service
+
+        try:
+            if url.path == '/health':
+                self.send_json(200, {'status': 'ok', **service.status()})
+            elif url.path == '/top-movers':
+                if 'sector' not in params or 'horizon' not in params:
+                    raise ValueError('sector and horizon are required')
+                self.send_json(200, service.query(params['sector'], params['horizon'].upper(), params.get('side', 'GAINERS'),
+                                                  params.get('date'), int(params.get('n', 10))))
+            else:
+                self.send_json(404, {'error': f'Unknown path {url.path}'})
+        except RankingsUnavailableError as e:
+            logging.error(f'Rankings unavailable: {str(e)}')
+            self.send_json(503, {'error': str(e)})
+        except KeyError as e:
+            self.send_json(404, {'error': e.args[0] if e.args else str(e)})
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+
+    def send_json(self, status, content):
+        body = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.info(f'{self.address_string()} - {format % args}')
+
+
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    This function creates the HTTP server of a service, one thread per
+    request. Port 0 picks a free port (server.server_address).
+    """
+
+    server = ThreadingHTTPServer((host, port), TopMoversHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the top gainers and losers of the sectors over HTTP.')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--storage', choices=sorted(STORAGE_BACKENDS), default='csv',
+                        help='Storage backend of the processed tables')
+    parser.add_argument('--cache-size', type=int, default=QUERY_CACHE_SIZE,
+                        help='Number of query results kept in memory')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """
+    This function serves the queries until interrupted.
+    It returns the exit code: 1 when the rankings cannot be loaded.
+    """
+
+    args = parse_args(argv)
+
+    try:
+        service = TopMoversService(get_store(args.storage, PROCESSED_FOLDER_PATH), args.cache_size)
+    except Exception as e:
+        logging.error(f'Error in loading the top movers: {str(e)}')
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+
+    server = create_server(service, args.host, args.port)
+    host, port = server.server_address[:2]
+    logging.info(f'Serving top movers on http://{host}:{port}')
+    print(f'Serving top movers on http://{host}:{port}/top-movers (Ctrl+C to stop)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == '__main__':
+
+    sys.exit(main())
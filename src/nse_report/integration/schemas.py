@@ -0,0 +1,147 @@
+import datetime
+import pandas as pd
+
+
+class SchemaDriftError(ValueError):
+    """
+    Raised when an NSE file does not have the columns its schema expects.
+    """
+
+
+# Security-wise full bhavcopy (sec_bhavdata_full_DDMMYYYY.csv)
+# The header and values are padded with a leading space, which skipinitialspace removes.
+BHAVDATA_SCHEMA = {
+    'columns': ['SYMBOL', 'SERIES', 'DATE1', 'PREV_CLOSE', 'OPEN_PRICE', 'HIGH_PRICE', 'LOW_PRICE', 'LAST_PRICE',
+                'CLOSE_PRICE', 'AVG_PRICE', 'TTL_TRD_QNTY', 'TURNOVER_LACS', 'NO_OF_TRADES', 'DELIV_QTY', 'DELIV_PER'],
+    'usecols': ['SYMBOL', 'SERIES', 'DATE1', 'OPEN_PRICE', 'HIGH_PRICE', 'LOW_PRICE', 'LAST_PRICE', 'CLOSE_PRICE',
+                'TTL_TRD_QNTY', 'NO_OF_TRADES', 'DELIV_QTY'],
+    'dtypes': {
+        'SYMBOL': 'str',
+        'SERIES': 'category',
+        # A single date per file, parsed once per category
+        'DATE1': 'category',
+        'OPEN_PRICE': 'float64',
+        'HIGH_PRICE': 'float64',
+        'LOW_PRICE': 'float64',
+        'LAST_PRICE': 'float64',
+        'CLOSE_PRICE': 'float64',
+        'TTL_TRD_QNTY': 'int64',
+        'NO_OF_TRADES': 'int64',
+        # '-' for series without delivery data, cast to int once filtered to EQ
+        'DELIV_QTY': 'float64',
+    },
+    'na_values': ['-'],
+    'date_column': 'DATE1',
+    'date_format': '%d-%b-%Y',
+    'file_date_format': '%d%m%Y',
+}
+
+# Index table of the market activity report (MADDMMYY.csv)
+# Only the columns used are required, the report carries a few more (previous close, gain/loss).
+MA_REPORT_SCHEMA = {
+    'columns': ['INDEX', 'OPEN', 'HIGH', 'LOW', 'CLOSE'],
+    'usecols': ['INDEX', 'OPEN', 'HIGH', 'LOW', 'CLOSE'],
+    'allow_extra_columns': True,
+    'dtypes': {
+        'INDEX': 'str',
+        'OPEN': 'float64',
+        'HIGH': 'float64',
+        'LOW': 'float64',
+        'CLOSE': 'float64',
+    },
+    'file_date_format': '%d%m%y',
+}
+
+# Advances/declines section of the market activity report
+MA_ADVANCES_DECLINES_SCHEMA = {
+    'columns': ['INDEX', 'ADVANCES', 'DECLINES', 'UNCHANGED'],
+    'usecols': ['INDEX', 'ADVANCES', 'DECLINES', 'UNCHANGED'],
+    'allow_extra_columns': True,
+    'dtypes': {
+        'INDEX': 'str',
+        'ADVANCES': 'int64',
+        'DECLINES': 'int64',
+        'UNCHANGED': 'int64',
+    },
+}
+
+# Top gainers section of the market activity report
+MA_TOP_GAINERS_SCHEMA = {
+    'columns': ['SYMBOL', 'SERIES', 'CLOSE', 'GAIN(%)'],
+    'usecols': ['SYMBOL', 'SERIES', 'CLOSE', 'GAIN(%)'],
+    'allow_extra_columns': True,
+    'dtypes': {
+        'SYMBOL': 'str',
+        'SERIES': 'str',
+        'CLOSE': 'float64',
+        'GAIN(%)': 'float64',
+    },
+}
+
+# Sector constituents list (combined_data.csv)
+SECTOR_LIST_SCHEMA = {
+    'columns': ['SYMBOL', 'SECTOR'],
+    'usecols': ['SYMBOL', 'SECTOR'],
+    'dtypes': {
+        'SYMBOL': 'str',
+        'SECTOR': 'str',
+    },
+}
+
+
+def check_columns(schema, columns, file_path):
+    """
+    This function compares the header of a file with its schema and raises
+    SchemaDriftError on any missing or unexpected column.
+    """
+
+    columns = [column.strip() for column in columns]
+    missing_columns = [column for column in schema['columns'] if column not in columns]
+    unexpected_columns = [column for column in columns if column and column not in schema['columns']
+                          and not schema.get('allow_extra_columns', False)]
+    if missing_columns or unexpected_columns:
+        raise SchemaDriftError(f'Schema drift in {file_path}: missing columns {missing_columns}, '
+                               f'unexpected columns {unexpected_columns}')
+
+
+def read_header(file_path):
+    with open(file_path) as file:
+        return file.readline().rstrip('\r\n').split(',')
+
+
+def file_date(file_name, schema):
+    """
+    This function parses the trading date from the 6 or 8 digits before '.csv' in a file name.
+    """
+
+    date_length = 8 if schema['file_date_format'] == '%d%m%Y' else 6
+    return datetime.datetime.strptime(file_name[-4 - date_length:-4], schema['file_date_format'])
+
+
+def read_bhavdata_csv(file_path):
+    """
+    This function reads a bhavcopy file, parsing only the needed columns
+    with their final dtypes and the trading date with its explicit format.
+    Only the EQ series is kept.
+    """
+
+    check_columns(BHAVDATA_SCHEMA, read_header(file_path), file_path)
+
+    df = pd.read_csv(file_path, usecols=BHAVDATA_SCHEMA['usecols'], dtype=BHAVDATA_SCHEMA['dtypes'],
+                     na_values=BHAVDATA_SCHEMA['na_values'], keep_default_na=False, skipinitialspace=True)
+
+    df = df[df['SERIES'] == 'EQ'].drop(columns=['SERIES'])
+    df['DELIV_QTY'] = df['DELIV_QTY'].astype('int64')
+    dates = df.pop(BHAVDATA_SCHEMA['date_column'])
+    parsed_dates = pd.to_datetime(dates.cat.categories, format=BHAVDATA_SCHEMA['date_format'])
+    df.insert(1, 'DATE', parsed_dates[dates.cat.codes.to_numpy()])
+    return df
+
+
+def read_sector_list_csv(file_path):
+    """
+    This function reads the sector constituents list.
+    """
+
+    check_columns(SECTOR_LIST_SCHEMA, read_header(file_path), file_path)
+    return pd.read_csv(file_path, usecols=SECTOR_LIST_SCHEMA['usecols'], dtype=SECTOR_LIST_SCHEMA['dtypes'])
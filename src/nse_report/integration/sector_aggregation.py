@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+# Price the constituent returns are measured on: the official close, as for the index close
+RETURN_PRICE_COLUMN = 'CLOSE_PRICE'
+
+# Traded quantity of the day, valued at the close to weight the constituents
+QUANTITY_COLUMN = 'TTL_TRD_QNTY'
+
+# Columns of the sector returns table, returns in percent
+SECTOR_RETURN_COLUMNS = ['SECTOR', 'DATE', 'CONSTITUENTS', 'ADVANCES', 'DECLINES', 'UNCHANGED', 'TRADED_VALUE',
+                         'EW_RETURN', 'VW_RETURN']
+
+# Columns added by the reconciliation with the MA report, differences in percentage points
+RECONCILIATION_COLUMNS = ['MA_CLOSE', 'MA_RETURN', 'EW_GAP', 'VW_GAP']
+
+# Columns of the contribution table: the return and traded value weight of every constituent,
+# and its contribution to the weighted sector return in percentage points
+CONTRIBUTION_COLUMNS = ['SECTOR', 'DATE', 'SYMBOL', 'RETURN', 'WEIGHT', 'CONTRIBUTION']
+
+
+def daily_returns(df, key, price_column):
+    """
+    This function computes the return of every row of `df` against the price
+    of the same key on the previous trading date present in the data, as the
+    1D percent change does. A row without a price on the previous trading
+    date has no return (NaN).
+    It returns the returns (as fractions), the date codes of the rows and the
+    trading dates the codes refer to.
+    """
+
+    date_codes, dates = pd.factorize(df['DATE'], sort=True)
+    key_codes, _ = pd.factorize(df[key])
+    prices = df[price_column].to_numpy(dtype='float64')
+
+    # Consecutive rows of the same key on consecutive trading dates, after sorting by (key, date)
+    order = np.lexsort((date_codes, key_codes))
+    sorted_prices, sorted_keys, sorted_dates = prices[order], key_codes[order], date_codes[order]
+    previous = (sorted_keys[1:] == sorted_keys[:-1]) & (sorted_dates[1:] == sorted_dates[:-1] + 1)
+
+    returns = np.full(len(df), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[order[1:]] = np.where(previous, sorted_prices[1:] / sorted_prices[:-1] - 1, np.nan)
+    returns[~np.isfinite(returns)] = np.nan
+    return returns, date_codes, pd.DatetimeIndex(dates)
+
+
+def aggregate_sectors(bhavdata_df, constituent_history, sectors=None):
+    """
+    This function aggregates the constituent returns of the Bhavdata
+    (SYMBOL, DATE, CLOSE_PRICE, TTL_TRD_QNTY) into daily sector returns:
+    equal-weighted, traded-value-weighted and the breadth of the sector.
+    Every row is matched with all the sectors its symbol belonged to on its
+    date, and each (row, sector) pair gets the integer code of its
+    (date, sector) group, so every statistic is one bincount over the pairs.
+    Only the constituents with a return count; a sector-day without any is left out.
+    It returns the sector returns and the contributions of the constituents
+    to the weighted return, both sorted by date and sector.
+    """
+
+    returns, date_codes, dates = daily_returns(bhavdata_df, 'SYMBOL', RETURN_PRICE_COLUMN)
+    traded_values = bhavdata_df[QUANTITY_COLUMN].to_numpy(dtype='float64') * bhavdata_df[RETURN_PRICE_COLUMN].to_numpy(dtype='float64')
+
+    row_positions, sector_codes, sectors = constituent_history.memberships(bhavdata_df, sectors)
+    valid = ~np.isnan(returns[row_positions]) & np.isfinite(traded_values[row_positions])
+    row_positions, sector_codes = row_positions[valid], sector_codes[valid]
+    pair_returns, pair_values = returns[row_positions], traded_values[row_positions]
+
+    # Groups are numbered by date, then sector, which is the order of the output
+    groups = date_codes[row_positions].astype(np.int64) * len(sectors) + sector_codes
+    group_count = len(dates) * len(sectors)
+
+    constituents = np.bincount(groups, minlength=group_count)
+    advances = np.bincount(groups[pair_returns > 0], minlength=group_count)
+    declines = np.bincount(groups[pair_returns < 0], minlength=group_count)
+    total_values = np.bincount(groups, pair_values, minlength=group_count)
+    return_sums = np.bincount(groups, pair_returns, minlength=group_count)
+    weighted_return_sums = np.bincount(groups, pair_values * pair_returns, minlength=group_count)
+
+    present = np.flatnonzero(constituents)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        equal_weighted = return_sums[present] / constituents[present]
+        value_weighted = np.where(total_values[present] > 0, weighted_return_sums[present] / total_values[present], np.nan)
+
+    sector_returns_df = pd.DataFrame({
+        'SECTOR': sectors.to_numpy()[present % len(sectors)],
+        'DATE': dates[present // len(sectors)],
+        'CONSTITUENTS': constituents[present],
+        'ADVANCES': advances[present],
+        'DECLINES': declines[present],
+        'UNCHANGED': constituents[present] - advances[present] - declines[present],
+        'TRADED_VALUE': total_values[present],
+        'EW_RETURN': (equal_weighted * 100).round(4),
+        'VW_RETURN': (value_weighted * 100).round(4),
+    })
+
+    # Contributions, in the order of the groups and then of the rows
+    order = np.lexsort((row_positions, groups))
+    row_positions, groups, pair_returns, pair_values = row_positions[order], groups[order], pair_returns[order], pair_values[order]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = np.where(total_values[groups] > 0, pair_values / total_values[groups], np.nan)
+
+    contributions_df = pd.DataFrame({
+        'SECTOR': sectors.to_numpy()[groups % len(sectors)],
+        'DATE': dates[groups // len(sectors)],
+        'SYMBOL': bhavdata_df['SYMBOL'].to_numpy()[row_positions],
+        'RETURN': (pair_returns * 100).round(4),
+        'WEIGHT': weights.round(6),
+        'CONTRIBUTION': (weights * pair_returns * 100).round(4),
+    })
+    return sector_returns_df, contributions_df
+
+
+def reconcile_with_ma_report(sector_returns_df, ma_report_df):
+    """
+    This function adds to the sector returns the close of the sector index
+    in the MA report (SECTOR, DATE, CLOSE), its return over the previous
+    trading date of the report and the gaps of the constituent returns to
+    it. A sector-day missing from the report has no gap (NaN).
+    """
+
+    index_returns, _, _ = daily_returns(ma_report_df, 'SECTOR', 'CLOSE')
+    ma_returns_df = pd.DataFrame({
+        'SECTOR': ma_report_df['SECTOR'].to_numpy(),
+        'DATE': pd.to_datetime(ma_report_df['DATE']).to_numpy(),
+        'MA_CLOSE': ma_report_df['CLOSE'].to_numpy(dtype='float64'),
+        'MA_RETURN': (index_returns * 100).round(4),
+    }).drop_duplicates(['SECTOR', 'DATE'], keep='last')
+
+    reconciled_df = sector_returns_df.merge(ma_returns_df, on=['SECTOR', 'DATE'], how='left')
+    reconciled_df['EW_GAP'] = (reconciled_df['EW_RETURN'] - reconciled_df['MA_RETURN']).round(4)
+    reconciled_df['VW_GAP'] = (reconciled_df['VW_RETURN'] - reconciled_df['MA_RETURN']).round(4)
+    return reconciled_df[SECTOR_RETURN_COLUMNS + RECONCILIATION_COLUMNS]
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+from nse_report.integration.keys import fingerprint
+from nse_report.integration.schemas import read_sector_list_csv
+
+
+def lookup_codes(categories, values):
+    """
+    This function returns the position of every value in `categories`, -1 when absent.
+    Only the distinct values are hashed, which is much faster on long string columns.
+    """
+
+    value_codes, unique_values = pd.factorize(values)
+    codes = categories.get_indexer(unique_values)
+    # factorize codes missing values as -1, which picks the appended -1
+    return np.append(codes, -1)[value_codes]
+
+
+class SectorMembership:
+    """
+    This class indexes the sector constituents list once for all the joins.
+    Symbols and sectors are coded as integers (`symbols` and `sectors` hold
+    the categories) and the symbols of every sector are stored in CSR form.
+    Lookups of a whole column factorize it, look its distinct values up in
+    the categories and map the codes back with array indexing.
+    """
+
+    def __init__(self, sector_list_df):
+        pairs_df = sector_list_df[['SECTOR', 'SYMBOL']].dropna().drop_duplicates()
+
+        # Sectors keep the order of the list, symbols are sorted
+        self.sectors = pd.Index(pairs_df['SECTOR'].unique())
+        self.symbols = pd.Index(np.sort(pairs_df['SYMBOL'].unique()))
+        sector_codes = self.sectors.get_indexer(pairs_df['SECTOR']).astype(np.int32)
+        symbol_codes = self.symbols.get_indexer(pairs_df['SYMBOL']).astype(np.int32)
+
+        # sector -> symbols, in the order of the list
+        order = np.argsort(sector_codes, kind='stable')
+        self.sector_offsets = np.concatenate([[0], np.cumsum(np.bincount(sector_codes, minlength=len(self.sectors)))])
+        self.sector_symbol_codes = symbol_codes[order]
+
+    @classmethod
+    def from_csv(cls, file_path):
+        return cls(read_sector_list_csv(file_path))
+
+    def symbols_of(self, sector):
+        """
+        This function returns the symbols of a sector, as an array.
+        """
+
+        code = self.sectors.get_loc(sector)
+        return self.symbols.to_numpy()[self.sector_symbol_codes[self.sector_offsets[code]:self.sector_offsets[code + 1]]]
+
+    def has_sector(self, sectors):
+        """
+        This function returns a boolean mask of the values that are known sectors.
+        """
+
+        return lookup_codes(self.sectors, sectors) >= 0
+
+    def pairs(self, universes=None):
+        """
+        This function returns the (SYMBOL, SECTOR) pairs of `universes` (all sectors by default).
+        """
+
+        sectors = self.sectors if universes is None else [sector for sector in universes if sector in self.sectors]
+        return pd.DataFrame([(symbol, sector) for sector in sectors for symbol in self.symbols_of(sector)],
+                            columns=['SYMBOL', 'SECTOR'])
+
+    def fingerprint(self, universes=None):
+        """
+        This function returns a fingerprint of the (SYMBOL, SECTOR) pairs of
+        `universes` (all sectors by default), to detect membership changes.
+        """
+
+        return fingerprint(self.pairs(universes))
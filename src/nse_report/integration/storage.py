@@ -0,0 +1,284 @@
+import os
+import json
+import uuid
+import shutil
+import logging
+import pandas as pd
+
+# Columns stored as categoricals in the columnar store
+CATEGORICAL_COLUMNS = ['SYMBOL', 'SECTOR']
+
+# Column used to partition the fact tables of the columnar store
+PARTITION_COLUMN = 'DATE'
+
+# Prefix of the dimension tables, stored unpartitioned
+DIMENSION_TABLE_PREFIX = 'dim_'
+
+INT32_MIN, INT32_MAX = -2**31, 2**31 - 1
+
+
+def compact_dtypes(df):
+    """
+    This function returns a copy of a data frame with compact dtypes:
+    categorical symbols/sectors and int32 quantities. Floats keep their
+    float64 precision (float32 cannot hold every price in paise), and
+    surrogate key columns (ID_*) and integers that do not fit in int32 are
+    left untouched.
+    """
+
+    df = df.copy()
+    for column in df.columns:
+        if column in CATEGORICAL_COLUMNS:
+            df[column] = df[column].astype('category')
+        elif column.startswith('ID_'):
+            continue
+        elif pd.api.types.is_integer_dtype(df[column]):
+            if df.empty or (df[column].min() >= INT32_MIN and df[column].max() <= INT32_MAX):
+                df[column] = df[column].astype('int32')
+    return df
+
+
+def replaced_dates(df, dates=None):
+    """
+    This function returns the dates replaced by an upsert, as a DatetimeIndex.
+    """
+
+    if dates is None:
+        dates = df[PARTITION_COLUMN].unique()
+    return pd.DatetimeIndex(pd.to_datetime(list(dates))).unique()
+
+
+def filter_date_range(df, start_date=None, end_date=None):
+    """
+    This function keeps the rows of a data frame whose DATE lies in [start_date, end_date].
+    """
+
+    if start_date is not None:
+        df = df[df[PARTITION_COLUMN] >= pd.Timestamp(start_date)]
+    if end_date is not None:
+        df = df[df[PARTITION_COLUMN] <= pd.Timestamp(end_date)]
+    return df
+
+
+class CsvStore:
+    """
+    This class stores each table as a single CSV file in a folder.
+    It is the default backend, as the Power BI report reads these files directly.
+    """
+
+    name = 'csv'
+
+    def __init__(self, folder_path):
+        self.folder_path = folder_path
+
+    def path(self, table_name):
+        return os.path.join(self.folder_path, f'{table_name}.csv')
+
+    def exists(self, table_name):
+        return os.path.exists(self.path(table_name))
+
+    def write(self, df, table_name):
+        os.makedirs(self.folder_path, exist_ok=True)
+        df.to_csv(self.path(table_name), index=False)
+        logging.info(f'Saved {len(df)} rows to {self.path(table_name)}')
+
+    def append(self, df, table_name):
+        """
+        This function appends rows to a table, writing the header if the table is new.
+        """
+
+        os.makedirs(self.folder_path, exist_ok=True)
+        df.to_csv(self.path(table_name), mode='a', header=not self.exists(table_name), index=False)
+
+    def delete(self, table_name):
+        if self.exists(table_name):
+            os.remove(self.path(table_name))
+
+    def upsert(self, df, table_name, dates=None):
+        """
+        This function replaces the rows of `dates` (by default the dates of `df`)
+        with the rows of `df`, keeping the table sorted by date. A CSV table
+        is rewritten as a whole.
+        """
+
+        if not self.exists(table_name):
+            self.write(df, table_name)
+            return
+
+        dates = replaced_dates(df, dates)
+        # Parse every date column back, so the rows are concatenated and written the same way
+        date_columns = [column for column in df.columns if pd.api.types.is_datetime64_any_dtype(df[column])]
+        existing_df = pd.read_csv(self.path(table_name), float_precision='round_trip',
+                                  parse_dates=sorted(set(date_columns) | {PARTITION_COLUMN}))
+        existing_df = existing_df[~existing_df[PARTITION_COLUMN].isin(dates)]
+        combined_df = pd.concat([existing_df, df], ignore_index=True)
+        self.write(combined_df.sort_values(PARTITION_COLUMN, kind='mergesort'), table_name)
+
+    def read(self, table_name, columns=None, start_date=None, end_date=None):
+        """
+        This function reads a table back. CSV has no predicate pushdown,
+        so the date range is applied after parsing.
+        """
+
+        df = pd.read_csv(self.path(table_name), usecols=columns, float_precision='round_trip')
+        if PARTITION_COLUMN in df.columns:
+            df[PARTITION_COLUMN] = pd.to_datetime(df[PARTITION_COLUMN])
+        return filter_date_range(df, start_date, end_date).reset_index(drop=True)
+
+
+class ParquetStore:
+    """
+    This class stores each table as a Parquet dataset using compact dtypes.
+    The fact tables (every table with a DATE column, other than the
+    dimensions) are partitioned by DATE: upserts only rewrite the partitions
+    of their dates, and date-range reads only open the matching ones. The
+    dimension tables and the tables without dates are stored unpartitioned.
+    Requires the optional `pyarrow` dependency.
+    """
+
+    name = 'parquet'
+
+    def __init__(self, folder_path):
+        self.folder_path = folder_path
+
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError('The parquet storage backend requires pyarrow (pip install pyarrow)') from e
+
+    def path(self, table_name):
+        return os.path.join(self.folder_path, f'{table_name}.parquet')
+
+    def schema_path(self, table_name):
+        return os.path.join(self.path(table_name), '_columns.json')
+
+    def exists(self, table_name):
+        return os.path.exists(self.schema_path(table_name))
+
+    def partitioned(self, table_name, columns):
+        return PARTITION_COLUMN in columns and not table_name.startswith(DIMENSION_TABLE_PREFIX)
+
+    def _partitioning(self):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        return ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.date32())]), flavor='hive')
+
+    def _write_dataset(self, df, table_name, dataset_path, **kwargs):
+        """
+        This function writes the rows of a table as new files of a dataset,
+        one folder per date for a fact table.
+        """
+
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        table = pa.Table.from_pandas(compact_dtypes(df), preserve_index=False)
+        if PARTITION_COLUMN in df.columns:
+            table = table.set_column(table.schema.get_field_index(PARTITION_COLUMN), PARTITION_COLUMN,
+                                     table[PARTITION_COLUMN].cast(pa.date32()))
+        if self.partitioned(table_name, df.columns):
+            # One partition per date of the rows, however long the history
+            kwargs.update(partitioning=self._partitioning(), max_partitions=max(df[PARTITION_COLUMN].nunique(), 1))
+        ds.write_dataset(table, dataset_path, format='parquet', existing_data_behavior='overwrite_or_ignore', **kwargs)
+
+    def write(self, df, table_name):
+        dataset_path = self.path(table_name)
+        temp_path = dataset_path + '.tmp'
+        shutil.rmtree(temp_path, ignore_errors=True)
+
+        self._write_dataset(df, table_name, temp_path)
+
+        with open(os.path.join(temp_path, '_columns.json'), 'w') as file:
+            json.dump(list(df.columns), file)
+
+        # Swap the new dataset in place of the old one
+        shutil.rmtree(dataset_path, ignore_errors=True)
+        os.replace(temp_path, dataset_path)
+        logging.info(f'Saved {len(df)} rows to {dataset_path}')
+
+    def append(self, df, table_name):
+        """
+        This function appends rows to a table as new files in its dataset,
+        without reading or rewriting the existing ones.
+        """
+
+        self._write_dataset(df, table_name, self.path(table_name),
+                            basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet')
+
+        if not self.exists(table_name):
+            with open(self.schema_path(table_name), 'w') as file:
+                json.dump(list(df.columns), file)
+
+    def delete(self, table_name):
+        shutil.rmtree(self.path(table_name), ignore_errors=True)
+
+    def upsert(self, df, table_name, dates=None):
+        """
+        This function replaces the rows of `dates` (by default the dates of `df`)
+        with the rows of `df`. Only the partitions of those dates are deleted
+        and written again; an unpartitioned table is rewritten as a whole.
+        """
+
+        if not self.exists(table_name):
+            self.write(df, table_name)
+            return
+
+        if not self.partitioned(table_name, df.columns):
+            dates = replaced_dates(df, dates)
+            existing_df = self.read(table_name)
+            existing_df = existing_df[~existing_df[PARTITION_COLUMN].isin(dates)]
+            combined_df = pd.concat([existing_df, df], ignore_index=True)
+            self.write(combined_df.sort_values(PARTITION_COLUMN, kind='mergesort'), table_name)
+            return
+
+        for date in replaced_dates(df, dates):
+            shutil.rmtree(os.path.join(self.path(table_name), f'{PARTITION_COLUMN}={date:%Y-%m-%d}'), ignore_errors=True)
+        if not df.empty:
+            self.append(df, table_name)
+
+    def read(self, table_name, columns=None, start_date=None, end_date=None):
+        """
+        This function reads a table back, pushing the column projection and
+        the date range down to the Parquet reader.
+        """
+
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        with open(self.schema_path(table_name)) as file:
+            stored_columns = json.load(file)
+        columns = [column for column in stored_columns if columns is None or column in columns]
+
+        partitioning = self._partitioning() if self.partitioned(table_name, stored_columns) else None
+        dataset = ds.dataset(self.path(table_name), format='parquet', partitioning=partitioning)
+
+        row_filter = None
+        if start_date is not None:
+            row_filter = ds.field(PARTITION_COLUMN) >= pa.scalar(pd.Timestamp(start_date).date(), pa.date32())
+        if end_date is not None:
+            end_filter = ds.field(PARTITION_COLUMN) <= pa.scalar(pd.Timestamp(end_date).date(), pa.date32())
+            row_filter = end_filter if row_filter is None else row_filter & end_filter
+
+        table = dataset.to_table(columns=columns, filter=row_filter)
+        df = table.to_pandas(date_as_object=False)
+        if PARTITION_COLUMN in df.columns:
+            df[PARTITION_COLUMN] = df[PARTITION_COLUMN].astype('datetime64[ns]')
+            df = df.sort_values(PARTITION_COLUMN, kind='mergesort')
+        return df[columns].reset_index(drop=True)
+
+
+STORAGE_BACKENDS = {
+    CsvStore.name: CsvStore,
+    ParquetStore.name: ParquetStore,
+}
+
+
+def get_store(backend, folder_path):
+    """
+    This function returns the storage backend registered under the given name.
+    """
+
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f'Unknown storage backend: {backend}')
+    return STORAGE_BACKENDS[backend](folder_path)
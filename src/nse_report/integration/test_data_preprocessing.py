@@ -0,0 +1,69 @@
+import os
+import shutil
+import pandas as pd
+import pytest
+from nse_report.extraction.trading_calendar import get_trading_calendar
+from nse_report.integration.storage import get_store
+
+
+@pytest.fixture
+def data_preprocessing(data_root):
+    # Imported from the data folder, as it logs to logs/data_preprocessing.log
+    from nse_report.integration import data_preprocessing
+    from synthetic_data import generate
+
+    generate(str(data_root), days=30, symbol_count=80)
+    get_trading_calendar.cache_clear()
+    yield data_preprocessing
+    get_trading_calendar.cache_clear()
+
+
+def read_processed_tables(data_preprocessing, storage):
+    """
+    This function reads every processed table, sorted so that tables written in another order compare equal.
+    """
+
+    processed_store = get_store(storage, data_preprocessing.PROCESSED_FOLDER_PATH)
+    tables = {}
+    for file in sorted(os.listdir(data_preprocessing.PROCESSED_FOLDER_PATH)):
+        table_name, _ = os.path.splitext(file)
+        df = processed_store.read(table_name)
+        tables[table_name] = df.sort_values(list(df.columns), kind='mergesort', ignore_index=True)
+    return tables
+
+
+def move_files(folder_path, files, destination_path):
+    os.makedirs(destination_path, exist_ok=True)
+    for file in files:
+        shutil.move(os.path.join(folder_path, file), os.path.join(destination_path, file))
+
+
+@pytest.mark.parametrize('storage', ['csv', 'parquet'])
+def test_incremental_runs_match_a_full_rebuild(data_preprocessing, storage):
+    bhavdata_files = sorted(os.listdir(data_preprocessing.BHAVDATA_FOLDER_PATH))
+    ma_report_files = sorted(os.listdir(data_preprocessing.MA_REPORT_FOLDER_PATH))
+
+    # The first run only has the older files
+    move_files(data_preprocessing.BHAVDATA_FOLDER_PATH, bhavdata_files[-3:], 'later/bhavdata')
+    move_files(data_preprocessing.MA_REPORT_FOLDER_PATH, ma_report_files[-3:], 'later/ma_report')
+    assert data_preprocessing.main(['--storage', storage]) == 0
+
+    # New trading days arrive, a past report is corrected and another one withdrawn
+    move_files('later/bhavdata', bhavdata_files[-3:], data_preprocessing.BHAVDATA_FOLDER_PATH)
+    move_files('later/ma_report', ma_report_files[-3:], data_preprocessing.MA_REPORT_FOLDER_PATH)
+    corrected_path = os.path.join(data_preprocessing.BHAVDATA_FOLDER_PATH, bhavdata_files[10])
+    with open(corrected_path) as file:
+        lines = file.readlines()
+    with open(corrected_path, 'w') as file:
+        file.writelines(lines[:-5])
+    os.remove(os.path.join(data_preprocessing.MA_REPORT_FOLDER_PATH, ma_report_files[12]))
+    assert data_preprocessing.main(['--storage', storage]) == 0
+    incremental_tables = read_processed_tables(data_preprocessing, storage)
+
+    assert data_preprocessing.main(['--storage', storage, '--full-rebuild']) == 0
+    full_tables = read_processed_tables(data_preprocessing, storage)
+
+    assert {'fact_bhavdata', 'fact_MA_report', 'dim_datetime', 'top_movers'} <= set(full_tables)
+    assert list(incremental_tables) == list(full_tables)
+    for table_name, full_df in full_tables.items():
+        pd.testing.assert_frame_equal(incremental_tables[table_name], full_df, obj=table_name)
@@ -0,0 +1,73 @@
+import os
+import json
+import pytest
+from nse_report.integration.file_manifest import FileManifest
+
+
+@pytest.fixture
+def raw_folder(tmp_path):
+    folder_path = tmp_path / 'raw'
+    os.makedirs(folder_path)
+    for file, content in [('a.csv', 'SYMBOL\nSBIN\n'), ('b.csv', 'SYMBOL\nINFY\n')]:
+        (folder_path / file).write_text(content)
+    return str(folder_path)
+
+
+@pytest.fixture
+def manifest(tmp_path, raw_folder):
+    manifest = FileManifest(str(tmp_path / 'interim' / 'manifest.json'))
+    manifest.record(raw_folder, 'a.csv', ['2023-07-04', '2023-07-03'])
+    manifest.record(raw_folder, 'b.csv', ['2023-07-05'])
+    return manifest
+
+
+def test_new_files_are_changed(tmp_path, raw_folder):
+    manifest = FileManifest(str(tmp_path / 'manifest.json'))
+
+    assert manifest.diff(raw_folder, ['a.csv', 'b.csv']) == (['a.csv', 'b.csv'], [])
+
+
+def test_recorded_files_are_unchanged(manifest, raw_folder):
+    assert manifest.diff(raw_folder, ['a.csv', 'b.csv']) == ([], [])
+
+
+def test_modified_and_removed_files_are_detected(manifest, raw_folder):
+    with open(os.path.join(raw_folder, 'a.csv'), 'a') as file:
+        file.write('TCS\n')
+    os.remove(os.path.join(raw_folder, 'b.csv'))
+
+    assert manifest.diff(raw_folder, ['a.csv']) == (['a.csv'], ['b.csv'])
+    assert manifest.stale_dates(['a.csv', 'b.csv']) == {'2023-07-03', '2023-07-04', '2023-07-05'}
+
+
+def test_touched_files_are_unchanged_and_refreshed(manifest, raw_folder):
+    file_path = os.path.join(raw_folder, 'a.csv')
+    stat = os.stat(file_path)
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert manifest.diff(raw_folder, ['a.csv', 'b.csv']) == ([], [])
+    assert manifest.entries['a.csv']['mtime_ns'] == stat.st_mtime_ns + 10 ** 9
+
+
+def test_same_size_edits_are_changed(manifest, raw_folder):
+    file_path = os.path.join(raw_folder, 'a.csv')
+    stat = os.stat(file_path)
+    with open(file_path, 'w') as file:
+        file.write('SYMBOL\nSBIM\n')
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert manifest.diff(raw_folder, ['a.csv', 'b.csv']) == (['a.csv'], [])
+
+
+def test_saved_manifest_is_loaded_back(manifest):
+    manifest.inputs['percent_change_dates'] = ['2023-07-05']
+    manifest.save()
+
+    loaded = FileManifest(manifest.manifest_path)
+
+    assert loaded.entries == manifest.entries
+    assert loaded.inputs == {'percent_change_dates': ['2023-07-05']}
+    assert loaded.entries['a.csv']['dates'] == ['2023-07-03', '2023-07-04']
+    assert not os.path.exists(manifest.manifest_path + '.tmp')
+    with open(manifest.manifest_path) as file:
+        assert set(json.load(file)) == {'files', 'inputs'}
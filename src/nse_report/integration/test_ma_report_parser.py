@@ -0,0 +1,115 @@
+import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from nse_report.integration.ma_report_parser import MaReportCache, parse_ma_report
+from nse_report.integration.schemas import SchemaDriftError
+
+INDEX_ROWS = [
+    ',Nifty 50,18105.30,18163.20,18251.95,18149.80,18232.55,0.70',
+    ',Nifty Bank,43203.10,43301.45,43578.20,43199.40,43425.25,0.51',
+    ',Nifty IT,28640.70,28701.10,28720.35,28412.15,28487.85,-0.53',
+]
+
+
+def report_data(index_rows=INDEX_ROWS, advances_row='NIFTY 50,29,21,0', title='MARKET ACTIVITY REPORT FOR 03-JAN-2023'):
+    """
+    This function builds the content of a report with the layout of the
+    NSE files: the title, a summary, the index table (with its leading empty
+    column), the advances/declines and the top gainers.
+    """
+
+    lines = [
+        'NATIONAL STOCK EXCHANGE OF INDIA LIMITED',
+        f'"{title}"',
+        '',
+        'Summary',
+        'Category,Value',
+        'Turnover,16329.36',
+        '',
+        ',INDEX,PREVIOUS CLOSE,OPEN,HIGH,LOW,CLOSE,GAIN/LOSS',
+        *index_rows,
+        '',
+        'Advances/Declines',
+        'INDEX,ADVANCES,DECLINES,UNCHANGED',
+        advances_row,
+        '',
+        'Top Gainers',
+        'SYMBOL,SERIES,CLOSE,GAIN(%)',
+        'ADANIENT,EQ,3880.85,4.12',
+    ]
+    return '\n'.join(lines).encode()
+
+
+def test_parses_the_report_layout():
+    report = parse_ma_report(report_data())
+
+    assert report.date == datetime.datetime(2023, 1, 3)
+    assert report.section_names == ['summary', 'index', 'advances_declines', 'top_gainers']
+    index_df = report['index']
+    assert list(index_df.columns) == ['INDEX', 'OPEN', 'HIGH', 'LOW', 'CLOSE']
+    assert list(index_df['INDEX']) == ['Nifty 50', 'Nifty Bank', 'Nifty IT']
+    assert index_df['CLOSE'].dtype == 'float64'
+    assert index_df['CLOSE'].tolist() == [18232.55, 43425.25, 28487.85]
+    assert report['advances_declines']['ADVANCES'].dtype == 'int64'
+    assert report['top_gainers']['GAIN(%)'].tolist() == [4.12]
+
+
+def test_blank_and_dash_cells_are_missing_values():
+    index_rows = [',Nifty 50,18105.30,,18251.95,18149.80,18232.55,0.70',
+                  ',Nifty Bank,43203.10,-,-,-,43425.25,0.51'] + INDEX_ROWS[2:]
+
+    report = parse_ma_report(report_data(index_rows, advances_row='NIFTY 50,29,-,'))
+
+    index_df = report['index']
+    assert np.isnan(index_df['OPEN'].iloc[0])
+    assert index_df[['OPEN', 'HIGH', 'LOW']].iloc[1].isna().all()
+    assert index_df['CLOSE'].tolist() == [18232.55, 43425.25, 28487.85]
+    # As with pandas.read_csv, an integer column with missing values is float64
+    advances_df = report['advances_declines']
+    assert advances_df['ADVANCES'].dtype == 'int64'
+    assert advances_df['DECLINES'].dtype == 'float64'
+    assert advances_df[['DECLINES', 'UNCHANGED']].iloc[0].isna().all()
+
+
+def test_short_rows_are_missing_values():
+    report = parse_ma_report(report_data(INDEX_ROWS[:2] + [',Nifty IT,28640.70,28701.10']))
+
+    assert report['index'][['HIGH', 'LOW', 'CLOSE']].iloc[2].isna().all()
+
+
+@pytest.mark.parametrize('index_rows', [
+    INDEX_ROWS + [',Nifty Realty,431.20,432.05,436.70,430.15,435.90,1.09'],
+    INDEX_ROWS[1:],
+])
+def test_added_and_removed_index_rows(index_rows):
+    index_df = parse_ma_report(report_data(index_rows))['index']
+
+    assert list(index_df['INDEX']) == [row.split(',')[1] for row in index_rows]
+    assert index_df['CLOSE'].notna().all()
+
+
+def test_non_numeric_text_is_schema_drift():
+    index_rows = INDEX_ROWS[:2] + [',Nifty IT,28640.70,28701.10,28720.35,n/a,28487.85,-0.53']
+
+    with pytest.raises(SchemaDriftError, match='column LOW'):
+        parse_ma_report(report_data(index_rows), 'MA030123.csv')
+
+
+def test_header_drift_is_schema_drift():
+    data = report_data().replace(b',INDEX,PREVIOUS CLOSE,OPEN,HIGH,LOW,CLOSE', b',INDEX,PREVIOUS CLOSE,OPEN,HIGH,LOW,LAST')
+
+    with pytest.raises(SchemaDriftError):
+        parse_ma_report(data, 'MA030123.csv')
+
+
+def test_cache_dates_an_untitled_report_from_its_file_name(tmp_path):
+    file_path = tmp_path / 'MA040123.csv'
+    file_path.write_bytes(report_data(title='MARKET ACTIVITY REPORT'))
+    cache = MaReportCache()
+
+    report = cache.read(str(file_path))
+
+    assert report.date == datetime.datetime(2023, 1, 4)
+    assert cache.read(str(file_path))['index'] is report['index']
+    pd.testing.assert_frame_equal(report['index'], parse_ma_report(file_path.read_bytes())['index'])
@@ -0,0 +1,121 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from nse_report.integration import matrix_store as matrix_store_module
+from nse_report.integration.matrix_store import META_FILE, PriceMatrixStore
+
+DATES = pd.bdate_range('2023-07-03', periods=10)
+
+
+def bhavdata(symbols=('SBIN', 'INFY', 'TCS'), dates=DATES, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'SYMBOL': np.tile(symbols, len(dates)), 'DATE': np.repeat(dates, len(symbols))})
+    df['LAST_PRICE'] = rng.uniform(100, 200, len(df)).round(2)
+    df['DELIV_QTY'] = rng.integers(0, 10 ** 6, len(df)).astype('float64')
+    return df
+
+
+def assert_stores(matrix_store, df):
+    """
+    This function checks that the store holds exactly the rows of `df`, NaN elsewhere.
+    """
+
+    for field in matrix_store.fields:
+        expected_df = df.pivot(index='DATE', columns='SYMBOL', values=field).reindex(columns=matrix_store.symbols)
+        assert list(matrix_store.dates) == list(expected_df.index.values.astype('datetime64[D]'))
+        np.testing.assert_array_equal(matrix_store.matrix(field), expected_df.to_numpy())
+
+
+@pytest.fixture
+def folder_path(tmp_path):
+    return str(tmp_path / 'price_matrix')
+
+
+def test_appended_dates_match_a_rebuild(folder_path):
+    df = bhavdata()
+    matrix_store = PriceMatrixStore(folder_path)
+    matrix_store.write(df[df['DATE'] < DATES[6]])
+
+    for date in DATES[6:]:
+        matrix_store.write(df, [date])
+
+    assert_stores(PriceMatrixStore(folder_path), df)
+
+
+def test_stored_dates_are_replaced_in_place(folder_path):
+    df = bhavdata()
+    matrix_store = PriceMatrixStore(folder_path)
+    matrix_store.write(df)
+
+    # A corrected report drops TCS on that date
+    df.loc[df['DATE'] == DATES[3], 'LAST_PRICE'] += 1
+    df = df[~((df['DATE'] == DATES[3]) & (df['SYMBOL'] == 'TCS'))]
+    matrix_store.write(df, [DATES[3]])
+
+    assert np.isnan(matrix_store.cross_section(DATES[3])['TCS'])
+    assert_stores(PriceMatrixStore(folder_path), df)
+
+
+def test_dates_before_the_last_one_rebuild_the_matrices(folder_path):
+    df = bhavdata()
+    matrix_store = PriceMatrixStore(folder_path)
+    matrix_store.write(df[df['DATE'] != DATES[4]])
+
+    matrix_store.write(df, [DATES[4]])
+
+    assert list(matrix_store.dates) == list(DATES.values.astype('datetime64[D]'))
+    assert_stores(PriceMatrixStore(folder_path), df)
+
+
+def test_new_listings_grow_the_symbol_capacity(folder_path, monkeypatch):
+    monkeypatch.setattr(matrix_store_module, 'MIN_SYMBOL_CAPACITY', 4)
+    df = bhavdata(symbols=[f'SYM{number:02d}' for number in range(11)])
+    # One more symbol is listed every date
+    df = df[df['SYMBOL'].str[3:].astype(int) <= np.repeat(np.arange(len(DATES)), 11)]
+    matrix_store = PriceMatrixStore(folder_path)
+    matrix_store.write(df[df['DATE'] == DATES[0]])
+
+    capacities = []
+    for date in DATES[1:]:
+        matrix_store.write(df, [date])
+        capacities.append(matrix_store.capacity)
+
+    assert capacities == [4, 4, 4, 8, 8, 8, 8, 16, 16]
+    assert os.path.getsize(matrix_store.field_path('DELIV_QTY')) == len(DATES) * 16 * 8
+    assert_stores(PriceMatrixStore(folder_path), df)
+    assert matrix_store.history('SYM05').index[matrix_store.history('SYM05').notna()][0] == DATES[5]
+
+
+def test_interrupted_appends_are_ignored(folder_path):
+    df = bhavdata()
+    matrix_store = PriceMatrixStore(folder_path)
+    matrix_store.write(df[df['DATE'] < DATES[6]])
+    meta_path = os.path.join(folder_path, META_FILE)
+    with open(meta_path) as file:
+        meta = file.read()
+
+    # The append wrote its rows, but not meta.json
+    matrix_store.write(df, [DATES[6]])
+    with open(meta_path, 'w') as file:
+        file.write(meta)
+
+    matrix_store = PriceMatrixStore(folder_path)
+    assert json.loads(meta)['rows'] == matrix_store.row_count == 6
+    assert_stores(matrix_store, df[df['DATE'] < DATES[6]])
+    matrix_store.write(df, DATES[6:])
+    assert_stores(PriceMatrixStore(folder_path), df)
+
+
+def test_percent_changes_read_only_the_requested_rows(folder_path):
+    df = bhavdata()
+    matrix_store = PriceMatrixStore(folder_path)
+    matrix_store.write(df)
+    prices_df = df.pivot(index='DATE', columns='SYMBOL', values='LAST_PRICE')[matrix_store.symbols]
+
+    changes_df = matrix_store.percent_change(2, start_date=DATES[1], end_date=DATES[7])
+
+    expected_df = (prices_df / prices_df.shift(2) - 1) * 100
+    assert list(changes_df.index) == list(DATES[1:8])
+    np.testing.assert_allclose(changes_df.to_numpy(), expected_df.loc[DATES[1]:DATES[7]].to_numpy())
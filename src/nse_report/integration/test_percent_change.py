@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+from nse_report.integration.percent_change import (PERCENT_CHANGE_COLUMNS, compute_percent_changes, lookback_start,
+                                                   update_percent_changes)
+
+DATES = pd.bdate_range('2023-08-01', '2024-06-28')
+KEY = ['SYMBOL', 'DATE']
+
+
+def random_walk_prices(symbols=('A', 'B', 'C'), dates=DATES, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = []
+    for symbol in symbols:
+        prices = 100 * np.cumprod(1 + rng.normal(0, 0.01, len(dates)))
+        frames.append(pd.DataFrame({'SYMBOL': symbol, 'DATE': dates, 'LAST_PRICE': prices.round(2)}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def sorted_frame(df):
+    return df.sort_values(KEY, kind='mergesort').reset_index(drop=True)
+
+
+def assert_matches_full_rebuild(existing_df, df, changed_dates=None):
+    updated_df = update_percent_changes(existing_df, df, 'SYMBOL', 'LAST_PRICE', changed_dates)
+    pd.testing.assert_frame_equal(sorted_frame(updated_df), sorted_frame(compute_percent_changes(df, 'SYMBOL', 'LAST_PRICE')))
+
+
+def test_horizons_are_measured_in_trading_dates():
+    df = pd.DataFrame({'SYMBOL': 'A', 'DATE': DATES[:30], 'LAST_PRICE': np.arange(100.0, 130.0)})
+    # A date missing for every symbol is not a trading date
+    df = df.drop(index=3)
+
+    changes_df = compute_percent_changes(df, 'SYMBOL', 'LAST_PRICE').set_index('DATE')
+
+    assert changes_df.loc[DATES[4], 'PCT_1D'] == round((104 / 102 - 1) * 100, 4)
+    assert changes_df.loc[DATES[6], 'PCT_1W'] == round((106 / 100 - 1) * 100, 4)
+    assert np.isnan(changes_df.loc[DATES[2], 'PCT_1W'])
+    assert list(changes_df.columns) == ['SYMBOL'] + PERCENT_CHANGE_COLUMNS
+
+
+def test_year_to_date_base_is_the_last_price_of_the_previous_year():
+    df = pd.DataFrame({
+        'SYMBOL': ['A', 'A', 'A', 'B', 'B', 'B'],
+        'DATE': pd.to_datetime(['2023-12-27', '2023-12-29', '2024-01-02'] * 2),
+        'LAST_PRICE': [90.0, 100.0, 110.0, 50.0, np.nan, 60.0],
+    })
+
+    changes_df = compute_percent_changes(df, 'SYMBOL', 'LAST_PRICE').set_index(KEY)
+
+    assert changes_df.loc[('A', pd.Timestamp('2024-01-02')), 'PCT_YTD'] == 10.0
+    # No price on the last date of the year: the last one before it
+    assert changes_df.loc[('B', pd.Timestamp('2024-01-02')), 'PCT_YTD'] == 20.0
+    # The year before is not in the data: the first price of the year
+    assert changes_df.loc[('A', pd.Timestamp('2023-12-29')), 'PCT_YTD'] == round((100 / 90 - 1) * 100, 4)
+
+
+def test_lookback_reaches_the_previous_year_end():
+    trading_dates = pd.DatetimeIndex(DATES)
+
+    assert lookback_start(trading_dates, pd.Timestamp('2024-06-28')) == pd.Timestamp('2023-12-29')
+    assert lookback_start(trading_dates, pd.Timestamp('2024-01-03')) == trading_dates[trading_dates.get_loc('2024-01-03') - 63]
+
+
+def test_new_date_matches_full_rebuild():
+    df = random_walk_prices()
+    existing_df = compute_percent_changes(df[df['DATE'] < DATES[-1]], 'SYMBOL', 'LAST_PRICE')
+
+    assert_matches_full_rebuild(existing_df, df)
+
+
+def test_symbol_missing_on_the_previous_year_end_matches_full_rebuild():
+    df = random_walk_prices()
+    # B did not trade over the last days of 2023, so its YTD base predates the lookback window
+    df = df[~((df['SYMBOL'] == 'B') & df['DATE'].between('2023-12-20', '2023-12-29'))]
+    existing_df = compute_percent_changes(df[df['DATE'] < DATES[-1]], 'SYMBOL', 'LAST_PRICE')
+
+    assert_matches_full_rebuild(existing_df, df)
+    updated_df = update_percent_changes(existing_df, df, 'SYMBOL', 'LAST_PRICE').set_index(KEY)
+    last_2023_price = df[(df['SYMBOL'] == 'B') & (df['DATE'] < '2024-01-01')]['LAST_PRICE'].iloc[-1]
+    last_price = df[df['SYMBOL'] == 'B']['LAST_PRICE'].iloc[-1]
+    assert updated_df.loc[('B', DATES[-1]), 'PCT_YTD'] == round((last_price / last_2023_price - 1) * 100, 4)
+
+
+def test_corrected_past_price_matches_full_rebuild():
+    df = random_walk_prices()
+    existing_df = compute_percent_changes(df, 'SYMBOL', 'LAST_PRICE')
+    corrected_date = pd.Timestamp('2024-03-15')
+    df.loc[(df['SYMBOL'] == 'C') & (df['DATE'] == corrected_date), 'LAST_PRICE'] *= 1.1
+
+    assert_matches_full_rebuild(existing_df, df, changed_dates=[corrected_date])
+
+
+def test_symbol_added_on_a_past_date_matches_full_rebuild():
+    df = random_walk_prices()
+    existing_df = compute_percent_changes(df, 'SYMBOL', 'LAST_PRICE')
+    listed_df = random_walk_prices(['D'], DATES[DATES >= '2024-02-01'], seed=1)
+
+    assert_matches_full_rebuild(existing_df, pd.concat([df, listed_df], ignore_index=True))
+
+
+@pytest.mark.parametrize('removed_dates', [1, 3])
+def test_latest_dates_removed(removed_dates):
+    df = random_walk_prices()
+    existing_df = compute_percent_changes(df, 'SYMBOL', 'LAST_PRICE')
+
+    assert_matches_full_rebuild(existing_df, df[df['DATE'] < DATES[-removed_dates]])
+
+
+def test_unchanged_prices_are_not_recomputed():
+    df = random_walk_prices()
+    existing_df = compute_percent_changes(df, 'SYMBOL', 'LAST_PRICE')
+
+    assert update_percent_changes(existing_df, df, 'SYMBOL', 'LAST_PRICE') is existing_df
+    assert update_percent_changes(existing_df, df.iloc[0:0], 'SYMBOL', 'LAST_PRICE').empty
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+from nse_report.extraction.constituent_history import ConstituentHistory
+from nse_report.integration.sector_aggregation import (RECONCILIATION_COLUMNS, SECTOR_RETURN_COLUMNS, aggregate_sectors,
+                                                       daily_returns, reconcile_with_ma_report)
+
+DATES = pd.bdate_range('2023-07-03', periods=4)
+
+
+def bhavdata(prices, quantities=None):
+    """
+    This function builds Bhavdata rows from the close prices of every symbol, one per date.
+    """
+
+    df = pd.DataFrame([(symbol, DATES[position], price) for symbol, symbol_prices in prices.items()
+                       for position, price in enumerate(symbol_prices) if price is not None],
+                      columns=['SYMBOL', 'DATE', 'CLOSE_PRICE'])
+    df['TTL_TRD_QNTY'] = 100.0 if quantities is None else df['SYMBOL'].map(quantities)
+    return df
+
+
+@pytest.fixture
+def history():
+    snapshot_df = pd.DataFrame({'SECTOR': ['NIFTY BANK', 'NIFTY BANK', 'NIFTY BANK', 'NIFTY IT'],
+                                'SYMBOL': ['SBIN', 'HDFCBANK', 'AXISBANK', 'SBIN']})
+    history = ConstituentHistory.from_snapshot(snapshot_df, DATES[0])
+    # AXISBANK leaves NIFTY BANK on the third date
+    history.record_snapshot(snapshot_df[snapshot_df['SYMBOL'] != 'AXISBANK'], DATES[2])
+    return history
+
+
+def test_returns_need_the_previous_trading_date():
+    df = bhavdata({'SBIN': [100, 110, None, 99], 'INFY': [50, 50, 55, 44]})
+
+    returns, _, dates = daily_returns(df, 'SYMBOL', 'CLOSE_PRICE')
+
+    returns_df = df.assign(RETURN=returns).set_index(['SYMBOL', 'DATE'])['RETURN']
+    assert returns_df['SBIN'].tolist() == pytest.approx([np.nan, 0.1, np.nan], nan_ok=True)
+    assert returns_df['INFY'].tolist() == pytest.approx([np.nan, 0, 0.1, -0.2], nan_ok=True)
+    assert list(dates) == list(DATES)
+
+
+def test_sector_returns_are_equal_and_value_weighted(history):
+    df = bhavdata({'SBIN': [100, 110, 99, 99], 'HDFCBANK': [200, 190, 190, 209], 'AXISBANK': [10, 11, 12, 13]},
+                  quantities={'SBIN': 100.0, 'HDFCBANK': 300.0, 'AXISBANK': 1000.0})
+
+    sector_returns_df, contributions_df = aggregate_sectors(df, history)
+
+    assert list(sector_returns_df.columns) == SECTOR_RETURN_COLUMNS
+    bank_df = sector_returns_df[sector_returns_df['SECTOR'] == 'NIFTY BANK'].set_index('DATE')
+    # The first date has no return, AXISBANK only counts while it is a constituent
+    assert list(bank_df.index) == list(DATES[1:])
+    assert bank_df['CONSTITUENTS'].tolist() == [3, 2, 2]
+    assert bank_df[['ADVANCES', 'DECLINES', 'UNCHANGED']].values.tolist() == [[2, 1, 0], [0, 1, 1], [1, 0, 1]]
+    assert bank_df.loc[DATES[1], 'EW_RETURN'] == round((10 - 5 + 10) / 3, 4)
+    values = {'SBIN': 110 * 100, 'HDFCBANK': 190 * 300, 'AXISBANK': 11 * 1000}
+    expected = (values['SBIN'] * 0.1 - values['HDFCBANK'] * 0.05 + values['AXISBANK'] * 0.1) / sum(values.values())
+    assert bank_df.loc[DATES[1], 'VW_RETURN'] == round(expected * 100, 4)
+    assert bank_df.loc[DATES[1], 'TRADED_VALUE'] == sum(values.values())
+
+    # The contributions add up to the weighted return
+    totals = contributions_df.groupby(['SECTOR', 'DATE'])['CONTRIBUTION'].sum()
+    np.testing.assert_allclose(totals.to_numpy(), sector_returns_df.set_index(['SECTOR', 'DATE'])['VW_RETURN']
+                               .loc[totals.index].to_numpy(), atol=1e-3)
+    assert contributions_df.groupby(['SECTOR', 'DATE'])['WEIGHT'].sum().round(4).eq(1).all()
+
+
+def test_stocks_in_several_sectors_count_in_each(history):
+    df = bhavdata({'SBIN': [100, 110, 99, 99], 'HDFCBANK': [200, 190, 190, 209]})
+
+    sector_returns_df, _ = aggregate_sectors(df, history)
+
+    it_df = sector_returns_df[sector_returns_df['SECTOR'] == 'NIFTY IT']
+    assert it_df['EW_RETURN'].tolist() == it_df['VW_RETURN'].tolist() == [10.0, -10.0, 0.0]
+    assert sector_returns_df[['DATE', 'SECTOR']].equals(
+        sector_returns_df[['DATE', 'SECTOR']].sort_values(['DATE', 'SECTOR']))
+    assert list(aggregate_sectors(df, history, ['NIFTY IT'])[0]['SECTOR'].unique()) == ['NIFTY IT']
+
+
+def test_sector_returns_are_reconciled_with_the_index(history):
+    df = bhavdata({'SBIN': [100, 110, 99, 99], 'HDFCBANK': [200, 190, 190, 209]})
+    sector_returns_df, _ = aggregate_sectors(df, history)
+    ma_report_df = pd.DataFrame({'SECTOR': 'NIFTY IT', 'DATE': DATES[:3], 'CLOSE': [1000.0, 1100.0, 990.0]})
+
+    reconciled_df = reconcile_with_ma_report(sector_returns_df, ma_report_df).set_index(['SECTOR', 'DATE'])
+
+    assert list(reconciled_df.columns) == SECTOR_RETURN_COLUMNS[2:] + RECONCILIATION_COLUMNS
+    assert reconciled_df.loc[('NIFTY IT', DATES[2]), ['MA_RETURN', 'EW_GAP']].tolist() == [-10.0, 0.0]
+    assert np.isnan(reconciled_df.loc[('NIFTY IT', DATES[3]), 'MA_RETURN'])
+    assert reconciled_df.loc['NIFTY BANK', 'VW_GAP'].isna().all()
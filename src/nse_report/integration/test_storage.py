@@ -0,0 +1,133 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from nse_report.integration.storage import STORAGE_BACKENDS, compact_dtypes, get_store, replaced_dates
+
+DATES = pd.bdate_range('2024-01-01', periods=5)
+
+
+@pytest.fixture(params=sorted(STORAGE_BACKENDS))
+def store(request, tmp_path):
+    if request.param == 'parquet':
+        pytest.importorskip('pyarrow')
+    return get_store(request.param, str(tmp_path / 'tables'))
+
+
+def bhavdata(dates=DATES, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = len(dates) * 3
+    return pd.DataFrame({
+        'ID_BHAV': np.arange(rows, dtype='int64') + 2**40,
+        'SYMBOL': ['MRF', 'PAGEIND', 'SBIN'] * len(dates),
+        'DATE': np.repeat(pd.DatetimeIndex(dates), 3),
+        # Prices in paise, up to the highest quoted stocks
+        'CLOSE_PRICE': rng.integers(13_000_000, 16_000_000, rows) / 100,
+        'TTL_TRD_QNTY': rng.integers(0, 10**6, rows),
+        'PCT_1D': rng.normal(0, 1, rows).round(4),
+    })
+
+
+def readable(df):
+    # Categoricals are read back from Parquet as categoricals
+    return df.astype({column: str for column in ['SYMBOL'] if column in df.columns})
+
+
+def test_round_trip_is_lossless(store):
+    df = bhavdata()
+    store.write(df, 'fact')
+
+    read_df = store.read('fact')
+
+    pd.testing.assert_frame_equal(readable(read_df), df, check_dtype=False)
+    assert (read_df['CLOSE_PRICE'].to_numpy() == df['CLOSE_PRICE'].to_numpy()).all()
+
+
+def test_compact_dtypes_keep_float_precision():
+    compact_df = compact_dtypes(bhavdata())
+
+    assert compact_df['CLOSE_PRICE'].dtype == 'float64'
+    assert compact_df['PCT_1D'].dtype == 'float64'
+    assert compact_df['TTL_TRD_QNTY'].dtype == 'int32'
+    assert compact_df['ID_BHAV'].dtype == 'int64'
+    assert compact_df['SYMBOL'].dtype == 'category'
+
+
+def test_upsert_replaces_the_dates_of_the_rows(store):
+    df = bhavdata()
+    store.write(df, 'fact')
+    corrected_df = bhavdata(DATES[[1, 3]], seed=1)
+
+    store.upsert(corrected_df, 'fact')
+
+    expected_df = pd.concat([df[~df['DATE'].isin(DATES[[1, 3]])], corrected_df]).sort_values('DATE', kind='mergesort')
+    pd.testing.assert_frame_equal(readable(store.read('fact')), expected_df.reset_index(drop=True), check_dtype=False)
+
+
+def test_upsert_removes_the_dates_without_rows(store):
+    store.write(bhavdata(), 'fact')
+
+    store.upsert(bhavdata(DATES[:0]), 'fact', dates=DATES[-2:])
+
+    assert list(pd.DatetimeIndex(store.read('fact')['DATE'].unique())) == list(DATES[:-2])
+
+
+def test_upsert_creates_a_missing_table(store):
+    store.upsert(bhavdata(), 'fact')
+
+    assert store.exists('fact')
+    assert len(store.read('fact')) == 3 * len(DATES)
+
+
+def test_read_date_range(store):
+    store.write(bhavdata(), 'fact')
+
+    read_df = store.read('fact', columns=['SYMBOL', 'DATE', 'CLOSE_PRICE'], start_date=DATES[1], end_date=DATES[2])
+
+    assert list(read_df.columns) == ['SYMBOL', 'DATE', 'CLOSE_PRICE']
+    assert set(read_df['DATE']) == {DATES[1], DATES[2]}
+
+
+def test_append_adds_rows(store):
+    store.append(bhavdata(DATES[:2]), 'fact')
+    store.append(bhavdata(DATES[2:]), 'fact')
+
+    assert len(store.read('fact')) == 3 * len(DATES)
+
+
+def test_replaced_dates_defaults_to_the_dates_of_the_rows():
+    assert list(replaced_dates(bhavdata(DATES[:2]))) == list(DATES[:2])
+    assert list(replaced_dates(bhavdata(DATES[:0]), ['2024-01-05'])) == [pd.Timestamp('2024-01-05')]
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_store('feather', 'tables')
+
+
+def test_dimension_tables_are_not_partitioned(tmp_path):
+    pytest.importorskip('pyarrow')
+    store = get_store('parquet', str(tmp_path / 'tables'))
+    dates = pd.date_range('2020-01-01', '2024-12-31')
+    datetime_df = pd.DataFrame({'DATE': dates, 'YEAR': dates.year})
+
+    store.write(datetime_df, 'dim_datetime')
+    store.upsert(datetime_df.iloc[-3:].assign(YEAR=0), 'dim_datetime')
+
+    assert sorted(os.listdir(store.path('dim_datetime'))) == ['_columns.json', 'part-0.parquet']
+    read_df = store.read('dim_datetime')
+    assert list(read_df['DATE']) == list(dates)
+    assert list(read_df['YEAR'].iloc[-4:]) == [2024, 0, 0, 0]
+
+
+def test_fact_tables_are_partitioned_by_date(tmp_path):
+    pytest.importorskip('pyarrow')
+    store = get_store('parquet', str(tmp_path / 'tables'))
+    # More trading dates than pyarrow's default limit of partitions
+    dates = pd.bdate_range('2020-01-01', periods=1100)
+
+    store.write(bhavdata(dates), 'fact_bhavdata')
+
+    partitions = [name for name in os.listdir(store.path('fact_bhavdata')) if name.startswith('DATE=')]
+    assert len(partitions) == len(dates)
+    assert len(store.read('fact_bhavdata', start_date=dates[-2])) == 6
@@ -0,0 +1,161 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+import numpy as np
+import pandas as pd
+import pytest
+from nse_report.extraction.constituent_history import ConstituentHistory
+from nse_report.integration.storage import CsvStore
+from nse_report.integration.percent_change import PERCENT_CHANGE_COLUMNS
+from nse_report.integration.top_movers import (HORIZON_NAMES, SIDES, TOP_K, TOP_MOVERS_COLUMNS, TOP_MOVERS_TABLE, TopMoversIndex,
+                                              constituent_percent_changes, rank_top_movers)
+
+DATES = pd.bdate_range('2023-10-02', '2024-03-29')
+SYMBOLS = [f'SYM{number:02d}' for number in range(30)]
+
+
+def constituents(sectors=('NIFTY BANK', 'NIFTY IT'), per_sector=15):
+    snapshot_df = pd.DataFrame({'SYMBOL': SYMBOLS[:len(sectors) * per_sector],
+                                'SECTOR': np.repeat(sectors, per_sector)})
+    return ConstituentHistory.from_snapshot(snapshot_df, DATES[0])
+
+
+def bhavdata(symbols=SYMBOLS, dates=DATES, seed=0):
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.cumprod(1 + rng.normal(0, 0.02, (len(dates), len(symbols))), axis=0)
+    return pd.DataFrame({'SYMBOL': np.tile(symbols, len(dates)), 'DATE': np.repeat(dates, len(symbols)),
+                         'LAST_PRICE': prices.round(2).ravel()})
+
+
+def test_ranking_the_latest_dates_matches_the_full_ranking():
+    bhavdata_df = bhavdata()
+    constituent_history = constituents()
+    full_df = rank_top_movers(constituent_percent_changes(bhavdata_df, constituent_history), constituent_history)
+
+    rank_dates = DATES[DATES >= '2024-01-02']
+    ranked_df = rank_top_movers(constituent_percent_changes(bhavdata_df, constituent_history, dates=rank_dates),
+                                constituent_history)
+
+    assert set(ranked_df['DATE']) == set(rank_dates)
+    pd.testing.assert_frame_equal(ranked_df, full_df[full_df['DATE'].isin(rank_dates)].reset_index(drop=True))
+
+
+@pytest.fixture
+def query_service(data_root):
+    # Imported from the data folder, as it logs to logs/query_service.log
+    from nse_report.integration import query_service
+    return query_service
+
+
+def write_rankings(store, manifest_path, version):
+    constituent_history = constituents()
+    top_movers_df = rank_top_movers(constituent_percent_changes(bhavdata(), constituent_history), constituent_history)
+    store.write(top_movers_df, TOP_MOVERS_TABLE)
+    with open(manifest_path, 'w') as file:
+        json.dump({'files': {}, 'inputs': {TOP_MOVERS_TABLE: version}}, file)
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_unreadable_rankings_are_answered_503(query_service, data_root):
+    store = CsvStore(str(data_root / 'processed'))
+    manifest_path = str(data_root / 'top_movers_manifest.json')
+    write_rankings(store, manifest_path, 'v1')
+    server = query_service.create_server(query_service.TopMoversService(store, manifest_path=manifest_path), port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/top-movers?sector=NIFTY%20BANK&horizon=1D'
+
+    try:
+        assert get(url)[0] == 200
+
+        # The preprocessing is rewriting the table
+        store.delete(TOP_MOVERS_TABLE)
+        with open(manifest_path, 'w') as file:
+            json.dump({'files': {}, 'inputs': {TOP_MOVERS_TABLE: 'v2'}}, file)
+        status, content = get(url)
+        assert status == 503
+        assert TOP_MOVERS_TABLE in content['error']
+
+        # Retried on the next request, once the table is back
+        write_rankings(store, manifest_path, 'v2')
+        status, content = get(url)
+        assert status == 200
+        assert len(content['movers']) == 10
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def naive_top_movers(percent_change_df, constituent_history, k):
+    """
+    This function ranks every (sector, horizon, side, date) by sorting its constituents one at a time.
+    """
+
+    frames = []
+    for sector in constituent_history.intervals['SECTOR'].unique():
+        tagged_df = constituent_history.tag(percent_change_df, [sector])
+        for horizon in HORIZON_NAMES:
+            for side in SIDES:
+                for date, date_df in tagged_df.dropna(subset=[f'PCT_{horizon}']).groupby('DATE'):
+                    date_df = date_df.sort_values('SYMBOL').sort_values(f'PCT_{horizon}', ascending=side == 'LOSERS',
+                                                                        kind='stable')[:k]
+                    frames.append(pd.DataFrame({'SECTOR': sector, 'HORIZON': horizon, 'SIDE': side, 'DATE': date,
+                                                'RANK': np.arange(1, len(date_df) + 1), 'SYMBOL': date_df['SYMBOL'].to_numpy(),
+                                                'PCT': date_df[f'PCT_{horizon}'].to_numpy()}))
+    naive_df = pd.concat(frames, ignore_index=True)
+    return naive_df.sort_values(['SECTOR', 'HORIZON', 'SIDE', 'DATE', 'RANK'], ignore_index=True)
+
+
+def test_top_k_match_a_naive_ranking():
+    constituent_history = constituents()
+    # NIFTY IT loses three constituents and NIFTY BANK gains one in the middle of the history
+    snapshot_df = constituent_history.current()
+    snapshot_df = snapshot_df[~snapshot_df['SYMBOL'].isin(['SYM15', 'SYM16', 'SYM17'])]
+    constituent_history.record_snapshot(pd.concat([snapshot_df, pd.DataFrame({'SYMBOL': ['SYM29'], 'SECTOR': ['NIFTY BANK']})]),
+                                        DATES[60])
+    percent_change_df = constituent_percent_changes(bhavdata(), constituent_history)
+
+    top_movers_df = rank_top_movers(percent_change_df, constituent_history, k=5)
+
+    naive_df = naive_top_movers(percent_change_df, constituent_history, k=5)
+    pd.testing.assert_frame_equal(top_movers_df[TOP_MOVERS_COLUMNS], naive_df[TOP_MOVERS_COLUMNS], check_dtype=False)
+    assert top_movers_df.groupby(['SECTOR', 'HORIZON', 'SIDE', 'DATE']).size().max() == 5
+
+
+def test_ties_are_ranked_by_symbol():
+    constituent_history = constituents(sectors=('NIFTY BANK',), per_sector=4)
+    percent_change_df = pd.DataFrame({'SYMBOL': ['SYM03', 'SYM01', 'SYM02', 'SYM00'], 'DATE': DATES[1]})
+    for column in PERCENT_CHANGE_COLUMNS:
+        percent_change_df[column] = [1.0, 1.0, np.nan, -2.0]
+
+    top_movers_df = rank_top_movers(percent_change_df, constituent_history, k=2)
+
+    gainers_df = top_movers_df[(top_movers_df['HORIZON'] == '1D') & (top_movers_df['SIDE'] == 'GAINERS')]
+    losers_df = top_movers_df[(top_movers_df['HORIZON'] == '1D') & (top_movers_df['SIDE'] == 'LOSERS')]
+    assert gainers_df['SYMBOL'].tolist() == ['SYM01', 'SYM03']
+    assert losers_df['SYMBOL'].tolist() == ['SYM00', 'SYM01']
+
+
+def test_index_answers_the_latest_ranking_on_or_before_a_date():
+    constituent_history = constituents()
+    top_movers_df = rank_top_movers(constituent_percent_changes(bhavdata(), constituent_history), constituent_history)
+    index = TopMoversIndex(top_movers_df)
+
+    result = index.query('NIFTY IT', '1W', 'losers', date='2024-01-06', n=3)
+
+    expected_df = top_movers_df[(top_movers_df['SECTOR'] == 'NIFTY IT') & (top_movers_df['HORIZON'] == '1W') &
+                                (top_movers_df['SIDE'] == 'LOSERS') & (top_movers_df['DATE'] == '2024-01-05')]
+    assert result['date'] == '2024-01-05'
+    assert [mover['symbol'] for mover in result['movers']] == expected_df['SYMBOL'].tolist()[:3]
+    assert index.query('NIFTY IT', '1W')['date'] == f'{DATES[-1]:%Y-%m-%d}'
+    with pytest.raises(KeyError):
+        index.query('NIFTY IT', '1W', date=DATES[0] - pd.Timedelta(days=1))
+    with pytest.raises(ValueError):
+        index.query('NIFTY IT', '1W', n=TOP_K + 1)
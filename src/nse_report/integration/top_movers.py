@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+from nse_report.integration.percent_change import PERCENT_CHANGE_COLUMNS, compute_percent_changes, lookback_window
+
+# Table of the rankings, and the manifest recording their fingerprint (see TopMoversService)
+TOP_MOVERS_TABLE = 'top_movers'
+TOP_MOVERS_MANIFEST_PATH = 'data/interim/top_movers_manifest.json'
+
+# Number of gainers and losers kept per sector, horizon and date
+TOP_K = 20
+
+# Horizons of the percent change tables: 1D, 1W, 1M, 3M and YTD
+HORIZON_NAMES = [column[len('PCT_'):] for column in PERCENT_CHANGE_COLUMNS]
+
+# Rankings: the highest changes first (gainers) or the lowest first (losers)
+SIDES = ['GAINERS', 'LOSERS']
+
+TOP_MOVERS_COLUMNS = ['SECTOR', 'HORIZON', 'SIDE', 'DATE', 'RANK', 'SYMBOL', 'PCT']
+
+
+def constituent_percent_changes(bhavdata_df, constituent_history, price_column='LAST_PRICE', dates=None):
+    """
+    This function computes the percent changes of every symbol of the staged
+    Bhavdata (SYMBOL, DATE and the price) that was ever a sector constituent,
+    whatever the universes of the Bhavdata fact, with the horizons of the
+    percent change tables. Only the rows of `dates` (all dates by default)
+    are computed, from the lookback window of the first of them.
+    """
+
+    constituents = pd.Index(constituent_history.intervals['SYMBOL'].unique())
+    constituent_df = bhavdata_df[constituents.get_indexer(bhavdata_df['SYMBOL']) >= 0]
+    if dates is not None:
+        constituent_df = lookback_window(constituent_df, 'SYMBOL', price_column, pd.DatetimeIndex(dates).min())
+    return compute_percent_changes(constituent_df, 'SYMBOL', price_column, dates)
+
+
+def rank_top_movers(percent_change_df, constituent_history, k=TOP_K, sectors=None):
+    """
+    This function ranks the symbols of a percent change table (SYMBOL,
+    DATE, PCT_*) within every (sector, horizon, date), among the
+    constituents of the sector on that date, and keeps the `k` highest and
+    `k` lowest changes. Every (row, sector) pair is coded with its
+    (date, sector) group, so each ranking is one lexsort of the pairs;
+    ties are ranked by symbol.
+    It returns the rankings in long format (SECTOR, HORIZON, SIDE, DATE,
+    RANK from 1, SYMBOL, PCT), sorted by sector, horizon, side, date and rank.
+    """
+
+    row_positions, sector_codes, sectors = constituent_history.memberships(percent_change_df, sectors)
+    date_codes, dates = pd.factorize(percent_change_df['DATE'], sort=True)
+    symbol_codes, symbols = pd.factorize(percent_change_df['SYMBOL'], sort=True)
+
+    # Groups are numbered by sector, then date, which is the order of the output
+    pair_groups = sector_codes.astype(np.int64) * len(dates) + date_codes[row_positions]
+
+    frames = []
+    for horizon in HORIZON_NAMES:
+        values = percent_change_df[f'PCT_{horizon}'].to_numpy(dtype='float64')[row_positions]
+        valid = ~np.isnan(values)
+        rows, groups, values = row_positions[valid], pair_groups[valid], values[valid]
+
+        for side in SIDES:
+            order = np.lexsort((symbol_codes[rows], -values if side == 'GAINERS' else values, groups))
+            sorted_groups = groups[order]
+            # Rank within the group: position after the first pair of the group
+            ranks = np.arange(len(order)) - np.searchsorted(sorted_groups, sorted_groups, side='left')
+            keep = ranks < k
+            kept, kept_groups = order[keep], sorted_groups[keep]
+
+            frames.append(pd.DataFrame({
+                'SECTOR': sectors.to_numpy()[kept_groups // len(dates)],
+                'HORIZON': horizon,
+                'SIDE': side,
+                'DATE': dates[kept_groups % len(dates)],
+                'RANK': ranks[keep] + 1,
+                'SYMBOL': symbols.to_numpy()[symbol_codes[rows[kept]]],
+                'PCT': values[kept],
+            }))
+
+    top_movers_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=TOP_MOVERS_COLUMNS)
+    return top_movers_df.sort_values(['SECTOR', 'HORIZON', 'SIDE', 'DATE', 'RANK'], kind='stable', ignore_index=True)
+
+
+class TopMoversIndex:
+    """
+    This class answers top gainers/losers queries from the precomputed
+    rankings. The rankings are held as flat arrays sorted by (sector,
+    horizon, side, date, rank), and every (sector, horizon, side) maps to
+    its sorted trading dates and the slice of the arrays of each date, so a
+    query is a dictionary lookup, a binary search on the dates and a slice.
+    """
+
+    def __init__(self, top_movers_df):
+        top_movers_df = top_movers_df.sort_values(['SECTOR', 'HORIZON', 'SIDE', 'DATE', 'RANK'], kind='stable',
+                                                  ignore_index=True)
+        self.symbols = top_movers_df['SYMBOL'].astype(str).to_numpy()
+        self.changes = top_movers_df['PCT'].to_numpy(dtype='float64')
+        self.ranks = top_movers_df['RANK'].to_numpy(dtype='int64')
+
+        sectors = top_movers_df['SECTOR'].astype(str).to_numpy()
+        horizons = top_movers_df['HORIZON'].astype(str).to_numpy()
+        sides = top_movers_df['SIDE'].astype(str).to_numpy()
+        days = pd.to_datetime(top_movers_df['DATE']).to_numpy().astype('datetime64[D]')
+
+        # First row of every (sector, horizon, side, date) ranking
+        new_ranking = np.ones(len(top_movers_df), dtype=bool)
+        new_ranking[1:] = ((sectors[1:] != sectors[:-1]) | (horizons[1:] != horizons[:-1]) |
+                           (sides[1:] != sides[:-1]) | (days[1:] != days[:-1]))
+        starts = np.flatnonzero(new_ranking)
+        ends = np.append(starts[1:], len(top_movers_df))
+
+        # First ranking of every (sector, horizon, side)
+        new_key = np.ones(len(starts), dtype=bool)
+        new_key[1:] = ((sectors[starts[1:]] != sectors[starts[:-1]]) | (horizons[starts[1:]] != horizons[starts[:-1]]) |
+                       (sides[starts[1:]] != sides[starts[:-1]]))
+        key_starts = np.flatnonzero(new_key)
+        key_ends = np.append(key_starts[1:], len(starts))
+
+        self.rankings = {}
+        for key_start, key_end in zip(key_starts, key_ends):
+            row = starts[key_start]
+            self.rankings[(sectors[row], horizons[row], sides[row])] = (
+                days[starts[key_start:key_end]], starts[key_start:key_end], ends[key_start:key_end])
+
+        self.sectors = sorted({sector for sector, _, _ in self.rankings})
+        self.last_date = pd.Timestamp(days.max()) if len(days) else None
+
+    def query(self, sector, horizon, side='GAINERS', date=None, n=10):
+        """
+        This function returns the `n` top gainers or losers of a sector over
+        a horizon as of a date: the ranking of the latest trading date on or
+        before it (the latest one by default). Unknown sectors and dates
+        before the rankings raise KeyError, invalid arguments ValueError.
+        It returns a dictionary of the query and its movers (rank, symbol and
+        percent change), ready to be serialized as JSON.
+        """
+
+        side = side.upper()
+        if horizon not in HORIZON_NAMES:
+            raise ValueError(f'Unknown horizon {horizon}, expected one of {HORIZON_NAMES}')
+        if side not in SIDES:
+            raise ValueError(f'Unknown side {side}, expected one of {SIDES}')
+        if not 1 <= n <= TOP_K:
+            raise ValueError(f'n must be between 1 and {TOP_K}')
+
+        ranking = self.rankings.get((sector, horizon, side))
+        if ranking is None:
+            raise KeyError(f'No ranking of {sector}')
+        days, starts, ends = ranking
+
+        position = len(days) - 1
+        if date is not None:
+            position = int(np.searchsorted(days, np.datetime64(pd.Timestamp(date).date(), 'D'), side='right')) - 1
+            if position < 0:
+                raise KeyError(f'No ranking of {sector} on or before {pd.Timestamp(date):%Y-%m-%d}')
+
+        start, end = starts[position], min(ends[position], starts[position] + n)
+        return {
+            'sector': sector,
+            'horizon': horizon,
+            'side': side,
+            'date': str(days[position]),
+            'movers': [{'rank': int(rank), 'symbol': symbol, 'pct': round(float(change), 4)}
+                       for rank, symbol, change in zip(self.ranks[start:end], self.symbols[start:end], self.changes[start:end])],
+        }
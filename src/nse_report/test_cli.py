@@ -0,0 +1,36 @@
+import os
+import sys
+import subprocess
+import pytest
+from nse_report.cli import COMMANDS
+
+SRC_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the CLI must not import before a command runs
+HEAVY_MODULES = ['pandas', 'numpy', 'pyarrow', 'requests']
+
+
+def imported_modules(args, cwd):
+    """
+    This function runs the CLI in a fresh interpreter and returns the names
+    of the modules it imported, from its `-X importtime` report.
+    """
+
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join([SRC_PATH, os.environ.get('PYTHONPATH', '')])}
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'nse_report'] + args, cwd=cwd, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return {line.rsplit('|', 1)[-1].strip() for line in result.stderr.splitlines() if line.startswith('import time:')}
+
+
+@pytest.mark.parametrize('args', [['--help'], ['--version']])
+def test_help_does_not_import_the_heavy_modules(tmp_path, args):
+    modules = imported_modules(args, tmp_path)
+
+    assert 'nse_report.cli' in modules
+    assert not [module for module in modules if module.split('.')[0] in HEAVY_MODULES]
+    assert not [module for module in modules if module.split('.')[1:2] in (['extraction'], ['integration'])]
+
+
+def test_commands_are_package_modules():
+    assert all(module_name.startswith('nse_report.') for module_name, _, _ in COMMANDS.values())